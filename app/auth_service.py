@@ -3,28 +3,28 @@ from datetime import datetime, timedelta, timezone
 import jwt
 from fastapi import Depends, HTTPException, Security
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 
+from app.deps import get_unit_of_work
 from app.settings import JWT_PROCESSING_ALGORITHM
+from db_handles.session import UnitOfWork
 from db_handles.user import User
 
 from .env_reader import EnvReader
-
-# Password hashing
-pwd_context: CryptContext = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .password_hasher import password_hasher
+from .token_cache import token_cache
 
 # OAuth2 scheme
 oauth2_scheme: OAuth2PasswordBearer = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt"""
-    return str(pwd_context.hash(password))
+async def hash_password(password: str) -> str:
+    """Hash a password using bcrypt (off the event loop)"""
+    return await password_hasher.hash(password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hashed password"""
-    return bool(pwd_context.verify(plain_password, hashed_password))
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hashed password (off the event loop)"""
+    return await password_hasher.verify(plain_password, hashed_password)
 
 
 def create_access_token(
@@ -44,17 +44,18 @@ def create_access_token(
     )
 
 
-async def get_current_user(token: str = Security(oauth2_scheme)) -> User:
+async def get_current_user(
+    token: str = Security(oauth2_scheme),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+) -> User:
     """Decode JWT and return authenticated user"""
     try:
-        payload: dict[str, str] = jwt.decode(  # type: ignore
-            token, EnvReader.JWT_SECRET_KEY, algorithms=[JWT_PROCESSING_ALGORITHM]
-        )
+        payload = await token_cache.decode(token)
         user_id = payload.get("user_id")  # Extract `user_id`
         if not user_id:
             raise HTTPException(status_code=401, detail="Not Logged-in")
 
-        user = await User.get_by_id(int(user_id))
+        user = await User.get_cached(int(user_id), uow=uow)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         return user
@@ -63,6 +64,14 @@ async def get_current_user(token: str = Security(oauth2_scheme)) -> User:
         raise HTTPException(status_code=401, detail="Invalid Login Token")
 
 
+async def revoke_token(token: str) -> None:
+    """Reject the token on every worker until it expires"""
+    try:
+        await token_cache.revoke(token)
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid Login Token")
+
+
 async def get_admin_user(user: User = Depends(get_current_user)) -> User:
     """Ensure the authenticated user is an admin"""
     if not user.is_admin:
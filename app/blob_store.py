@@ -0,0 +1,97 @@
+import asyncio
+import os
+from pathlib import Path
+from uuid import uuid4
+
+from app.gvs import BLOBS_DIR
+from app.logs_config import get_logger
+from app.uploads import ReceivedUpload
+
+logger = get_logger()
+
+
+class BlobStore:
+    """
+    Content-addressed file storage, keyed by SHA-256.
+
+    Blobs live under `root/ab/cd/<sha256>`, so no directory grows past a few
+    thousand entries. Uploads are received in `root/tmp`, on the same file
+    system, so that placing a blob is an atomic rename. Reference counting is
+    done in the database, see `db_handles.stored_file`.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.temp_dir = root / "tmp"
+        self.stored = 0
+        self.deduplicated = 0
+        self.bytes_saved = 0
+        self.removed = 0
+
+    def ensure_dirs(self) -> None:
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+    def path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def _place(self, upload: ReceivedUpload, path: Path) -> bool:
+        if path.exists():
+            upload.temp_path.unlink(missing_ok=True)
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(upload.temp_path, path)
+        return True
+
+    async def put(self, upload: ReceivedUpload) -> bool:
+        """Move the upload in place, returns False if the blob already existed"""
+        stored = await asyncio.to_thread(self._place, upload, self.path(upload.sha256))
+        if stored:
+            self.stored += 1
+        else:
+            self.deduplicated += 1
+            self.bytes_saved += upload.size
+        return stored
+
+    def _move(self, source: Path, target: Path) -> bool:
+        try:
+            os.replace(source, target)
+        except FileNotFoundError:
+            return False
+        return True
+
+    async def tombstone(self, sha256: str) -> Path | None:
+        """
+        Move a blob out of the way, into `temp_dir`, while its deletion is not
+        committed yet. Returns where it went, None if it was already missing.
+        """
+        tombstone = self.temp_dir / f"{sha256}.{uuid4().hex}.deleted"
+        moved = await asyncio.to_thread(self._move, self.path(sha256), tombstone)
+        return tombstone if moved else None
+
+    async def restore(self, sha256: str, tombstone: Path) -> None:
+        """Put a tombstoned blob back, its deletion was rolled back"""
+        path = self.path(sha256)
+        await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+        await asyncio.to_thread(self._move, tombstone, path)
+
+    async def purge(self, sha256: str, tombstone: Path) -> None:
+        """Delete a tombstoned blob, once its deletion is committed"""
+        await asyncio.to_thread(tombstone.unlink, True)
+        self.removed += 1
+        logger.info("Removed blob %s", sha256)
+
+    async def discard(self, sha256: str) -> None:
+        """Delete a blob put for an upload whose row was rolled back"""
+        await asyncio.to_thread(self.path(sha256).unlink, True)
+        logger.info("Discarded blob %s of a rolled back upload", sha256)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "bytes_saved": self.bytes_saved,
+            "removed": self.removed,
+        }
+
+
+blob_store = BlobStore(Path(BLOBS_DIR))
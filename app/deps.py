@@ -1,9 +1,62 @@
-from typing import cast
+from typing import Any, AsyncGenerator, Callable, Coroutine, cast
 
-from fastapi import Request
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
 
+from db_handles.admin_settings import AdminSettings
+from db_handles.session import UnitOfWork, unit_of_work
 from redis_handlers.dispatcher import Dispatcher
 
 
+class UnitOfWorkRoute(APIRoute):
+    """
+    Commits the unit of work of the request (`get_unit_of_work`) once the
+    endpoint returned, before the response is sent, so that a client is never
+    told a write succeeded before it is committed. The exit code of yield
+    dependencies cannot be relied on for that: recent FastAPI versions run it
+    after the response is sent.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def commit_before_response(request: Request) -> Response:
+            response = await handler(request)
+            uow: UnitOfWork | None = getattr(request.state, "unit_of_work", None)
+            if uow is not None:
+                await uow.commit()
+            return response
+
+        return commit_before_response
+
+
+async def get_unit_of_work(request: Request) -> AsyncGenerator[UnitOfWork, None]:
+    """
+    The unit of work of the request: one session, one connection at most and
+    one transaction, committed by `UnitOfWorkRoute` once the route returns,
+    or rolled back if it raises.
+    """
+    if not isinstance(request.scope.get("route"), UnitOfWorkRoute):
+        raise RuntimeError("get_unit_of_work needs route_class=UnitOfWorkRoute")
+    async with unit_of_work() as uow:
+        request.state.unit_of_work = uow
+        try:
+            yield uow
+        finally:
+            request.state.unit_of_work = None
+
+
 def get_dispatcher(request: Request) -> Dispatcher:
     return cast(Dispatcher, request.app.state.dispatcher)
+
+
+async def require_registration_enabled() -> None:
+    settings = await AdminSettings.get_snapshot()
+    if not settings.enable_registration:
+        raise HTTPException(status_code=403, detail="Registrations are disabled")
+
+
+async def require_file_upload_enabled() -> None:
+    settings = await AdminSettings.get_snapshot()
+    if not settings.enable_file_upload:
+        raise HTTPException(status_code=403, detail="File uploads are disabled")
@@ -0,0 +1,222 @@
+import asyncio
+import os
+import stat
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from secrets import token_hex
+from typing import Any, BinaryIO
+
+from fastapi.responses import FileResponse
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+
+from app.env_reader import EnvReader
+from middlewares.standard_response import ENVELOPED_SCOPE_KEY
+
+# Headers a 304 response repeats from the 200 it stands for
+NOT_MODIFIED_HEADERS = (b"etag", b"last-modified", b"cache-control", b"vary")
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+def strong_etag(sha256: str) -> str:
+    return f'"{sha256}"'
+
+
+async def stat_file(path: Path) -> os.stat_result | None:
+    """Stat a regular file off the event loop, None if there is none"""
+    try:
+        stat_result = await asyncio.to_thread(os.stat, path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return stat_result if stat.S_ISREG(stat_result.st_mode) else None
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    etag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+class DownloadResponse(FileResponse):
+    """
+    `FileResponse` with conditional requests and zero-copy sends.
+
+    - `If-None-Match` and `If-Modified-Since` are answered with 304, without
+      opening the file.
+    - `Range` and `If-Range` come from Starlette. Multi-range responses are
+      sent with a proper `multipart/byteranges` content type.
+    - The body goes through the `http.response.pathsend` or
+      `http.response.zerocopysend` extension when the server supports one,
+      so the kernel copies it with sendfile. Otherwise it is read in
+      `DOWNLOAD_CHUNK_BYTES` chunks.
+
+    The file must be stat'ed beforehand, see `stat_file`.
+    """
+
+    chunk_size = EnvReader.DOWNLOAD_CHUNK_BYTES
+
+    def __init__(
+        self,
+        path: Path,
+        stat_result: os.stat_result,
+        media_type: str | None = None,
+        etag: str | None = None,
+    ) -> None:
+        super().__init__(
+            path,
+            headers={"etag": etag} if etag else None,
+            media_type=media_type,
+            stat_result=stat_result,
+        )
+        self._zerocopy = False
+
+    def is_not_modified(self, request_headers: Headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return _etag_matches(if_none_match, self.headers["etag"])
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since is None:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+            last_modified = parsedate_to_datetime(self.headers["last-modified"])
+            return last_modified <= since
+        except (TypeError, ValueError):
+            return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # File bodies are sent as they are, never wrapped in the JSON envelope
+        scope[ENVELOPED_SCOPE_KEY] = True
+
+        if scope["method"] in ("GET", "HEAD") and self.is_not_modified(
+            Headers(scope=scope)
+        ):
+            headers = [
+                (key, value)
+                for key, value in self.raw_headers
+                if key in NOT_MODIFIED_HEADERS
+            ]
+            await send(
+                {"type": "http.response.start", "status": 304, "headers": headers}
+            )
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        self._zerocopy = ZEROCOPY_EXTENSION in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    async def _send_zerocopy(self, send: Send, offset: int, count: int) -> None:
+        file = await asyncio.to_thread(open, self.path, "rb")
+        try:
+            message: dict[str, Any] = {
+                "type": ZEROCOPY_EXTENSION,
+                "file": file,
+                "offset": offset,
+                "count": count,
+                "more_body": False,
+            }
+            await send(message)
+        finally:
+            await asyncio.to_thread(file.close)
+
+    async def _handle_simple(
+        self, send: Send, send_header_only: bool, send_pathsend: bool
+    ) -> None:
+        if send_header_only or send_pathsend or not self._zerocopy:
+            await super()._handle_simple(send, send_header_only, send_pathsend)
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        await self._send_zerocopy(send, 0, int(self.headers["content-length"]))
+
+    async def _send_range(
+        self, send: Send, file: BinaryIO, start: int, end: int
+    ) -> None:
+        """Send bytes `start` to `end` of `file` in chunks, more body to follow"""
+        await asyncio.to_thread(file.seek, start)
+        while start < end:
+            chunk = await asyncio.to_thread(
+                file.read, min(self.chunk_size, end - start)
+            )
+            if not chunk:
+                # Shortened since it was stat'ed, the length sent can't be met
+                raise EOFError(f"{self.path} was truncated while being sent")
+            start += len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+    async def _handle_single_range(
+        self, send: Send, start: int, end: int, file_size: int, send_header_only: bool
+    ) -> None:
+        if send_header_only:
+            await super()._handle_single_range(
+                send, start, end, file_size, send_header_only
+            )
+            return
+
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send(
+            {"type": "http.response.start", "status": 206, "headers": self.raw_headers}
+        )
+        if self._zerocopy:
+            await self._send_zerocopy(send, start, end - start)
+            return
+
+        with await asyncio.to_thread(open, self.path, "rb") as file:
+            await self._send_range(send, file, start, end)
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _handle_multiple_ranges(
+        self,
+        send: Send,
+        ranges: list[tuple[int, int]],
+        file_size: int,
+        send_header_only: bool,
+    ) -> None:
+        # Starlette announces the boundary in `content-range` instead of the
+        # content type, and sends one byte more than its content length
+        boundary = token_hex(13)
+        content_length, part_header = self.generate_multipart(
+            ranges, boundary, file_size, self.headers["content-type"]
+        )
+        self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        self.headers["content-length"] = str(content_length)
+        await send(
+            {"type": "http.response.start", "status": 206, "headers": self.raw_headers}
+        )
+        if send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        with await asyncio.to_thread(open, self.path, "rb") as file:
+            for start, end in ranges:
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": part_header(start, end),
+                        "more_body": True,
+                    }
+                )
+                await self._send_range(send, file, start, end)
+                await send(
+                    {"type": "http.response.body", "body": b"\n", "more_body": True}
+                )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": f"--{boundary}--\n".encode("latin-1"),
+                "more_body": False,
+            }
+        )
@@ -20,6 +20,16 @@ class EnvReader:
     DATABASE_HOST: str = os.getenv("DATABASE_HOST", "localhost")
     DATABASE_PORT: int = int(os.getenv("DATABASE_PORT", 5432))
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "postgres")
+    # Connections per worker: DB_POOL_SIZE, plus up to DB_MAX_OVERFLOW under load
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 30))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Connections opened at startup, 0 to skip, -1 for DB_POOL_SIZE
+    DB_POOL_PREWARM: int = int(os.getenv("DB_POOL_PREWARM", -1))
+    # Prepared statements cached per connection, 0 behind PgBouncer
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
 
     # NowPayments Variables
     NOWPAYMENTS_IPN_KEY: str = os.getenv("NOWPAYMENTS_IPN_KEY", "")
@@ -33,3 +43,79 @@ class EnvReader:
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", 6379))
     REDIS_DB: int = int(os.getenv("REDIS_DB", 0))
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+    # How long to wait for a free connection when all of them are in use
+    REDIS_POOL_TIMEOUT_SECONDS: float = float(
+        os.getenv("REDIS_POOL_TIMEOUT_SECONDS", 5)
+    )
+    # Must be longer than the blocking reads, e.g. CONSUMER_BLOCK_MS
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = float(
+        os.getenv("REDIS_SOCKET_TIMEOUT_SECONDS", 10)
+    )
+    REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS: float = float(
+        os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS", 2)
+    )
+    REDIS_HEALTH_CHECK_INTERVAL: int = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+    REDIS_DRAIN_TIMEOUT_SECONDS: float = float(
+        os.getenv("REDIS_DRAIN_TIMEOUT_SECONDS", 5)
+    )
+    REDIS_USE_HIREDIS: bool = os.getenv("REDIS_USE_HIREDIS", "false").lower() == "true"
+
+    # Password hashing (0 = derive from the CPU count / disable the limit)
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 0))
+    PASSWORD_HASH_CONCURRENCY: int = int(os.getenv("PASSWORD_HASH_CONCURRENCY", 0))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 0))
+
+    # Authenticated user cache
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", 30))
+    USER_CACHE_MAX_ENTRIES: int = int(os.getenv("USER_CACHE_MAX_ENTRIES", 10_000))
+    USER_CACHE_USE_REDIS: bool = (
+        os.getenv("USER_CACHE_USE_REDIS", "false").lower() == "true"
+    )
+
+    # Verified JWT claims cache
+    TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", 10_000))
+    TOKEN_CACHE_MAX_TTL_SECONDS: int = int(
+        os.getenv("TOKEN_CACHE_MAX_TTL_SECONDS", 3600)
+    )
+
+    # Uploads
+    MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", 2 * 1024**3))
+    MAX_AVATAR_BYTES: int = int(os.getenv("MAX_AVATAR_BYTES", 5 * 1024**2))
+    UPLOAD_CHUNK_BYTES: int = int(os.getenv("UPLOAD_CHUNK_BYTES", 1024**2))
+    DOWNLOAD_CHUNK_BYTES: int = int(os.getenv("DOWNLOAD_CHUNK_BYTES", 1024**2))
+
+    # Rows fetched per round trip by the streaming user export
+    USER_EXPORT_BATCH_SIZE: int = int(os.getenv("USER_EXPORT_BATCH_SIZE", 1000))
+
+    # Logging
+    # "text" or "json" (one object per line)
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    # `logger=value` pairs, e.g. "app=0.5,app.payments=0.1", see `app.logs_config`
+    LOG_SAMPLE_RATES: str = os.getenv("LOG_SAMPLE_RATES", "")
+    LOG_RATE_LIMITS: str = os.getenv("LOG_RATE_LIMITS", "")
+
+    # Metrics, pushed to Redis to be merged over the workers (0 disables it)
+    METRICS_PUSH_INTERVAL_SECONDS: float = float(
+        os.getenv("METRICS_PUSH_INTERVAL_SECONDS", 15)
+    )
+
+    # Redis stream dispatching
+    # "json" (legacy), "fields" or "binary", see `redis_handlers.codecs`
+    STREAM_CODEC: str = os.getenv("STREAM_CODEC", "json")
+    # Cap of the streams not in `Streams.TRIMMING` (0 keeps them whole)
+    STREAM_DEFAULT_MAXLEN: int = int(os.getenv("STREAM_DEFAULT_MAXLEN", 0))
+    DISPATCH_COALESCE_MS: int = int(os.getenv("DISPATCH_COALESCE_MS", 0))
+    DISPATCH_COALESCE_MAX_BATCH: int = int(
+        os.getenv("DISPATCH_COALESCE_MAX_BATCH", 500)
+    )
+
+    # Redis stream consumers
+    CONSUMER_BATCH_SIZE: int = int(os.getenv("CONSUMER_BATCH_SIZE", 100))
+    CONSUMER_BLOCK_MS: int = int(os.getenv("CONSUMER_BLOCK_MS", 5000))
+    CONSUMER_MAX_QUEUE_DEPTH: int = int(os.getenv("CONSUMER_MAX_QUEUE_DEPTH", 1000))
+    CONSUMER_POOL_SIZE: int = int(os.getenv("CONSUMER_POOL_SIZE", 1))
+    CONSUMER_CLAIM_IDLE_MS: int = int(os.getenv("CONSUMER_CLAIM_IDLE_MS", 60_000))
+    CONSUMER_CLAIM_INTERVAL_SECONDS: float = float(
+        os.getenv("CONSUMER_CLAIM_INTERVAL_SECONDS", 30)
+    )
@@ -1,13 +1,11 @@
 import os
 
 UPLOADS_DIR = "uploads"
+BLOBS_DIR = "blobs"
 
-current_locals = locals().copy()
-for varname, value in current_locals.items():
-    if varname.isupper() and varname.endswith("DIR"):
-        os.makedirs(value, exist_ok=True)
 
-    if varname.isupper() and varname.endswith("FILE"):
-        if not os.path.exists(value):
-            with open(value, "w", encoding="UTF-8") as _:
-                pass
+def ensure_dirs() -> None:
+    """Create the `*_DIR` directories, called at startup rather than on import"""
+    for varname, value in globals().items():
+        if varname.isupper() and varname.endswith("DIR"):
+            os.makedirs(value, exist_ok=True)
@@ -1,24 +1,94 @@
+"""
+Logging of the app: a single process-wide `app` logger, and its children
+(`get_logger("payments")` is `app.payments`).
+
+Callers only put records on a queue (`QueueHandler`), a `QueueListener`
+thread formats and writes them to the console and to `logs.log`, so a slow
+disk or terminal never stalls the event loop. The log file is shared by
+the workers of a deployment, its writes and rollovers are serialized by a
+lock file (see `LockingRotatingFileHandler`).
+
+Before a record is queued, it may be dropped by sampling or rate limiting
+(`LOG_SAMPLE_RATES`, `LOG_RATE_LIMITS`), so pass the arguments of a message
+rather than an f-string: they are only formatted for the records kept.
+Records are stamped with the id of the current request, and secrets are
+masked by the handlers. `LOG_FORMAT=json` writes one JSON object per line.
+
+    python -m benchmarks.logging_throughput
+"""
+
+import atexit
 import copy
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-from typing import Any
+import queue
+import random
+import re
+import sys
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, TextIO
 
 import colorama
 
+from app.env_reader import EnvReader
+
+try:
+    import fcntl
+except ImportError:  # Windows, a single process is expected to write the file
+    fcntl = None  # type: ignore[assignment]
+
 colorama.init()
 
 
 VIRCHUAL = os.getenv("VIRCHUAL", False)
 
+LOGGER_NAME = "app"
 LOGS_FILENAME = "logs.log"
+MAX_FILESIZE_IN_MBS = 2_000
+BACKUP_COUNT = 2
+
+LEVEL_FORMATS: dict[int, str] = {
+    logging.DEBUG: "[.] %(message)s",
+    logging.INFO: "[+] %(message)s",
+    logging.WARNING: "[*] %(message)s",
+    logging.ERROR: "[-] %(message)s",
+    logging.CRITICAL: "[!] %(message)s",
+}
+FILE_FORMAT = (
+    "%(asctime)s - %(levelname)-8s - [%(filename)s:%(lineno)s] - "
+    "%(request_id)s - %(message)s"
+)
+
+# Id of the request being served, set by `RequestIdMiddleware`
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# Values of keys containing these are masked, in `key: value` and `key=value`
+# pairs, e.g. `access_token` or `'x-api-key':`
+SECRET_KEYS = (
+    r"api[_-]?key|password|secret|token|authorization|x-nowpayments-sig|signature"
+)
+# Configured secrets are masked wherever they appear, if long enough not to
+# match ordinary words (e.g. the default database password, "postgres")
+SECRET_VALUES = (
+    EnvReader.JWT_SECRET_KEY,
+    EnvReader.DATABASE_PASSWORD,
+    EnvReader.NOWPAYMENTS_API_KEY,
+    EnvReader.NOWPAYMENTS_IPN_KEY,
+)
+MIN_SECRET_LENGTH = 12
+REDACTED = "***"
 
 
 class NoExceptionStreamHandler(logging.StreamHandler[Any]):
     def emit(self, record: logging.LogRecord) -> Any:
         record = copy.copy(record)
-        # Clear exc_info to disable exception output for this handler only
+        # Clear the traceback to disable exception output for this handler only
         record.exc_info = None
+        record.exc_text = None
         super().emit(record)
 
 
@@ -43,61 +113,352 @@ class LevelBasedFormatter(logging.Formatter):
             + colorama.Back.RED,
         }
         self.color_reset = colorama.Style.RESET_ALL
+        # One formatter per level, built once rather than for every record
+        self.formatters = {
+            level: logging.Formatter(fmt, datefmt, style)  # type: ignore
+            for level, fmt in self.level_formats.items()
+        }
 
     def format(self, record: logging.LogRecord) -> str:
         # Check if there's a format for this level; use it if it exists
-        log_fmt = self.level_formats.get(record.levelno, self._fmt)
-        formatter = logging.Formatter(log_fmt)
+        formatter = self.formatters.get(record.levelno)
+        formatted_message = (
+            formatter.format(record) if formatter else super().format(record)
+        )
 
         # Apply color to the message based on log level
-        formatted_message = formatter.format(record)
         color_code = self.colors.get(record.levelno, "")
         return f"{color_code}{formatted_message}{self.color_reset}"
 
 
-def get_logger() -> logging.Logger:
-    max_filesize_in_mbs = 2_000
-    file_encoding = "UTF-8"
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log collectors"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "location": f"{record.filename}:{record.lineno}",
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the id of the request being served, if any"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get() or "-"
+        return True
+
+
+def parse_logger_values(spec: str) -> dict[str, float]:
+    """`"app=0.5,app.payments=0.1"` -> `{"app": 0.5, "app.payments": 0.1}`"""
+    values: dict[str, float] = {}
+    for pair in spec.split(","):
+        if pair.strip():
+            name, _, value = pair.partition("=")
+            values[name.strip()] = float(value)
+    return values
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a sampled fraction of the DEBUG and INFO records of a logger, and
+    at most a number of them per second (token bucket). Both are looked up
+    by logger name, the most specific configured ancestor wins. Warnings and
+    errors are always kept.
+    """
+
+    def __init__(
+        self,
+        sample_rates: dict[str, float] | None = None,
+        rate_limits: dict[str, float] | None = None,
+    ) -> None:
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_limits = rate_limits or {}
+        # Logger name -> (sample rate, rate limit), resolved once per logger
+        self.resolved: dict[str, tuple[float, float]] = {}
+        # Logger name -> (tokens, last refill)
+        self.buckets: dict[str, tuple[float, float]] = {}
+        self.dropped: Counter[str] = Counter()
+
+    def _lookup(self, values: dict[str, float], name: str, default: float) -> float:
+        while name:
+            if name in values:
+                return values[name]
+            name = name.rpartition(".")[0]
+        return default
+
+    def _take(self, name: str, limit: float, now: float) -> bool:
+        tokens, refilled_at = self.buckets.get(name, (limit, now))
+        tokens = min(limit, tokens + (now - refilled_at) * limit)
+        kept = tokens >= 1
+        self.buckets[name] = (tokens - 1 if kept else tokens, now)
+        return kept
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+
+        settings = self.resolved.get(record.name)
+        if settings is None:
+            settings = (
+                self._lookup(self.sample_rates, record.name, 1.0),
+                self._lookup(self.rate_limits, record.name, 0.0),
+            )
+            self.resolved[record.name] = settings
+        sample_rate, rate_limit = settings
+
+        if (sample_rate < 1.0 and random.random() >= sample_rate) or (
+            rate_limit > 0 and not self._take(record.name, rate_limit, record.created)
+        ):
+            self.dropped[record.name] += 1
+            return False
+        return True
+
+
+class RedactingFilter(logging.Filter):
+    """
+    Masks secrets in the message and traceback of a record: the values of
+    `SECRET_KEYS`, bearer tokens and the configured `SECRET_VALUES`. Added to
+    the handlers, so it runs on the listener thread.
+    """
+
+    def __init__(self, secrets: tuple[str, ...] = SECRET_VALUES) -> None:
+        super().__init__()
+        # The first group of each pattern is kept, the rest of the match masked
+        patterns = [
+            (
+                rf"((?:{SECRET_KEYS})[\w-]*['\"]?\s*[:=]\s*['\"]?)"
+                r"(?:bearer\s+)?[^'\",\s})]+"
+            ),
+            r"(bearer\s+)[\w.~+/-]+=*",
+        ]
+        patterns += [
+            f"(){re.escape(secret)}"
+            for secret in secrets
+            if len(secret) >= MIN_SECRET_LENGTH
+        ]
+        self.pattern = re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+    def redact(self, text: str) -> str:
+        return self.pattern.sub(self._mask, text)
 
-    logger = logging.Logger(__name__)
+    @staticmethod
+    def _mask(match: re.Match[str]) -> str:
+        key = next((group for group in match.groups() if group is not None), "")
+        return f"{key}{REDACTED}"
 
-    level_formats: dict[int, str] = {
-        logging.DEBUG: "[.] %(message)s",
-        logging.INFO: "[+] %(message)s",
-        logging.WARNING: "[*] %(message)s",
-        logging.ERROR: "[-] %(message)s",
-        logging.CRITICAL: "[!] %(message)s",
-    }
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Shared by the handlers, the record is only redacted by the first
+        if not getattr(record, "redacted", False):
+            record.msg = self.redact(record.getMessage())
+            record.args = None
+            if record.exc_text:
+                record.exc_text = self.redact(record.exc_text)
+            record.redacted = True
+        return True
 
-    level_based_fmt = LevelBasedFormatter(
-        "[+] %(message)s", level_formats=level_formats
+
+class LockingRotatingFileHandler(RotatingFileHandler):
+    """
+    `RotatingFileHandler` that several processes can share. Every write holds
+    an exclusive `flock` on `<filename>.lock`, and a file rotated by another
+    process is reopened before writing, so that rollovers do not race.
+
+    `flock` locks belong to the open file, which a forked child shares with
+    its parent, so a child must call `after_fork` to lock on its own.
+    """
+
+    def __init__(self, filename: str, *args: Any, **kwargs: Any) -> None:
+        super().__init__(filename, *args, **kwargs)
+        # Descriptor of `<filename>.lock`, opened on the first write
+        self.lock_fd: int | None = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if fcntl is None:
+            return super().emit(record)
+
+        lock_fd = self._open_lock()
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        try:
+            self._reopen_if_rotated()
+            super().emit(record)
+        finally:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+
+    def after_fork(self) -> None:
+        """Drop the lock and log files shared with the parent, both are reopened"""
+        self._close_lock()
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None  # type: ignore[assignment]
+
+    def _open_lock(self) -> int:
+        if self.lock_fd is None:
+            self.lock_fd = os.open(
+                f"{self.baseFilename}.lock", os.O_WRONLY | os.O_CREAT, 0o644
+            )
+        return self.lock_fd
+
+    def _close_lock(self) -> None:
+        if self.lock_fd is not None:
+            os.close(self.lock_fd)
+            self.lock_fd = None
+
+    def _reopen_if_rotated(self) -> None:
+        if self.stream is None:
+            return
+        try:
+            rotated = (
+                os.stat(self.baseFilename).st_ino
+                != os.fstat(self.stream.fileno()).st_ino
+            )
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            self.stream.close()
+            self.stream = self._open()
+
+    def close(self) -> None:
+        super().close()
+        self._close_lock()
+
+
+class RecordQueueHandler(QueueHandler):
+    """`QueueHandler` that keeps the traceback of a record apart from its message"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # Merge the arguments now, they may change once the record is queued
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            # Tracebacks hold frames, render them before leaving the thread.
+            # The file formatter appends `exc_text`, the console leaves it out
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def build_handlers(
+    filename: str = LOGS_FILENAME,
+    stream: TextIO | None = None,
+    log_format: str = EnvReader.LOG_FORMAT,
+) -> list[logging.Handler]:
+    """The console and file handlers, run by the listener thread"""
+    console_handler = NoExceptionStreamHandler(stream)
+    console_handler.setFormatter(
+        JsonFormatter()
+        if log_format == "json"
+        else LevelBasedFormatter("[+] %(message)s", level_formats=LEVEL_FORMATS)
     )
-    console_handler = NoExceptionStreamHandler()
-    console_handler.setFormatter(level_based_fmt)
+    console_handler.setLevel(logging.INFO)
 
-    file_handler = RotatingFileHandler(
-        LOGS_FILENAME,
+    file_handler = LockingRotatingFileHandler(
+        filename,
         mode="a",
-        maxBytes=max_filesize_in_mbs * 1024 * 1024,
-        backupCount=2,
-        encoding=file_encoding,
-        delay=False,
-    )
-    file_logging_fmt = logging.Formatter(
-        "[%(asctime)s - %(levelname)-8s - %(filename)s - %(lineno)-4s - %(message)s"
+        maxBytes=MAX_FILESIZE_IN_MBS * 1024 * 1024,
+        backupCount=BACKUP_COUNT,
+        encoding="UTF-8",
     )
-    file_logging_fmt = logging.Formatter(
-        "%(asctime)s - %(levelname)-8s - [%(filename)s:%(lineno)s] - %(message)s"
+    file_handler.setFormatter(
+        JsonFormatter()
+        if log_format == "json"
+        else logging.Formatter(FILE_FORMAT, defaults={"request_id": "-"})
     )
-    file_handler.setFormatter(file_logging_fmt)
-
-    # Log level of logger should always be DEBUG
-    logger.setLevel(logging.DEBUG)
     file_handler.setLevel(logging.DEBUG)
-    console_handler.setLevel(logging.INFO)
 
-    # Add handlers to the logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    redacting_filter = RedactingFilter()
+    for handler in (console_handler, file_handler):
+        handler.addFilter(redacting_filter)
+    return [console_handler, file_handler]
+
+
+def attach_queue(
+    logger: logging.Logger,
+    handlers: list[logging.Handler],
+    filters: tuple[logging.Filter, ...] = (),
+) -> QueueListener:
+    """
+    Route the records of `logger` through a queue to `handlers`. The
+    `filters` run on the caller, before the record is queued.
+    """
+    records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = RecordQueueHandler(records)
+    for log_filter in filters:
+        queue_handler.addFilter(log_filter)
+    logger.addHandler(queue_handler)
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+_listener: QueueListener | None = None
+
+sampling_filter = SamplingFilter(
+    parse_logger_values(EnvReader.LOG_SAMPLE_RATES),
+    parse_logger_values(EnvReader.LOG_RATE_LIMITS),
+)
+_caller_filters = (sampling_filter, RequestIdFilter())
+
+
+def _stop_listener() -> None:
+    """Write the records still queued, at exit"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _restart_listener_in_child() -> None:
+    # The listener thread does not survive a fork (e.g. gunicorn --preload)
+    global _listener
+    if _listener is not None:
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+        for handler in _listener.handlers:
+            if isinstance(handler, LockingRotatingFileHandler):
+                handler.after_fork()
+        _listener = attach_queue(
+            logger,
+            _listener.handlers,  # type: ignore[arg-type]
+            _caller_filters,
+        )
+
+
+def get_logger(name: str | None = None) -> logging.Logger:
+    """
+    The logger of the app, configured on first use and shared by every
+    module, or its child `name`, sampled and rate limited on its own
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is None and not logger.handlers:
+        # Log level of logger should always be DEBUG
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        _listener = attach_queue(
+            logger, build_handlers(stream=sys.stderr), _caller_filters
+        )
+        atexit.register(_stop_listener)
+        os.register_at_fork(after_in_child=_restart_listener_in_child)
+    return logger.getChild(name) if name else logger
+
 
-    return logger
+def logging_stats() -> dict[str, Any]:
+    return {"dropped": dict(sampling_filter.dropped)}
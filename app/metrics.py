@@ -0,0 +1,354 @@
+"""
+In-process metrics, exposed in the Prometheus text format by
+`GET /admin/metrics`.
+
+Each worker records its metrics in its own `registry`. With several workers
+(`gunicorn -w N`, see the `Procfile`) a scrape reaches only one of them, so
+every worker pushes a snapshot of its registry to Redis (`metrics_publisher`),
+and the endpoint renders the merge of the snapshots of the live workers:
+
+- counters and histograms are summed over the workers
+- gauges keep one series per worker, with a `worker` label
+
+A worker that stops pushing is dropped after `3 * METRICS_PUSH_INTERVAL_SECONDS`,
+its counters with it, which Prometheus sees as a counter reset.
+
+Values kept elsewhere (pool stats, consumer lag) are copied into the
+registry by collectors (`registry.collect_with`), right before a snapshot.
+"""
+
+import asyncio
+import json
+import math
+import os
+import socket
+import time
+from bisect import bisect_left
+from typing import Any, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.env_reader import EnvReader
+from app.logs_config import get_logger
+
+logger = get_logger()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a fast query or cache hit to a slow upload
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[str, ...]
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Labels = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        # Label values -> value
+        self.values: dict[Labels, Any] = {}
+
+    def clear(self) -> None:
+        """Drop every series, e.g. before a collector sets the current ones"""
+        self.values.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "labels": list(self.labels),
+            "samples": [[list(labels), value] for labels, value in self.values.items()],
+        }
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def set_total(self, value: float, *labels: str) -> None:
+        """For totals counted elsewhere, e.g. by a connection pool"""
+        self.values[labels] = value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self.values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """Values are `[count per bucket, sum, count]`, the buckets not cumulative"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [[0] * len(self.buckets), 0.0, 0]
+        # Upper bounds are inclusive, values over the last one only count in +Inf
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            state[0][index] += 1
+        state[1] += value
+        state[2] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        return {**super().snapshot(), "buckets": list(self.buckets)}
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+        self.collectors: list[Callable[[], None]] = []
+
+    def _add(self, metric: Metric) -> Any:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Labels = ()) -> Counter:
+        return self._add(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Labels = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, documentation, labels, buckets))
+
+    def collect_with(self, collector: Callable[[], None]) -> Callable[[], None]:
+        """Run `collector` before every snapshot, usable as a decorator"""
+        self.collectors.append(collector)
+        return collector
+
+    def snapshot(self) -> dict[str, Any]:
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception:
+                logger.exception("Metrics collector %s failed", collector.__name__)
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+
+registry = MetricsRegistry()
+
+
+def merge(snapshots: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """Merge the snapshots of several workers, keyed by worker name"""
+    merged: dict[str, Any] = {}
+    for worker, snapshot in sorted(snapshots.items()):
+        for name, metric in snapshot.items():
+            kind = metric["type"]
+            target = merged.setdefault(
+                name,
+                {
+                    **metric,
+                    "labels": metric["labels"] + ["worker"]
+                    if kind == "gauge"
+                    else metric["labels"],
+                    "samples": {},
+                },
+            )
+            samples: dict[Labels, Any] = target["samples"]
+            for labels, value in metric["samples"]:
+                if kind == "gauge":
+                    samples[(*labels, worker)] = value
+                    continue
+                key = tuple(labels)
+                current = samples.get(key)
+                if current is None:
+                    samples[key] = json.loads(json.dumps(value))
+                elif kind == "histogram":
+                    counts, total, count = value
+                    current[0] = [a + b for a, b in zip(current[0], counts)]
+                    current[1] += total
+                    current[2] += count
+                else:
+                    samples[key] = current + value
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: list[str], values: tuple[str, ...], *extra: str) -> str:
+    pairs = [*zip(names, values), *zip(extra[::2], extra[1::2])]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(v))}"' for name, v in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshots: dict[str, dict[str, Any]]) -> str:
+    """The Prometheus text format of the merged snapshots"""
+    lines: list[str] = []
+    for name, metric in sorted(merge(snapshots).items()):
+        names: list[str] = metric["labels"]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in sorted(metric["samples"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_labels(names, labels)} {_number(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(metric["buckets"], counts):
+                cumulative += bucket_count
+                bucket_labels = _labels(names, labels, "le", _number(float(bound)))
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            inf_labels = _labels(names, labels, "le", "+Inf")
+            lines.append(f"{name}_bucket{inf_labels} {count}")
+            lines.append(f"{name}_sum{_labels(names, labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(names, labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsPublisher:
+    """
+    Pushes the snapshot of this worker to Redis every `interval` seconds,
+    under `metrics:worker:<host>-<pid>`, and reads those of the others.
+    Without Redis, or with an interval of 0, only this worker is reported.
+    """
+
+    KEY_PREFIX = "metrics:worker:"
+    # Worker name -> time of its last push
+    WORKERS_KEY = "metrics:workers"
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        interval: float = EnvReader.METRICS_PUSH_INTERVAL_SECONDS,
+    ) -> None:
+        self.registry = registry
+        self.interval = interval
+        self.worker = f"{socket.gethostname()}-{os.getpid()}"
+        self.redis: Redis | None = None
+        self._task: asyncio.Task[None] | None = None
+        self.pushes = 0
+        self.failures = 0
+
+    @property
+    def ttl(self) -> int:
+        return max(1, math.ceil(self.interval * 3))
+
+    def attach(self, redis: Redis) -> None:
+        self.redis = redis
+
+    async def start(self) -> None:
+        # The worker name includes the pid, which changes in forked workers
+        self.worker = f"{socket.gethostname()}-{os.getpid()}"
+        if self.redis is not None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self.redis is not None:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    pipe.delete(self.KEY_PREFIX + self.worker)
+                    pipe.zrem(self.WORKERS_KEY, self.worker)
+                    await pipe.execute()
+            except RedisError as e:
+                logger.warning(f"Could not remove the metrics of {self.worker}: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await self.push()
+            await asyncio.sleep(self.interval)
+
+    async def push(self) -> dict[str, Any]:
+        """Snapshot this worker, and share the snapshot when pushing is enabled"""
+        snapshot = self.registry.snapshot()
+        if self.redis is None or self.interval <= 0:
+            return snapshot
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(
+                    self.KEY_PREFIX + self.worker, json.dumps(snapshot), ex=self.ttl
+                )
+                pipe.zadd(self.WORKERS_KEY, {self.worker: time.time()})
+                await pipe.execute()
+            self.pushes += 1
+        except RedisError as e:
+            self.failures += 1
+            logger.warning(f"Could not push the metrics of {self.worker}: {e}")
+        return snapshot
+
+    async def collect(self) -> dict[str, dict[str, Any]]:
+        """The snapshots of the live workers, this one's taken now"""
+        snapshots = {self.worker: await self.push()}
+        if self.redis is None or self.interval <= 0:
+            return snapshots
+        try:
+            await self.redis.zremrangebyscore(
+                self.WORKERS_KEY, 0, time.time() - self.ttl
+            )
+            workers = [
+                worker.decode() if isinstance(worker, bytes) else worker
+                for worker in await self.redis.zrange(self.WORKERS_KEY, 0, -1)
+            ]
+            others = [worker for worker in workers if worker != self.worker]
+            if others:
+                values = await self.redis.mget(
+                    [self.KEY_PREFIX + worker for worker in others]
+                )
+                for worker, value in zip(others, values):
+                    if value:
+                        snapshots[worker] = json.loads(value)
+        except RedisError as e:
+            logger.warning(f"Could not read the metrics of the other workers: {e}")
+        return snapshots
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "worker": self.worker,
+            "pushing": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "pushes": self.pushes,
+            "failures": self.failures,
+        }
+
+
+metrics_publisher = MetricsPublisher(registry)
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
+
+from fastapi import HTTPException
+
+from app.env_reader import EnvReader
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing/verification on a bounded thread pool so the event loop
+    never blocks on key derivation. bcrypt releases the GIL while it works, so
+    the threads run in parallel across cores.
+    """
+
+    def __init__(
+        self, max_workers: int, max_concurrency: int, max_queue: int = 0
+    ) -> None:
+        self._context: "CryptContext | None" = None
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        # 0 disables the queue limit
+        self.max_queue = max_queue
+
+        self._executor: ThreadPoolExecutor | None = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        # Metrics
+        self.waiting = 0
+        self.in_flight = 0
+        self.peak_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    @property
+    def context(self) -> "CryptContext":
+        # passlib is slow to import, it is only loaded when first needed
+        if self._context is None:
+            from passlib.context import CryptContext
+
+            self._context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        return self._context
+
+    async def warm_up(self) -> None:
+        """Import passlib on the pool, before the first login needs it"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, lambda: self.context)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hasher"
+            )
+        return self._executor
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        if self.max_queue and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503, detail="Server is busy. Please try again later!"
+            )
+
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        queued_at = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        self.total_wait_seconds += started_at - queued_at
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_run_seconds += time.perf_counter() - started_at
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        """Hash a password using bcrypt"""
+        return str(await self._run(self.context.hash, password))
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against a hashed password"""
+        return bool(
+            await self._run(self.context.verify, plain_password, hashed_password)
+        )
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_depth": self.waiting,
+            "peak_queue_depth": self.peak_waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": (
+                self.total_wait_seconds / self.completed * 1000
+                if self.completed
+                else 0.0
+            ),
+            "avg_run_ms": (
+                self.total_run_seconds / self.completed * 1000
+                if self.completed
+                else 0.0
+            ),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_workers = EnvReader.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+
+password_hasher = PasswordHasher(
+    max_workers=_workers,
+    max_concurrency=EnvReader.PASSWORD_HASH_CONCURRENCY or _workers,
+    max_queue=EnvReader.PASSWORD_HASH_MAX_QUEUE,
+)
@@ -0,0 +1,79 @@
+"""
+Startup profile of the worker: how long each phase of the lifespan took,
+and how long after the process started the worker was ready. It is logged
+once startup completes and reported by `GET /admin/runtime`.
+
+The import time of the app, with a per-module breakdown, is measured by
+`python -m benchmarks.startup`.
+"""
+
+import os
+import time
+from typing import Any, Awaitable, TypeVar
+
+from app.logs_config import get_logger
+
+logger = get_logger()
+
+T = TypeVar("T")
+
+
+def process_age() -> float | None:
+    """Seconds since the process started, None where /proc is not available"""
+    try:
+        with open("/proc/self/stat") as f:
+            stat = f.read()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except OSError:
+        return None
+    # `starttime` is the 22nd field, the 2nd (`comm`) may contain spaces
+    start_ticks = int(stat.rsplit(")", 1)[1].split()[19])
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+class StartupProfile:
+    def __init__(self) -> None:
+        self.started_at: float | None = None
+        self.phases: dict[str, float] = {}
+        self.total: float | None = None
+        self.ready_after: float | None = None
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self.phases.clear()
+
+    async def timed(self, name: str, awaitable: Awaitable[T]) -> T:
+        """Await and time a phase. Phases may run concurrently"""
+        started_at = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.phases[name] = time.perf_counter() - started_at
+
+    def ready(self) -> None:
+        if self.started_at is not None:
+            self.total = time.perf_counter() - self.started_at
+        self.ready_after = process_age()
+        logger.info(f"Startup complete! {self.report()}")
+
+    def report(self) -> str:
+        phases = ", ".join(
+            f"{name} {elapsed * 1000:.0f} ms" for name, elapsed in self.phases.items()
+        )
+        ready = (
+            f", ready {self.ready_after:.2f} s after the process started"
+            if self.ready_after is not None
+            else ""
+        )
+        return f"Lifespan took {(self.total or 0.0) * 1000:.0f} ms ({phases}){ready}"
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "phases_ms": {name: t * 1000 for name, t in self.phases.items()},
+            "lifespan_ms": self.total * 1000 if self.total is not None else None,
+            "ready_after_s": self.ready_after,
+        }
+
+
+startup_profile = StartupProfile()
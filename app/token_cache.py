@@ -0,0 +1,128 @@
+import hashlib
+import time
+from typing import Any
+
+import jwt
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.cache import TTLCache
+from app.env_reader import EnvReader
+from app.logs_config import get_logger
+from app.settings import JWT_PROCESSING_ALGORITHM
+from redis_handlers.broadcast import broadcaster
+
+logger = get_logger()
+
+Claims = dict[str, Any]
+
+
+class TokenRevokedError(jwt.InvalidTokenError):
+    pass
+
+
+class TokenClaimsCache:
+    """
+    Bounded cache from the SHA-256 digest of a bearer token to its verified
+    claims, so repeat requests skip the HMAC verification and JSON parsing.
+
+    Entries expire at the token's `exp` (capped by `max_ttl_seconds`) or as
+    soon as the token is revoked. Revocations are broadcast to every worker
+    and, when Redis is attached, also stored there until the token expires so
+    that workers started later still reject the token.
+    """
+
+    CHANNEL = "auth.tokens.revoke"
+    REVOKED_KEY_PREFIX = "auth:revoked:"
+
+    def __init__(self, max_entries: int, max_ttl_seconds: int) -> None:
+        self.claims: TTLCache[str, Claims] = TTLCache(max_entries, max_ttl_seconds)
+        self.max_ttl_seconds = max_ttl_seconds
+        self.redis: Redis | None = None
+        # Token digest -> expiry timestamp. Not size-bounded on purpose, an
+        # evicted revocation would make the token valid again.
+        self._revoked: dict[str, float] = {}
+
+        broadcaster.subscribe(self.CHANNEL, self._on_revoke)
+
+    def attach(self, redis: Redis) -> None:
+        self.redis = redis
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    async def decode(self, token: str) -> Claims:
+        """Return the verified claims of the token, raise `jwt.PyJWTError` if invalid"""
+        token_digest = self.digest(token)
+        claims = self.claims.get(token_digest)
+        if claims is not None:
+            return claims
+
+        if token_digest in self._revoked:
+            raise TokenRevokedError("Token has been revoked")
+
+        claims = jwt.decode(
+            token, EnvReader.JWT_SECRET_KEY, algorithms=[JWT_PROCESSING_ALGORITHM]
+        )
+
+        if await self._is_revoked_in_redis(token_digest):
+            self._revoked[token_digest] = float(claims.get("exp", time.time()))
+            raise TokenRevokedError("Token has been revoked")
+
+        ttl = self.max_ttl_seconds
+        if "exp" in claims:
+            ttl = min(ttl, int(claims["exp"] - time.time()))
+        self.claims.set(token_digest, claims, ttl)
+        return claims
+
+    async def revoke(self, token: str) -> None:
+        """Revoke the token on every worker until it expires"""
+        claims = jwt.decode(
+            token,
+            EnvReader.JWT_SECRET_KEY,
+            algorithms=[JWT_PROCESSING_ALGORITHM],
+            options={"verify_exp": False},
+        )
+        expires_at = int(claims.get("exp", time.time() + self.max_ttl_seconds))
+        token_digest = self.digest(token)
+
+        if self.redis is not None:
+            ttl = expires_at - int(time.time())
+            if ttl > 0:
+                try:
+                    await self.redis.set(
+                        f"{self.REVOKED_KEY_PREFIX}{token_digest}", 1, ex=ttl
+                    )
+                except RedisError as e:
+                    logger.warning(f"Could not store token revocation: {e}")
+
+        await broadcaster.publish(self.CHANNEL, f"{token_digest}:{expires_at}")
+
+    def _on_revoke(self, message: str) -> None:
+        token_digest, _, expires_at = message.partition(":")
+        self.claims.pop(token_digest)
+
+        now = time.time()
+        self._revoked = {d: exp for d, exp in self._revoked.items() if exp > now}
+        self._revoked[token_digest] = float(expires_at)
+
+    async def _is_revoked_in_redis(self, token_digest: str) -> bool:
+        if self.redis is None:
+            return False
+        try:
+            return bool(
+                await self.redis.exists(f"{self.REVOKED_KEY_PREFIX}{token_digest}")
+            )
+        except RedisError as e:
+            logger.warning(f"Token revocation lookup failed: {e}")
+            return False
+
+    def stats(self) -> dict[str, Any]:
+        return {**self.claims.stats(), "revoked": len(self._revoked)}
+
+
+token_cache = TokenClaimsCache(
+    max_entries=EnvReader.TOKEN_CACHE_MAX_ENTRIES,
+    max_ttl_seconds=EnvReader.TOKEN_CACHE_MAX_TTL_SECONDS,
+)
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import mimetypes
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+from uuid import uuid4
+
+from fastapi import HTTPException, UploadFile
+
+from app.env_reader import EnvReader
+from app.logs_config import get_logger
+
+logger = get_logger()
+
+# Leading bytes of the formats we recognize, checked in order
+MAGIC_NUMBERS: tuple[tuple[bytes, str], ...] = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF-", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\x1f\x8b", "application/gzip"),
+    (b"ID3", "audio/mpeg"),
+    (b"OggS", "application/ogg"),
+)
+SNIFF_BYTES = 16
+
+
+def detect_content_type(head: bytes) -> str | None:
+    """Detect the MIME type from the first bytes of a file"""
+    for magic, content_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        return "video/mp4"
+    return None
+
+
+@dataclass(frozen=True)
+class ReceivedUpload:
+    """An upload streamed to a temporary file, waiting to be moved in place"""
+
+    temp_path: Path
+    filename: str | None
+    size: int
+    sha256: str
+    # Detected from the content, None if the format is not recognized
+    detected_type: str | None
+    elapsed: float
+
+    @property
+    def content_type(self) -> str:
+        """The detected MIME type, or a guess from the file name"""
+        if self.detected_type:
+            return self.detected_type
+        guessed, _ = mimetypes.guess_type(self.filename or "")
+        return guessed or "application/octet-stream"
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.size / self.elapsed if self.elapsed else 0.0
+
+    async def discard(self) -> None:
+        await asyncio.to_thread(self.temp_path.unlink, True)
+
+
+class UploadStats:
+    def __init__(self) -> None:
+        self.uploads = 0
+        self.rejected = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "uploads": self.uploads,
+            "rejected": self.rejected,
+            "bytes": self.bytes,
+            "avg_bytes_per_second": self.bytes / self.seconds if self.seconds else 0.0,
+        }
+
+
+upload_stats = UploadStats()
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    upload_stats.rejected += 1
+    return HTTPException(
+        status_code=413, detail=f"File is too large. The limit is {max_bytes} bytes."
+    )
+
+
+def _copy(
+    source: BinaryIO, target: Path, max_bytes: int, chunk_size: int
+) -> tuple[int, str, bytes]:
+    """Copy `source` to `target` chunk by chunk, hashing it along the way"""
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+
+    with open(target, "wb") as buffer:
+        while chunk := source.read(chunk_size):
+            size += len(chunk)
+            if size > max_bytes:
+                raise _too_large(max_bytes)
+            if len(head) < SNIFF_BYTES:
+                head += chunk[: SNIFF_BYTES - len(head)]
+            digest.update(chunk)
+            buffer.write(chunk)
+
+    return size, digest.hexdigest(), head
+
+
+async def receive_upload(
+    file: UploadFile, directory: Path, max_bytes: int
+) -> ReceivedUpload:
+    """
+    Stream an upload into a temporary file of `directory`.
+
+    The copy runs on a worker thread in fixed-size chunks, so memory use is
+    constant whatever the file size and the event loop never blocks on disk.
+    The size limit, SHA-256 and MIME type are all handled in the same pass.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    temp_path = directory / f".{uuid4()}.part"
+    started_at = time.perf_counter()
+    try:
+        size, sha256, head = await asyncio.to_thread(
+            _copy, file.file, temp_path, max_bytes, EnvReader.UPLOAD_CHUNK_BYTES
+        )
+    except BaseException:
+        await asyncio.to_thread(temp_path.unlink, True)
+        raise
+
+    upload = ReceivedUpload(
+        temp_path=temp_path,
+        filename=file.filename,
+        size=size,
+        sha256=sha256,
+        detected_type=detect_content_type(head),
+        elapsed=time.perf_counter() - started_at,
+    )
+
+    upload_stats.uploads += 1
+    upload_stats.bytes += upload.size
+    upload_stats.seconds += upload.elapsed
+    logger.info(
+        f"Received upload {upload.filename!r}: {upload.size} bytes "
+        f"in {upload.elapsed:.3f}s ({upload.bytes_per_second / 1e6:.1f} MB/s)"
+    )
+    return upload
@@ -0,0 +1,40 @@
+import csv
+import io
+from typing import AsyncIterator
+
+from pydantic import TypeAdapter
+
+from app.env_reader import EnvReader
+from db_handles.user import User
+from models.user import UserPublicRow
+
+# Media type of each export format
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+CSV_COLUMNS = tuple(UserPublicRow.__annotations__)
+
+_row_adapter: TypeAdapter[UserPublicRow] = TypeAdapter(UserPublicRow)
+
+
+async def export_users(
+    format: str, batch_size: int = EnvReader.USER_EXPORT_BATCH_SIZE
+) -> AsyncIterator[bytes]:
+    """
+    Encode every user as a `UserPublicRow`, one chunk per batch of rows, so
+    that a streaming response never holds more than one batch in memory.
+    """
+    if format == "csv":
+        yield _csv_lines([CSV_COLUMNS])
+
+    async for rows in User.stream_public_rows(batch_size):
+        public_rows = [User.public_row(row) for row in rows]
+        if format == "csv":
+            yield _csv_lines([tuple(row.values()) for row in public_rows])
+        else:
+            yield b"".join(_row_adapter.dump_json(row) + b"\n" for row in public_rows)
+
+
+def _csv_lines(lines: list[tuple[object, ...]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(lines)
+    return buffer.getvalue().encode()
@@ -0,0 +1,147 @@
+"""
+Bulk import of users, for migrations. Run it with `manage.py`:
+
+    python manage.py import-users users.csv [--batch-size 5000] [--workers 8]
+
+The file is CSV with a header line, or NDJSON when its name ends with
+`.ndjson` or `.jsonl`. Columns:
+
+- `email` (required) and `full_name`
+- `password`, hashed here with bcrypt, or `hashed_password`, a bcrypt hash
+  stored as is. A `hashed_password` that is not a bcrypt hash is ignored
+- `is_admin` and `is_blocked`, optional, "true"/"1"/"yes" are true
+
+Rows are hashed on a thread pool and inserted with `User.copy_in`, one
+batch at a time. The next batch is hashed while the current one is copied.
+Emails that already exist are skipped, case-insensitively.
+"""
+
+import asyncio
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterator
+
+from app.logs_config import get_logger
+from app.password_hasher import PasswordHasher
+from db_handles.user import User
+
+logger = get_logger()
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+TRUE_VALUES = ("1", "true", "yes")
+
+
+@dataclass
+class ImportReport:
+    read: int = 0
+    invalid: int = 0
+    inserted: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def skipped(self) -> int:
+        """Valid rows that were not inserted, their email was already taken"""
+        return self.read - self.invalid - self.inserted
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.read} rows read, {self.inserted} users inserted, "
+            f"{self.skipped} skipped, {self.invalid} invalid "
+            f"in {self.elapsed:.1f}s ({self.rows_per_second:.0f} rows/s)"
+        )
+
+
+def read_rows(path: Path) -> Iterator[dict[str, Any]]:
+    with path.open(newline="", encoding="utf-8") as file:
+        if path.suffix in (".ndjson", ".jsonl"):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(file)
+
+
+def _as_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in TRUE_VALUES
+
+
+def _bcrypt_hash(row: dict[str, Any]) -> str | None:
+    """The `hashed_password` of a row if it is a bcrypt hash, stored as is"""
+    value = row.get("hashed_password")
+    if isinstance(value, str) and value.startswith(BCRYPT_PREFIXES):
+        return value
+    return None
+
+
+async def _prepare(
+    rows: list[tuple[int, dict[str, Any]]],
+    hasher: PasswordHasher,
+    report: ImportReport,
+) -> list[tuple[Any, ...]]:
+    """Validate and hash a batch of `(line, row)` into `User.IMPORT_COLUMNS` records"""
+    valid: list[tuple[int, dict[str, Any]]] = []
+    for line, row in rows:
+        if not row.get("email") or not (row.get("password") or _bcrypt_hash(row)):
+            report.invalid += 1
+            continue
+        valid.append((line, row))
+
+    async def hash_row(row: dict[str, Any]) -> str:
+        # Anything else in `hashed_password` (plain text, md5, ...) is ignored
+        return _bcrypt_hash(row) or await hasher.hash(str(row["password"]))
+
+    hashes = await asyncio.gather(*(hash_row(row) for _, row in valid))
+    now = datetime.now()
+    return [
+        (
+            line,
+            str(row["email"]).strip(),
+            hashed,
+            row.get("full_name") or "",
+            _as_bool(row.get("is_admin")),
+            _as_bool(row.get("is_blocked")),
+            now,
+        )
+        for (line, row), hashed in zip(valid, hashes)
+    ]
+
+
+async def import_users(path: Path, batch_size: int, workers: int) -> ImportReport:
+    hasher = PasswordHasher(max_workers=workers, max_concurrency=workers)
+    report = ImportReport()
+    rows = enumerate(read_rows(path), start=1)
+
+    async def copy(records: list[tuple[Any, ...]]) -> None:
+        if records:
+            report.inserted += (await User.copy_in(records))["total"]
+        logger.info("Import progress: %s", report)
+
+    copying: asyncio.Task[None] | None = None
+    try:
+        while batch := list(islice(rows, batch_size)):
+            report.read += len(batch)
+            records = await _prepare(batch, hasher, report)
+            if copying is not None:
+                await copying
+            copying = asyncio.create_task(copy(records))
+        if copying is not None:
+            await copying
+    finally:
+        hasher.shutdown()
+
+    return report
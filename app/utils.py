@@ -3,9 +3,6 @@ import hashlib
 import hmac
 
 from fastapi import HTTPException
-from passlib.context import CryptContext
-
-pwd_context: CryptContext = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def dt_now() -> dt.datetime:
@@ -31,11 +28,3 @@ def np_signature_check(
 
     else:
         raise HTTPException(400, "HMAC signature does not match")
-
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
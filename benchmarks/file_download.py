@@ -0,0 +1,125 @@
+"""
+Throughput of `GET /files/download/{file_id}`.
+
+    python -m benchmarks.file_download
+
+- legacy:    `Path.exists()` + Starlette `FileResponse`, 64 KiB reads
+- chunked:   `stat_file` + `DownloadResponse`, `DOWNLOAD_CHUNK_BYTES` reads
+- zerocopy:  same, on a server advertising `http.response.zerocopysend`
+- 304:       revalidation with a matching `If-None-Match`
+
+The responses are called as ASGI apps, the bodies are written to /dev/null
+(with `os.sendfile` for zero-copy sends), so no HTTP server is involved.
+Sending to /dev/null flatters sendfile, a socket bounds it by the network.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from fastapi.responses import FileResponse
+
+from app.downloads import ZEROCOPY_EXTENSION, DownloadResponse, stat_file, strong_etag
+
+FILE_SIZES = (1024**2, 256 * 1024**2)
+REPEATS = 5
+ETAG = strong_etag("0" * 64)
+
+
+def make_scope(headers: dict[str, str], zerocopy: bool = False) -> dict[str, Any]:
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/files/download/benchmark",
+        "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+        "extensions": {ZEROCOPY_EXTENSION: {}} if zerocopy else {},
+    }
+
+
+async def receive() -> dict[str, Any]:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+def make_sink(devnull: int) -> Callable[[dict[str, Any]], Awaitable[None]]:
+    async def send(message: dict[str, Any]) -> None:
+        if message["type"] == "http.response.body":
+            os.write(devnull, message["body"])
+        elif message["type"] == ZEROCOPY_EXTENSION:
+            offset, count = message["offset"], message["count"]
+            while count:
+                sent = os.sendfile(devnull, message["file"].fileno(), offset, count)
+                offset += sent
+                count -= sent
+
+    return send
+
+
+async def legacy(path: Path, send: Any) -> None:
+    if not path.exists():
+        raise FileNotFoundError(path)
+    await FileResponse(path)(make_scope({}), receive, send)
+
+
+async def chunked(path: Path, send: Any) -> None:
+    stat_result = await stat_file(path)
+    assert stat_result is not None
+    response = DownloadResponse(path, stat_result, etag=ETAG)
+    await response(make_scope({}), receive, send)
+
+
+async def zerocopy(path: Path, send: Any) -> None:
+    stat_result = await stat_file(path)
+    assert stat_result is not None
+    response = DownloadResponse(path, stat_result, etag=ETAG)
+    await response(make_scope({}, zerocopy=True), receive, send)
+
+
+async def not_modified(path: Path, send: Any) -> None:
+    stat_result = await stat_file(path)
+    assert stat_result is not None
+    response = DownloadResponse(path, stat_result, etag=ETAG)
+    await response(make_scope({"if-none-match": ETAG}), receive, send)
+
+
+async def best_of(
+    func: Callable[[Path, Any], Awaitable[None]], path: Path, send: Any
+) -> float:
+    timings: list[float] = []
+    for _ in range(REPEATS):
+        started_at = time.perf_counter()
+        await func(path, send)
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+async def main() -> None:
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    send = make_sink(devnull)
+    print(f"{'size MB':>8} {'path':>9} {'total ms':>10} {'MB/s':>9} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in FILE_SIZES:
+            path = Path(directory) / f"file-{size}"
+            path.write_bytes(os.urandom(size))
+
+            baseline = await best_of(legacy, path, send)
+            for name, func in (
+                ("legacy", legacy),
+                ("chunked", chunked),
+                ("zerocopy", zerocopy),
+                ("304", not_modified),
+            ):
+                elapsed = (
+                    baseline if name == "legacy" else await best_of(func, path, send)
+                )
+                print(
+                    f"{size / 1024**2:>8.0f} {name:>9} {elapsed * 1000:>10.2f} "
+                    f"{size / elapsed / 1e6:>9.0f} {baseline / elapsed:>7.1f}x"
+                )
+    os.close(devnull)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Cost of logging on the event loop.
+
+    python -m benchmarks.logging_throughput
+
+- direct:  the console and file handlers called by the logging coroutine
+- queued:  the same handlers behind `RecordQueueHandler`, run by a
+           `QueueListener` thread, as configured by `get_logger()`
+
+For each, a coroutine logs `RECORDS` records in bursts of `BURST` while a
+ticker coroutine measures how late its 1 ms sleeps wake up, i.e. how long
+the loop is stalled. "records/s" is the rate of the logging coroutine,
+"drained" the time until every record is written. The console writes to
+/dev/null, the file to a temporary directory.
+"""
+
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable
+
+from app.logs_config import attach_queue, build_handlers
+
+RECORDS = 50_000
+BURST = 100
+TICK = 0.001
+
+
+async def measure(logger: logging.Logger, drain: Callable[[], None]) -> None:
+    lags: list[float] = []
+    done = False
+
+    async def ticker() -> None:
+        while not done:
+            started_at = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - started_at - TICK)
+
+    ticking = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK)
+    started_at = time.perf_counter()
+    for i in range(RECORDS):
+        logger.info("Served request %s for user %s", i, "benchmark@example.com")
+        if i % BURST == 0:
+            await asyncio.sleep(0)
+    logged = time.perf_counter() - started_at
+    done = True
+    await ticking
+    drain()
+    drained = time.perf_counter() - started_at
+
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+    print(
+        f"{logger.name:>7} {RECORDS / logged:>11.0f} {drained * 1000:>11.0f} "
+        f"{statistics.median(lags) * 1000:>10.2f} {p99 * 1000:>8.2f} "
+        f"{max(lags) * 1000:>8.2f}"
+    )
+
+
+def make_logger(name: str) -> logging.Logger:
+    logger = logging.Logger(name)
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+
+def main() -> None:
+    print(
+        f"{'path':>7} {'records/s':>11} {'drained ms':>11} "
+        f"{'lag p50 ms':>10} {'p99 ms':>8} {'max ms':>8}"
+    )
+    with tempfile.TemporaryDirectory() as root, open(os.devnull, "w") as devnull:
+        direct = make_logger("direct")
+        handlers = build_handlers(os.path.join(root, "direct.log"), devnull)
+        for handler in handlers:
+            direct.addHandler(handler)
+        asyncio.run(measure(direct, lambda: None))
+
+        queued = make_logger("queued")
+        handlers = build_handlers(os.path.join(root, "queued.log"), devnull)
+        listener = attach_queue(queued, handlers)
+        asyncio.run(measure(queued, listener.stop))
+
+        for handler in [*direct.handlers, *handlers]:
+            handler.close()
+
+
+if __name__ == "__main__":
+    main()
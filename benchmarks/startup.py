@@ -0,0 +1,85 @@
+"""
+Cold-start time of a worker: how long `import main` takes in a fresh
+interpreter, i.e. building the app with its routers, before the lifespan.
+
+    python -m benchmarks.startup [--runs 5] [--top 15] [--budget 2.0]
+
+Prints the best and median of the runs, then the packages that took
+longest to import (from `python -X importtime`). Exits with status 1 when
+the median is over the budget (`STARTUP_BUDGET_SECONDS`), so that it can
+gate CI. The lifespan phases, which need the database and
+Redis, are timed by the worker itself, see `app.startup`.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_MAIN = "import main"
+DEFAULT_BUDGET = float(os.getenv("STARTUP_BUDGET_SECONDS", "2.0"))
+
+
+def time_import(runs: int) -> list[float]:
+    timings: list[float] = []
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        subprocess.run([sys.executable, "-c", IMPORT_MAIN], check=True)
+        timings.append(time.perf_counter() - started_at)
+    return timings
+
+
+def import_breakdown() -> list[tuple[str, int, int]]:
+    """`(module, self us, cumulative us)` of every import of a single run, nested
+    imports are indented"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_MAIN],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    modules: list[tuple[str, int, int]] = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        modules.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument(
+        "--budget", type=float, default=DEFAULT_BUDGET, help="Seconds, median"
+    )
+    args = parser.parse_args()
+
+    timings = time_import(args.runs)
+    median = statistics.median(timings)
+    print(
+        f"import main: best {min(timings) * 1000:.0f} ms, "
+        f"median {median * 1000:.0f} ms over {args.runs} runs"
+    )
+
+    # Self times do not overlap, so they add up per top-level package
+    packages: dict[str, int] = {}
+    for name, self_us, _ in import_breakdown():
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    print(f"\n{'package':<30} {'import ms':>10}")
+    for package, self_us in sorted(packages.items(), key=lambda p: -p[1])[: args.top]:
+        print(f"{package:<30} {self_us / 1000:>10.1f}")
+
+    if median > args.budget:
+        print(f"\nOver the cold-start budget of {args.budget * 1000:.0f} ms")
+        sys.exit(1)
+    print(f"\nWithin the cold-start budget of {args.budget * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Cost of the stream payload codecs of `redis_handlers.codecs`.
+
+    python -m benchmarks.stream_codecs
+
+For each codec: encode and decode time per message, and the size of the
+fields of one message. When the Redis server of the `.env` is reachable,
+also the `MEMORY USAGE` of a stream of `STREAM_LENGTH` messages, per message.
+The stream is written under a `benchmark:` key and deleted afterwards.
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.env_reader import EnvReader
+from redis_handlers.codecs import (
+    CODECS,
+    USER_VALIDATION_JOB_COMMAND,
+    Fields,
+    decode_fields,
+)
+from redis_handlers.payloads import UserValidationJobCommand
+
+MESSAGES = 10_000
+STREAM_LENGTH = 10_000
+REPEATS = 5
+
+
+def make_payloads(count: int) -> list[UserValidationJobCommand]:
+    return [
+        {"job_id": str(uuid.uuid4()), "command": "create" if i % 2 else "delete"}
+        for i in range(count)
+    ]
+
+
+def best_of(func: Callable[[], Any]) -> float:
+    timings: list[float] = []
+    for _ in range(REPEATS):
+        started_at = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def as_stored(fields: Fields) -> dict[bytes, bytes]:
+    """The fields as a consumer reads them back"""
+    return {
+        (k if isinstance(k, bytes) else str(k).encode()): (
+            v if isinstance(v, bytes) else str(v).encode()
+        )
+        for k, v in fields.items()
+    }
+
+
+async def stream_memory(encoded: list[Fields]) -> float | None:
+    redis = Redis(
+        host=EnvReader.REDIS_HOST, port=EnvReader.REDIS_PORT, db=EnvReader.REDIS_DB
+    )
+    key = f"benchmark:stream_codecs:{uuid.uuid4().hex}"
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for fields in encoded[:STREAM_LENGTH]:
+                pipe.xadd(key, fields)
+            await pipe.execute()
+        usage = await redis.memory_usage(key, samples=0)
+        return usage / STREAM_LENGTH if usage else None
+    except (RedisError, OSError):
+        return None
+    finally:
+        try:
+            await redis.delete(key)
+        except (RedisError, OSError):
+            pass
+        await redis.aclose()
+
+
+async def main() -> None:
+    payloads = make_payloads(max(MESSAGES, STREAM_LENGTH))
+    print(
+        f"{'codec':>7} {'encode us':>10} {'decode us':>10} "
+        f"{'field bytes':>12} {'stream B/msg':>13}"
+    )
+    for name, codec in CODECS.items():
+        encoded = [codec.encode(USER_VALIDATION_JOB_COMMAND, p) for p in payloads]
+        stored = [as_stored(fields) for fields in encoded]
+        assert [decode_fields(fields) for fields in stored[:100]] == payloads[:100]
+
+        # Bound as defaults, so each lambda keeps the codec of its iteration
+        encode_time = best_of(
+            lambda codec=codec: [
+                codec.encode(USER_VALIDATION_JOB_COMMAND, p)
+                for p in payloads[:MESSAGES]
+            ]
+        )
+        decode_time = best_of(
+            lambda stored=stored: [decode_fields(f) for f in stored[:MESSAGES]]
+        )
+        field_bytes = sum(
+            len(k) + len(v) for fields in stored for k, v in fields.items()
+        ) / len(stored)
+        memory = await stream_memory(encoded)
+
+        print(
+            f"{name:>7} {encode_time / MESSAGES * 1e6:>10.2f} "
+            f"{decode_time / MESSAGES * 1e6:>10.2f} {field_bytes:>12.1f} "
+            f"{f'{memory:.1f}' if memory else 'n/a':>13}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,12 +1,18 @@
 from typing import Any
 
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 from sqlalchemy import Boolean, Integer, String, Text, select
 from sqlalchemy.orm import Mapped, mapped_column
 
-from models.admin_settings import AdminSettingsOutput
+from app.logs_config import get_logger
+from models.admin_settings import AdminSettingsOutput, AdminSettingsSnapshot
+from redis_handlers.broadcast import broadcaster
 
 from .base import Base
-from .session import async_session
+from .session import UnitOfWork, unit_of_work
+
+logger = get_logger()
 
 
 class AdminSettings(Base):
@@ -35,52 +41,62 @@ class AdminSettings(Base):
     backup_frequency: Mapped[str] = mapped_column(String(20), default="daily")
 
     @classmethod
-    async def get_settings(cls) -> "AdminSettings":
+    async def get_settings(cls, uow: UnitOfWork | None = None) -> "AdminSettings":
         """
         Get the admin settings from database. Creates default settings if none exist.
         There will only be one row in the admin_settings table.
         """
-        async with async_session() as session:
+        async with unit_of_work(uow) as work:
             # Try to get existing settings
-            result = await session.execute(select(cls).limit(1))
+            result = await work.session.execute(select(cls).limit(1))
             settings = result.scalar_one_or_none()
 
             if settings is None:
                 # Create default settings if none exist
                 settings = cls()
-                session.add(settings)
-                await session.commit()
-                await session.refresh(settings)
+                work.session.add(settings)
+                await work.session.flush()
 
-            return settings
+        return settings
 
     @classmethod
-    async def update_settings(cls, **kwargs: Any) -> "AdminSettings":
+    async def update_settings(
+        cls, uow: UnitOfWork | None = None, **kwargs: Any
+    ) -> "AdminSettings":
         """
         Update admin settings with provided values.
 
         Args:
+            uow (UnitOfWork | None): The unit of work of the request, if any
             **kwargs: Settings attributes to update
 
         Returns:
             AdminSettings: The updated settings object
         """
-        settings = await cls.get_settings()
+        async with unit_of_work(uow) as work:
+            result = await work.session.execute(select(cls).limit(1).with_for_update())
+            settings = result.scalar_one_or_none()
 
-        # Update settings attributes
-        for key, value in kwargs.items():
-            if hasattr(settings, key):
-                setattr(settings, key, value)
+            if settings is None:
+                settings = cls()
+                work.session.add(settings)
 
-        # Save changes to database
-        async with async_session() as session:
-            async with session.begin():
-                session.add(settings)
-                await session.commit()
-                await session.refresh(settings)
+            # Update settings attributes
+            for key, value in kwargs.items():
+                if hasattr(settings, key):
+                    setattr(settings, key, value)
+            await work.session.flush()
+
+            # Swap the in-memory snapshot on every worker, once committed
+            work.after_commit(lambda: settings_store.publish(settings))
 
         return settings
 
+    @classmethod
+    async def get_snapshot(cls) -> AdminSettingsSnapshot:
+        """Get the in-memory settings snapshot, without a database round trip"""
+        return await settings_store.get()
+
     # Individual update methods for app settings
     @classmethod
     async def update_app_name(cls, app_name: str) -> "AdminSettings":
@@ -167,3 +183,90 @@ class AdminSettings(Base):
             debug_mode=self.debug_mode,
             backup_frequency=self.backup_frequency,
         )
+
+
+class AdminSettingsStore:
+    """
+    Holds the current `AdminSettingsSnapshot` of the worker.
+
+    The snapshot is loaded at startup and replaced whenever `update_settings`
+    commits. The new version number is broadcast so that every other worker
+    reloads it. Version numbers come from Redis when it is attached, so they
+    are comparable across workers.
+    """
+
+    CHANNEL = "admin_settings.updated"
+    VERSION_KEY = "admin_settings:version"
+
+    def __init__(self) -> None:
+        self.redis: Redis | None = None
+        self._snapshot: AdminSettingsSnapshot | None = None
+        self._local_version = 0
+
+        # Metrics
+        self.reloads = 0
+
+        broadcaster.subscribe(self.CHANNEL, self._on_update)
+
+    def attach(self, redis: Redis) -> None:
+        self.redis = redis
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version if self._snapshot else -1
+
+    async def get(self) -> AdminSettingsSnapshot:
+        if self._snapshot is None:
+            return await self.load()
+        return self._snapshot
+
+    async def load(self, version: int | None = None) -> AdminSettingsSnapshot:
+        """(Re)load the snapshot from the database"""
+        if version is None:
+            version = await self._read_version()
+        settings = await AdminSettings.get_settings()
+        self.reloads += 1
+        return self._swap(settings, version)
+
+    async def publish(self, settings: AdminSettings) -> None:
+        version = await self._next_version()
+        self._swap(settings, version)
+        await broadcaster.publish(self.CHANNEL, str(version))
+
+    async def _on_update(self, message: str) -> None:
+        version = int(message)
+        if version > self.version:
+            await self.load(version)
+
+    def _swap(self, settings: AdminSettings, version: int) -> AdminSettingsSnapshot:
+        snapshot = AdminSettingsSnapshot(
+            version=version, **settings.output_version().model_dump()
+        )
+        # Never go back to an older version if updates arrive out of order
+        if self._snapshot is None or version >= self._snapshot.version:
+            self._snapshot = snapshot
+            logger.debug("Admin settings snapshot is now at version %s", version)
+        return self._snapshot
+
+    async def _read_version(self) -> int:
+        if self.redis is not None:
+            try:
+                return int(await self.redis.get(self.VERSION_KEY) or 0)
+            except RedisError as e:
+                logger.warning(f"Could not read the admin settings version: {e}")
+        return self._local_version
+
+    async def _next_version(self) -> int:
+        if self.redis is not None:
+            try:
+                return int(await self.redis.incr(self.VERSION_KEY))
+            except RedisError as e:
+                logger.warning(f"Could not bump the admin settings version: {e}")
+        self._local_version = max(self._local_version, self.version) + 1
+        return self._local_version
+
+    def stats(self) -> dict[str, int]:
+        return {"version": self.version, "reloads": self.reloads}
+
+
+settings_store = AdminSettingsStore()
@@ -0,0 +1,229 @@
+"""
+Versioned schema migrations, applied out of band with:
+
+    python manage.py migrate [--status]
+
+Applied versions are recorded in `schema_migrations`. Workers never change
+the schema, they only check at startup that it is up to date (`check_schema`).
+
+Version 1 creates the tables of the current models, so the later
+migrations must be idempotent (`IF NOT EXISTS`): on a new database, what
+they add may already be there. Migrations marked non-transactional run in
+autocommit mode, e.g. for `CREATE INDEX CONCURRENTLY`, which does not lock
+the table against writes.
+"""
+
+from typing import Awaitable, Callable, NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.env_reader import EnvReader
+from app.logs_config import get_logger
+
+# Registers every table on `Base.metadata`
+from . import admin_settings, stored_file, user  # noqa: F401
+from .base import Base
+from .session import engine, ensure_database_exists
+
+logger = get_logger()
+
+# Serializes concurrent `migrate` runs, e.g. from several deploy jobs
+ADVISORY_LOCK_ID = 72_101_001
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[AsyncConnection], Awaitable[None]]
+    transactional: bool = True
+
+
+class SchemaOutdatedError(RuntimeError):
+    """The database is behind the migrations of the code"""
+
+
+class MigrationError(RuntimeError):
+    """A migration that cannot be applied to the current data"""
+
+
+async def _create_tables(conn: AsyncConnection) -> None:
+    await conn.run_sync(Base.metadata.create_all)
+
+
+async def create_index_concurrently(
+    conn: AsyncConnection, name: str, definition: str, unique: bool = False
+) -> None:
+    """
+    `CREATE [UNIQUE] INDEX CONCURRENTLY IF NOT EXISTS name definition`. An
+    index left invalid by an interrupted build is dropped and built again.
+    """
+    invalid = await conn.scalar(
+        text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    )
+    if invalid:
+        logger.warning(f"Rebuilding the invalid index {name}")
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    await conn.execute(
+        text(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} {definition}")
+    )
+
+
+async def _user_indexes(conn: AsyncConnection) -> None:
+    """Keyset pagination, filters and email prefix search of the admin user list"""
+    await create_index_concurrently(
+        conn, "ix_users_created_at_id", "ON users (created_at, id)"
+    )
+    await create_index_concurrently(
+        conn,
+        "ix_users_admins_created_at_id",
+        "ON users (created_at, id) WHERE is_admin",
+    )
+    await create_index_concurrently(
+        conn,
+        "ix_users_blocked_created_at_id",
+        "ON users (created_at, id) WHERE is_blocked",
+    )
+    await create_index_concurrently(
+        conn, "ix_users_lower_email_pattern", "ON users (lower(email) text_pattern_ops)"
+    )
+
+
+async def _unique_user_email(conn: AsyncConnection) -> None:
+    """One account per email, whatever its case. Used by every login and signup"""
+    duplicates = (
+        await conn.execute(
+            text(
+                "SELECT lower(email), count(*) FROM users "
+                "GROUP BY lower(email) HAVING count(*) > 1 LIMIT 10"
+            )
+        )
+    ).all()
+    if duplicates:
+        raise MigrationError(
+            "Merge or rename the users sharing an email before migrating: "
+            + ", ".join(f"{email} ({count})" for email, count in duplicates)
+        )
+    await create_index_concurrently(
+        conn, "ux_users_lower_email", "ON users (lower(email))", unique=True
+    )
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "create_tables", _create_tables),
+    Migration(2, "user_indexes", _user_indexes, transactional=False),
+    Migration(3, "unique_user_email", _unique_user_email, transactional=False),
+)
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def current_version(conn: AsyncConnection) -> int:
+    """The last applied version, 0 for a database never migrated"""
+    try:
+        return int(
+            await conn.scalar(text("SELECT max(version) FROM schema_migrations")) or 0
+        )
+    except ProgrammingError:
+        # No `schema_migrations` table yet
+        await conn.rollback()
+        return 0
+
+
+async def check_schema() -> int:
+    """
+    Startup check of the workers: a single query, raises `SchemaOutdatedError`
+    when migrations are pending. A database ahead of the code is accepted, as
+    during a rolling deploy.
+    """
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+
+    if version < LATEST_VERSION:
+        raise SchemaOutdatedError(
+            f"The database schema is at version {version}, the code needs "
+            f"{LATEST_VERSION}. Run `python manage.py migrate` first."
+        )
+    if version > LATEST_VERSION:
+        logger.warning(
+            f"The database schema is at version {version}, ahead of the code "
+            f"({LATEST_VERSION})"
+        )
+    return version
+
+
+async def _record(conn: AsyncConnection, migration: Migration) -> None:
+    await conn.execute(
+        text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+        {"version": migration.version, "name": migration.name},
+    )
+
+
+async def migrate() -> list[Migration]:
+    """Apply the pending migrations in order, return them"""
+    await ensure_database_exists(
+        EnvReader.DATABASE_USER,
+        EnvReader.DATABASE_PASSWORD,
+        EnvReader.DATABASE_HOST,
+        EnvReader.DATABASE_PORT,
+        EnvReader.DATABASE_NAME,
+    )
+
+    applied: list[Migration] = []
+    async with engine.connect() as lock_conn:
+        autocommit_lock = await lock_conn.execution_options(
+            isolation_level="AUTOCOMMIT"
+        )
+        await autocommit_lock.execute(
+            text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID}
+        )
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text(
+                        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                        "version integer PRIMARY KEY, "
+                        "name text NOT NULL, "
+                        "applied_at timestamptz NOT NULL DEFAULT now())"
+                    )
+                )
+                version = await current_version(conn)
+
+            for migration in MIGRATIONS:
+                if migration.version <= version:
+                    continue
+                logger.info(
+                    f"Applying migration {migration.version} {migration.name} ..."
+                )
+                if migration.transactional:
+                    async with engine.begin() as conn:
+                        await migration.apply(conn)
+                        await _record(conn, migration)
+                else:
+                    async with engine.connect() as conn:
+                        autocommit = await conn.execution_options(
+                            isolation_level="AUTOCOMMIT"
+                        )
+                        await migration.apply(autocommit)
+                        await _record(autocommit, migration)
+                applied.append(migration)
+        finally:
+            await autocommit_lock.execute(
+                text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID}
+            )
+
+    logger.info(f"The database schema is at version {LATEST_VERSION}")
+    return applied
+
+
+async def status() -> list[tuple[Migration, bool]]:
+    """Every migration, and whether it is applied"""
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+    return [(migration, migration.version <= version) for migration in MIGRATIONS]
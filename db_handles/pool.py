@@ -0,0 +1,66 @@
+import time
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    `AsyncAdaptedQueuePool` that records how long checkouts take and how close
+    the pool gets to its limit (`pool_size + max_overflow`).
+
+    A checkout is counted as a wait when it took longer than `WAIT_THRESHOLD`,
+    i.e. when it had to wait for a connection to be returned or created.
+    """
+
+    WAIT_THRESHOLD = 0.001
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.total_checkout_time = 0.0
+        self.max_checkout_time = 0.0
+        self.peak_checked_out = 0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started_at = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        elapsed = time.perf_counter() - started_at
+
+        self.checkouts += 1
+        self.total_checkout_time += elapsed
+        self.max_checkout_time = max(self.max_checkout_time, elapsed)
+        if elapsed > self.WAIT_THRESHOLD:
+            self.waits += 1
+        self.peak_checked_out = max(self.peak_checked_out, self.checkedout())
+        return entry
+
+    @property
+    def capacity(self) -> int:
+        return self.size() + max(self._max_overflow, 0)
+
+    def stats(self) -> dict[str, Any]:
+        checked_out = self.checkedout()
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": checked_out,
+            "checked_in": self.checkedin(),
+            "overflow": self.overflow(),
+            "peak_checked_out": self.peak_checked_out,
+            "saturation": checked_out / self.capacity if self.capacity else 0.0,
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "avg_checkout_ms": self.total_checkout_time / self.checkouts * 1000
+            if self.checkouts
+            else 0.0,
+            "max_checkout_ms": self.max_checkout_time * 1000,
+        }
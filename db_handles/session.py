@@ -1,11 +1,21 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, cast
+
 import asyncpg  # type: ignore
-from sqlalchemy import text
+from sqlalchemy import Select, event, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.expression import ClauseElement, Executable
 
 from app.env_reader import EnvReader
 from app.logs_config import get_logger
+from app.metrics import registry
 
-from .base import Base
+from .pool import InstrumentedPool
 
 logger = get_logger()
 
@@ -18,12 +28,84 @@ def get_main_db_url(include_asyncpg: bool = True) -> str:
 
 
 engine = create_async_engine(
-    get_main_db_url(),
+    get_main_db_url()
+    + f"?prepared_statement_cache_size={EnvReader.DB_STATEMENT_CACHE_SIZE}",
     echo=False,
+    poolclass=InstrumentedPool,
+    pool_size=EnvReader.DB_POOL_SIZE,
+    max_overflow=EnvReader.DB_MAX_OVERFLOW,
+    pool_timeout=EnvReader.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=EnvReader.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=EnvReader.DB_POOL_PRE_PING,
+    connect_args={"statement_cache_size": EnvReader.DB_STATEMENT_CACHE_SIZE},
 )
 async_session = async_sessionmaker(engine, expire_on_commit=False, autoflush=True)
 
 
+class UnitOfWork:
+    """
+    A session and its transaction, shared by every database call of a request
+    and committed once at the end.
+
+    Side effects that must only happen once the changes are visible to other
+    workers, like invalidating the user cache, are registered with
+    `after_commit` and run after the commit. They are dropped on rollback.
+    Those registered with `after_rollback` undo work done outside the
+    database, and run if the transaction is rolled back or fails to commit.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self._after_commit: list[Callable[[], Awaitable[Any]]] = []
+        self._after_rollback: list[Callable[[], Awaitable[Any]]] = []
+
+    def after_commit(self, callback: Callable[[], Awaitable[Any]]) -> None:
+        self._after_commit.append(callback)
+
+    def after_rollback(self, callback: Callable[[], Awaitable[Any]]) -> None:
+        self._after_rollback.append(callback)
+
+    async def _settle(self, committed: bool) -> None:
+        after_commit, self._after_commit = self._after_commit, []
+        after_rollback, self._after_rollback = self._after_rollback, []
+        for callback in after_commit if committed else after_rollback:
+            await callback()
+
+    async def commit(self) -> None:
+        try:
+            await self.session.commit()
+        except BaseException:
+            await self._settle(committed=False)
+            raise
+        await self._settle(committed=True)
+
+    async def rollback(self) -> None:
+        try:
+            await self.session.rollback()
+        finally:
+            await self._settle(committed=False)
+
+
+@asynccontextmanager
+async def unit_of_work(uow: UnitOfWork | None = None) -> AsyncIterator[UnitOfWork]:
+    """
+    Use `uow` when given, its owner commits it. Otherwise open a new unit of
+    work, committed when the block exits and rolled back if it raises.
+    """
+    if uow is not None:
+        yield uow
+        return
+
+    async with async_session() as session:
+        work = UnitOfWork(session)
+        try:
+            yield work
+        except BaseException:
+            await work.rollback()
+            raise
+        await work.commit()
+
+
 def _quote_ident(name: str) -> str:
     # Safe quoting for identifiers like database names
     return '"' + name.replace('"', '""') + '"'
@@ -69,22 +151,125 @@ async def ensure_database_exists(
         await conn.close()  # type: ignore
 
 
+class Explain(Executable, ClauseElement):
+    """`EXPLAIN (FORMAT JSON)` of a statement, with its bound parameters"""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select[Any]) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler: SQLCompiler, **kw: Any) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def estimate_row_count(session: AsyncSession, statement: Select[Any]) -> int:
+    """
+    The number of rows the planner expects `statement` to return, from the
+    table statistics. Costs a planning pass, without running the query.
+    """
+    raw = (await session.execute(Explain(statement))).scalar_one()
+    plan = json.loads(raw) if isinstance(raw, str) else raw
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
 async def run_trigger_sql(session: AsyncSession, sql: str) -> None:
     await session.execute(text(sql))
     await session.commit()
 
 
-async def init_db() -> None:
-    logger.info("Initializing the database ...")
-    await ensure_database_exists(
-        EnvReader.DATABASE_USER,
-        EnvReader.DATABASE_PASSWORD,
-        EnvReader.DATABASE_HOST,
-        EnvReader.DATABASE_PORT,
-        EnvReader.DATABASE_NAME,
+def get_pool_stats() -> dict[str, Any]:
+    return cast(InstrumentedPool, engine.pool).stats()
+
+
+QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds", "Time to execute a SQL statement"
+)
+POOL_CHECKED_OUT = registry.gauge("db_pool_checked_out", "Database connections in use")
+POOL_CAPACITY = registry.gauge(
+    "db_pool_capacity", "Database connections allowed, pool size and overflow"
+)
+POOL_CHECKOUTS = registry.counter(
+    "db_pool_checkouts_total", "Database connections taken from the pool"
+)
+POOL_WAITS = registry.counter(
+    "db_pool_waits_total", "Checkouts that waited for a database connection"
+)
+POOL_TIMEOUTS = registry.counter(
+    "db_pool_timeouts_total", "Checkouts that timed out waiting for a connection"
+)
+
+
+@registry.collect_with
+def collect_pool_metrics() -> None:
+    pool = cast(InstrumentedPool, engine.pool)
+    POOL_CHECKED_OUT.set(pool.checkedout())
+    POOL_CAPACITY.set(pool.capacity)
+    POOL_CHECKOUTS.set_total(pool.checkouts)
+    POOL_WAITS.set_total(pool.waits)
+    POOL_TIMEOUTS.set_total(pool.timeouts)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    if context is not None:
+        context.query_started_at = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _observe_query_time(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    started_at = getattr(context, "query_started_at", None)
+    if started_at is not None:
+        QUERY_DURATION.observe(time.perf_counter() - started_at)
+
+
+async def prewarm_pool(count: int = EnvReader.DB_POOL_PREWARM) -> None:
+    """Open `count` connections at once, so the first requests do not pay for them"""
+    pool = cast(InstrumentedPool, engine.pool)
+    if count < 0:
+        count = EnvReader.DB_POOL_SIZE
+    count = min(count, pool.capacity)
+    if count == 0:
+        return
+
+    remaining = count
+    all_settled = asyncio.Event()
+
+    def settle() -> None:
+        nonlocal remaining
+        remaining -= 1
+        if remaining == 0:
+            all_settled.set()
+
+    async def open_connection() -> None:
+        try:
+            conn = await engine.connect()
+        except Exception:
+            settle()
+            raise
+        try:
+            await conn.execute(text("SELECT 1"))
+        finally:
+            settle()
+            # Held until every connection is open, so that none is reused
+            await all_settled.wait()
+            await conn.close()
+
+    results = await asyncio.gather(
+        *(open_connection() for _ in range(count)), return_exceptions=True
     )
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures:
+        logger.warning(f"Could not prewarm {len(failures)} connections: {failures[0]}")
+    logger.info(f"Prewarmed {count - len(failures)} database connections")
 
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
 
-    logger.info("Database initialized!")
+async def close_db() -> None:
+    await engine.dispose()
+    logger.info("Database connections closed")
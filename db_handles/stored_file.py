@@ -0,0 +1,127 @@
+from datetime import datetime
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.blob_store import blob_store
+from app.uploads import ReceivedUpload
+
+from .base import Base
+from .session import UnitOfWork, unit_of_work
+
+
+class Blob(Base):
+    """A stored file content, shared by every `StoredFile` with the same SHA-256"""
+
+    __tablename__ = "blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_type: Mapped[str] = mapped_column(String(255), nullable=False)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+
+class StoredFile(Base):
+    """A file ID handed out to a client, pointing to a `Blob`"""
+
+    __tablename__ = "stored_files"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    sha256: Mapped[str] = mapped_column(
+        String(64), ForeignKey("blobs.sha256"), nullable=False, index=True
+    )
+    # What the file was uploaded as, e.g. "file" or "avatar"
+    kind: Mapped[str] = mapped_column(String(20), nullable=False, default="file")
+    filename: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+    blob: Mapped[Blob] = relationship(Blob, lazy="joined")
+
+    @property
+    def path(self) -> Path:
+        return blob_store.path(self.sha256)
+
+    @classmethod
+    async def create(
+        cls, upload: ReceivedUpload, kind: str = "file", uow: UnitOfWork | None = None
+    ) -> "StoredFile":
+        """
+        Store an upload received in `blob_store.temp_dir` and return its file.
+
+        The blob row is upserted first, which takes its row lock until the
+        commit. A concurrent `delete` of the last reference therefore either
+        finishes before, or sees the new reference and keeps the blob. A new
+        blob is removed again if the upload is rolled back.
+        """
+        stored_file = cls(
+            id=str(uuid4()), sha256=upload.sha256, kind=kind, filename=upload.filename
+        )
+        async with unit_of_work(uow) as work:
+            stmt = (
+                insert(Blob)
+                .values(
+                    sha256=upload.sha256,
+                    size=upload.size,
+                    content_type=upload.content_type,
+                    ref_count=1,
+                    created_at=datetime.now(),
+                )
+                .on_conflict_do_update(
+                    index_elements=[Blob.sha256],
+                    set_={"ref_count": Blob.ref_count + 1},
+                )
+                .returning(Blob.ref_count)
+            )
+            ref_count = (await work.session.execute(stmt)).scalar_one()
+            if ref_count == 1:
+                # The blob row is new: rolled back, nothing points to the file
+                work.after_rollback(lambda: blob_store.discard(upload.sha256))
+            # Also restores the blob if its file went missing
+            await blob_store.put(upload)
+            work.session.add(stored_file)
+            await work.session.flush()
+
+            await work.session.refresh(stored_file, ["blob"])
+
+        return stored_file
+
+    @classmethod
+    async def get(
+        cls, file_id: str, uow: UnitOfWork | None = None
+    ) -> "StoredFile | None":
+        async with unit_of_work(uow) as work:
+            return await work.session.get(cls, file_id)
+
+    @classmethod
+    async def delete(cls, file_id: str, uow: UnitOfWork | None = None) -> bool:
+        """Delete a file, and its blob if it was the last reference to it"""
+        async with unit_of_work(uow) as work:
+            session = work.session
+            stored_file = await session.get(cls, file_id)
+            if stored_file is None:
+                return False
+            sha256 = stored_file.sha256
+            await session.delete(stored_file)
+
+            result = await session.execute(
+                select(Blob)
+                .where(Blob.sha256 == sha256)
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            )
+            blob = result.scalar_one()
+            blob.ref_count -= 1
+            if blob.ref_count <= 0:
+                await session.delete(blob)
+                # Moved aside under the row lock, so no upload can claim it
+                # meanwhile, and only deleted once the rows are gone for good
+                tombstone = await blob_store.tombstone(sha256)
+                if tombstone is not None:
+                    work.after_commit(lambda: blob_store.purge(sha256, tombstone))
+                    work.after_rollback(lambda: blob_store.restore(sha256, tombstone))
+
+        return True
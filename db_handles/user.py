@@ -1,17 +1,101 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any
-
-from sqlalchemy import Boolean, DateTime, Integer, String, select
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-
-from app.utils import hash_password
-from models.user import UserPublic
+from typing import Any, AsyncIterator, Sequence
+
+from sqlalchemy import (
+    Boolean,
+    ColumnElement,
+    DateTime,
+    Index,
+    Integer,
+    Row,
+    String,
+    any_,
+    delete,
+    func,
+    inspect,
+    literal,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import (
+    Mapped,
+    make_transient_to_detached,
+    mapped_column,
+    relationship,
+)
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from app.password_hasher import password_hasher
+from models.user import UserPublic, UserPublicRow
 
 from .base import Base
-from .session import async_session
+from .session import (
+    UnitOfWork,
+    async_session,
+    engine,
+    estimate_row_count,
+    unit_of_work,
+)
 from .settings import UserSettings
+from .user_cache import UserSnapshot, user_cache
+from .user_stats import UserCounts, user_counters
+
+_CREATE_IMPORT_TABLE = text(
+    """
+    CREATE TEMPORARY TABLE user_import (
+        line bigint,
+        email text,
+        hashed_password text,
+        full_name text,
+        is_admin boolean,
+        is_blocked boolean,
+        created_at timestamp
+    ) ON COMMIT DROP
+    """
+)
+
+_MERGE_IMPORT_TABLE = text(
+    """
+    WITH candidates AS (
+        SELECT DISTINCT ON (lower(email)) *
+        FROM user_import
+        ORDER BY lower(email), line
+    ), inserted AS (
+        INSERT INTO users
+            (email, hashed_password, full_name, is_admin, is_blocked, created_at)
+        SELECT email, hashed_password, full_name, is_admin, is_blocked, created_at
+        FROM candidates c
+        WHERE NOT EXISTS (
+            SELECT 1 FROM users u WHERE lower(u.email) = lower(c.email)
+        )
+        -- Emails taken by a concurrent signup
+        ON CONFLICT DO NOTHING
+        RETURNING id, is_admin, is_blocked
+    ), settings AS (
+        INSERT INTO user_settings (user_id) SELECT id FROM inserted
+    )
+    SELECT
+        count(*),
+        count(*) FILTER (WHERE is_admin),
+        count(*) FILTER (WHERE is_blocked)
+    FROM inserted
+    """
+)
+
+
+def _id_array(ids: Sequence[int]) -> Any:
+    """`ids` as a single array parameter, whatever their number"""
+    return literal(list(ids), ARRAY(Integer))
+
+
+# Never put in the user cache, whose Redis tier is shared by every worker
+UNCACHED_COLUMNS = frozenset({"hashed_password"})
 
 
 class User(Base):
@@ -33,6 +117,32 @@ class User(Base):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        # One account per email, whatever its case, see `get_by_email`
+        Index("ux_users_lower_email", func.lower(text("email")), unique=True),
+        # Keyset pagination of the admin user list, see `public_page`
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Admins and blocked users are few, their pages read small indexes
+        Index(
+            "ix_users_admins_created_at_id",
+            "created_at",
+            "id",
+            postgresql_where=text("is_admin"),
+        ),
+        Index(
+            "ix_users_blocked_created_at_id",
+            "created_at",
+            "id",
+            postgresql_where=text("is_blocked"),
+        ),
+        # Email prefix search, `LIKE 'prefix%'` whatever the database collation
+        Index(
+            "ix_users_lower_email_pattern",
+            func.lower(text("email")).label("lower_email"),
+            postgresql_ops={"lower_email": "text_pattern_ops"},
+        ),
+    )
+
     @classmethod
     async def create(
         cls,
@@ -41,250 +151,551 @@ class User(Base):
         full_name: str,
         is_admin: bool = False,
         is_blocked: bool = False,
+        uow: UnitOfWork | None = None,
     ) -> "User":
         user = cls(
             email=email,
-            hashed_password=hash_password(password),
+            hashed_password=await password_hasher.hash(password),
             full_name=full_name,
             is_admin=is_admin,
             is_blocked=is_blocked,
         )
-        async with async_session() as session:
-            async with session.begin():
-                session.add(user)
-                await session.flush()  # Get the user ID
+        # Create default settings for the user
+        user.settings = UserSettings()
+
+        async with unit_of_work(uow) as work:
+            work.session.add(user)
+            await work.session.flush()  # Get the user ID
+            work.after_commit(
+                lambda: user_counters.adjust(
+                    total=1,
+                    admins=int(is_admin),
+                    blocked=int(is_blocked),
+                    active=int(not is_blocked),
+                )
+            )
 
-                # Create default settings for the user
-                user_settings = UserSettings()
-                user.settings = user_settings
-                session.add(user_settings)
+        return user
+
+    @classmethod
+    async def get_by_id(cls, id: int, uow: UnitOfWork | None = None) -> "User | None":
+        async with unit_of_work(uow) as work:
+            return await work.session.get(cls, id)
 
-            await session.commit()
+    @classmethod
+    async def get_cached(cls, id: int, uow: UnitOfWork | None = None) -> "User | None":
+        """
+        Same as `get_by_id`, but served from the user cache when possible.
+        The returned user is detached and can be passed to the mutation methods.
+        """
+        snapshot = await user_cache.get(id)
+        if snapshot is not None:
+            return cls.from_snapshot(snapshot)
+
+        generation = user_cache.generation
+        user = await cls.get_by_id(id, uow=uow)
+        if user is not None:
+            await user_cache.set(id, user.snapshot(), generation)
         return user
 
     @classmethod
-    async def get_by_id(cls, id: int) -> "User | None":
-        async with async_session() as session:
-            result = await session.execute(select(cls).where(cls.id == id))
-            return result.scalar_one_or_none()
+    def from_snapshot(cls, snapshot: UserSnapshot) -> "User":
+        # Entries cached before the hash was left out may still carry it
+        user = cls(**{k: v for k, v in snapshot.items() if k not in UNCACHED_COLUMNS})
+        make_transient_to_detached(user)
+        return user
+
+    def snapshot(self) -> UserSnapshot:
+        """
+        Column values of the user, as stored in the user cache. The password
+        hash is left out, the Redis tier being shared, see `password_hash`.
+        """
+        return {
+            attr.key: getattr(self, attr.key)
+            for attr in inspect(User).column_attrs
+            if attr.key not in UNCACHED_COLUMNS
+        }
+
+    async def password_hash(self, uow: UnitOfWork | None = None) -> str | None:
+        """
+        The password hash of the user, read from the database unless already
+        loaded, since users served from the user cache do not carry it.
+
+        Returns:
+            str | None: The hash, None if the user no longer exists
+        """
+        loaded = inspect(self).dict.get("hashed_password")
+        if loaded is not None:
+            return loaded
+        stmt = select(User.hashed_password).where(User.id == self.id)
+        async with unit_of_work(uow) as work:
+            return (await work.session.execute(stmt)).scalar_one_or_none()
 
     @classmethod
-    async def get_by_email(cls, email: str) -> "User | None":
+    async def get_by_email(
+        cls, email: str, uow: UnitOfWork | None = None
+    ) -> "User | None":
         """
-        Find a user by their email.
+        Find a user by their email, case-insensitively.
 
         Args:
             email (str): The email to search for
+            uow (UnitOfWork | None): The unit of work of the request, if any
 
         Returns:
             User | None: The user if found, None otherwise
         """
-        async with async_session() as session:
-            result = await session.execute(select(cls).where(cls.email == email))
+        stmt = select(cls).where(func.lower(cls.email) == email.lower())
+        async with unit_of_work(uow) as work:
+            result = await work.session.execute(stmt)
             return result.scalar_one_or_none()
 
     @classmethod
-    async def get_all(cls) -> list["User"]:
-        async with async_session() as session:
-            result = await session.execute(select(cls))
+    async def get_all(cls, uow: UnitOfWork | None = None) -> list["User"]:
+        async with unit_of_work(uow) as work:
+            result = await work.session.execute(select(cls))
             return list(result.scalars().all())
 
     @classmethod
-    async def get_count(cls) -> int:
+    def public_filters(
+        cls,
+        is_admin: bool | None = None,
+        is_blocked: bool | None = None,
+        email_prefix: str | None = None,
+    ) -> list[ColumnElement[bool]]:
+        """Filters of the admin user list, each one backed by an index"""
+        filters: list[ColumnElement[bool]] = []
+        if is_admin is not None:
+            filters.append(cls.is_admin == is_admin)
+        if is_blocked is not None:
+            filters.append(cls.is_blocked == is_blocked)
+        if email_prefix:
+            escaped = (
+                email_prefix.lower()
+                .replace("/", "//")
+                .replace("%", "/%")
+                .replace("_", "/_")
+            )
+            filters.append(func.lower(cls.email).like(escaped + "%", escape="/"))
+        return filters
+
+    @classmethod
+    async def public_page(
+        cls,
+        count: int,
+        after: tuple[datetime, int] | None = None,
+        filters: Sequence[ColumnElement[bool]] = (),
+        uow: UnitOfWork | None = None,
+    ) -> list[Row[Any]]:
+        """
+        Up to `count` rows of `public_columns`, newest first, ordered by
+        `(created_at, id)` so that users created at the same instant are
+        neither skipped nor repeated across pages.
+
+        Args:
+            count (int): The maximum number of rows
+            after (tuple[datetime, int] | None): `(created_at, id)` of the last
+                row of the previous page
+            filters (Sequence[ColumnElement[bool]]): From `public_filters`
+            uow (UnitOfWork | None): The unit of work of the request, if any
+        """
+        stmt = (
+            select(*cls.public_columns())
+            .where(*filters)
+            .order_by(cls.created_at.desc(), cls.id.desc())
+            .limit(count)
+        )
+        if after is not None:
+            stmt = stmt.where(tuple_(cls.created_at, cls.id) < tuple_(*after))
+
+        async with unit_of_work(uow) as work:
+            return list((await work.session.execute(stmt)).all())
+
+    @classmethod
+    async def estimate_count(
+        cls,
+        filters: Sequence[ColumnElement[bool]] = (),
+        uow: UnitOfWork | None = None,
+    ) -> int:
+        """Approximate number of users matching `filters`, from the planner"""
+        async with unit_of_work(uow) as work:
+            return await estimate_row_count(
+                work.session, select(cls.id).where(*filters)
+            )
+
+    @classmethod
+    async def stream_public_rows(
+        cls, batch_size: int = 1000
+    ) -> AsyncIterator[Sequence[Row[Any]]]:
+        """
+        Yield the `public_columns` of every user, `batch_size` rows at a time.
+        Rows come from a server-side cursor, so memory stays bounded whatever
+        the size of the table. The cursor holds a connection until exhausted.
+        """
+        stmt = (
+            select(*cls.public_columns())
+            .order_by(cls.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async with async_session() as session:
+            result = await session.stream(stmt)
+            async for rows in result.partitions():
+                yield rows
+
+    @classmethod
+    async def get_count(cls, uow: UnitOfWork | None = None) -> int:
         """
         Get the total count of users in the database.
 
         Returns:
             int: The total number of users
         """
-        async with async_session() as session:
-            result = await session.execute(select(cls))
-            return len(result.scalars().all())
+        async with unit_of_work(uow) as work:
+            result = await work.session.execute(select(func.count()).select_from(cls))
+            return result.scalar_one()
+
+    @classmethod
+    async def count_by_status(cls, uow: UnitOfWork | None = None) -> UserCounts:
+        """
+        Count users by status with a single aggregate query.
+
+        Returns:
+            UserCounts: `total`, `admins`, `blocked` and `active` (not blocked) users
+        """
+        stmt = select(
+            func.count(),
+            func.count().filter(cls.is_admin),
+            func.count().filter(cls.is_blocked),
+        ).select_from(cls)
+        async with unit_of_work(uow) as work:
+            total, admins, blocked = (await work.session.execute(stmt)).one()
+
+        return {
+            "total": total,
+            "admins": admins,
+            "blocked": blocked,
+            "active": total - blocked,
+        }
 
     @classmethod
-    async def get_admin_users(cls) -> list["User"]:
+    async def get_stats(cls) -> UserCounts:
+        """Same as `count_by_status`, read from the maintained counters when possible"""
+        return await user_counters.get(cls.count_by_status)
+
+    @classmethod
+    async def get_admin_users(cls, uow: UnitOfWork | None = None) -> list["User"]:
         """
         Get all admin users from the database.
 
         Returns:
             list[User]: List of users where is_admin is True
         """
-        async with async_session() as session:
-            result = await session.execute(select(cls).where(cls.is_admin == True))  # noqa: E712
+        async with unit_of_work(uow) as work:
+            result = await work.session.execute(select(cls).where(cls.is_admin == True))  # noqa: E712
             return list(result.scalars().all())
 
     @classmethod
-    async def get_unblocked_users(cls) -> list["User"]:
+    async def get_unblocked_users(cls, uow: UnitOfWork | None = None) -> list["User"]:
         """
         Get all unblocked users from the database.
 
         Returns:
             list[User]: List of users where is_blocked is False
         """
-        async with async_session() as session:
-            result = await session.execute(select(cls).where(cls.is_blocked == False))  # noqa: E712
+        async with unit_of_work(uow) as work:
+            result = await work.session.execute(
+                select(cls).where(cls.is_blocked == False)  # noqa: E712
+            )
             return list(result.scalars().all())
 
-    async def make_admin(self) -> bool:
+    @classmethod
+    async def set_flags(
+        cls, ids: Sequence[int], uow: UnitOfWork | None = None, **values: bool
+    ) -> list[int]:
         """
-        Make the user an admin.
+        Set `is_admin` and/or `is_blocked` of many users with one
+        `UPDATE … RETURNING`. The previous values come back with the new ones,
+        read under a row lock, so the user counters are adjusted by what
+        actually changed.
+
+        Args:
+            ids (Sequence[int]): The IDs of the users to update
+            uow (UnitOfWork | None): The unit of work of the request, if any
+            **values: `is_admin` and/or `is_blocked`
 
         Returns:
-            bool: True if the user was successfully made admin, False if user not found
+            list[int]: The IDs of the users that were found
         """
-        async with async_session() as session:
-            async with session.begin():
-                stmt = select(User).where(User.id == self.id)
-                result = await session.execute(stmt)
-                user = result.scalar_one_or_none()
+        previous = (
+            select(cls.id, cls.is_admin, cls.is_blocked)
+            .where(cls.id == any_(_id_array(ids)))
+            .with_for_update()
+            .subquery()
+        )
+        stmt = (
+            update(cls)
+            .where(cls.id == previous.c.id)
+            .values(**values)
+            .returning(
+                cls.id,
+                cls.is_admin,
+                cls.is_blocked,
+                previous.c.is_admin,
+                previous.c.is_blocked,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        async with unit_of_work(uow) as work:
+            rows = (await work.session.execute(stmt)).all()
+            found = [row[0] for row in rows]
+            cls._sync_loaded(work, found, values)
+
+            admins = sum(int(row[1]) - int(row[3]) for row in rows)
+            blocked = sum(int(row[2]) - int(row[4]) for row in rows)
+            if found:
+                work.after_commit(lambda: user_cache.invalidate(*found))
+            if admins or blocked:
+                work.after_commit(
+                    lambda: user_counters.adjust(
+                        admins=admins, blocked=blocked, active=-blocked
+                    )
+                )
+        return found
 
-                if not user:
-                    return False  # User not found
+    @classmethod
+    async def delete_many(
+        cls, ids: Sequence[int], uow: UnitOfWork | None = None
+    ) -> list[int]:
+        """
+        Delete many users with one `DELETE … RETURNING`. Their settings are
+        deleted by the database, through the `ON DELETE CASCADE` foreign key.
 
-                user.is_admin = True
-                session.add(user)
-                await session.commit()
-                return True
+        Returns:
+            list[int]: The IDs of the users that were deleted
+        """
+        stmt = (
+            delete(cls)
+            .where(cls.id == any_(_id_array(ids)))
+            .returning(cls.id, cls.is_admin, cls.is_blocked)
+            .execution_options(synchronize_session=False)
+        )
+        async with unit_of_work(uow) as work:
+            rows = (await work.session.execute(stmt)).all()
+            found = [row[0] for row in rows]
+            for user_id in found:
+                loaded = work.session.identity_map.get(identity_key(cls, user_id))
+                if loaded is not None:
+                    work.session.expunge(loaded)
+
+            admins = sum(int(row[1]) for row in rows)
+            blocked = sum(int(row[2]) for row in rows)
+            if found:
+                work.after_commit(lambda: user_cache.invalidate(*found))
+                work.after_commit(
+                    lambda: user_counters.adjust(
+                        total=-len(found),
+                        admins=-admins,
+                        blocked=-blocked,
+                        active=-(len(found) - blocked),
+                    )
+                )
+        return found
+
+    # Columns of the records given to `copy_in`
+    IMPORT_COLUMNS = (
+        "line",
+        "email",
+        "hashed_password",
+        "full_name",
+        "is_admin",
+        "is_blocked",
+        "created_at",
+    )
 
-    async def remove_admin(self) -> bool:
+    @classmethod
+    async def copy_in(cls, records: Sequence[tuple[Any, ...]]) -> UserCounts:
         """
-        Remove admin permissions from the user.
+        Insert many users at once. The records are sent with `COPY` into a
+        temporary table, then moved by a single `INSERT … SELECT` that skips
+        emails already taken, case-insensitively, keeps the first line of
+        each email and creates the default settings of the new users.
+
+        Args:
+            records (Sequence[tuple]): Tuples of `IMPORT_COLUMNS`
 
         Returns:
-            bool: True if admin permissions were successfully removed, False if user not found
+            UserCounts: Counts of the users that were inserted
         """
-        async with async_session() as session:
-            async with session.begin():
-                stmt = select(User).where(User.id == self.id)
-                result = await session.execute(stmt)
-                user = result.scalar_one_or_none()
+        async with engine.begin() as conn:
+            # Also starts the transaction that the COPY below runs in
+            await conn.execute(_CREATE_IMPORT_TABLE)
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(  # type: ignore[union-attr]
+                "user_import", records=records, columns=cls.IMPORT_COLUMNS
+            )
+            total, admins, blocked = (await conn.execute(_MERGE_IMPORT_TABLE)).one()
+
+        counts: UserCounts = {
+            "total": total,
+            "admins": admins,
+            "blocked": blocked,
+            "active": total - blocked,
+        }
+        await user_counters.adjust(**counts)
+        return counts
 
-                if not user:
-                    return False  # User not found
+    @classmethod
+    def _sync_loaded(
+        cls, uow: UnitOfWork, ids: Sequence[int], values: dict[str, Any]
+    ) -> None:
+        """Apply `values` to the users of `ids` already loaded in the session"""
+        for user_id in ids:
+            loaded = uow.session.identity_map.get(identity_key(cls, user_id))
+            if loaded is not None:
+                for key, value in values.items():
+                    set_committed_value(loaded, key, value)
+
+    async def _set_own_flags(self, uow: UnitOfWork | None, **values: bool) -> bool:
+        if not await User.set_flags([self.id], uow=uow, **values):
+            return False  # User not found
+        # `self` may be a detached copy, e.g. from the user cache
+        for key, value in values.items():
+            set_committed_value(self, key, value)
+        return True
+
+    async def make_admin(self, uow: UnitOfWork | None = None) -> bool:
+        """
+        Make the user an admin.
 
-                user.is_admin = False
-                session.add(user)
-                await session.commit()
-                return True
+        Returns:
+            bool: True if the user was successfully made admin, False if user not found
+        """
+        return await self._set_own_flags(uow, is_admin=True)
 
-    async def block_user(self) -> bool:
+    async def remove_admin(self, uow: UnitOfWork | None = None) -> bool:
         """
-        Block the user.
+        Remove admin permissions from the user.
 
         Returns:
-            bool: True if the user was successfully blocked, False if user not found
+            bool: True if admin permissions were successfully removed,
+                False if user not found
         """
-        async with async_session() as session:
-            async with session.begin():
-                stmt = select(User).where(User.id == self.id)
-                result = await session.execute(stmt)
-                user = result.scalar_one_or_none()
+        return await self._set_own_flags(uow, is_admin=False)
 
-                if not user:
-                    return False  # User not found
+    async def block_user(self, uow: UnitOfWork | None = None) -> bool:
+        """
+        Block the user.
 
-                user.is_blocked = True
-                session.add(user)
-                await session.commit()
-                return True
+        Returns:
+            bool: True if the user was successfully blocked, False if user not found
+        """
+        return await self._set_own_flags(uow, is_blocked=True)
 
-    async def unblock_user(self) -> bool:
+    async def unblock_user(self, uow: UnitOfWork | None = None) -> bool:
         """
         Unblock the user.
 
         Returns:
             bool: True if the user was successfully unblocked, False if user not found
         """
-        async with async_session() as session:
-            async with session.begin():
-                stmt = select(User).where(User.id == self.id)
-                result = await session.execute(stmt)
-                user = result.scalar_one_or_none()
-
-                if not user:
-                    return False  # User not found
-
-                user.is_blocked = False
-                session.add(user)
-                await session.commit()
-                return True
+        return await self._set_own_flags(uow, is_blocked=False)
 
-    async def delete(self) -> None:
+    async def delete(self, uow: UnitOfWork | None = None) -> None:
         """
         Delete the user from the database.
         """
-        async with async_session() as session:
-            async with session.begin():
-                await session.delete(self)
-                await session.commit()
+        await User.delete_many([self.id], uow=uow)
 
-    async def get_settings(self) -> "UserSettings":
+    async def get_settings(self, uow: UnitOfWork | None = None) -> "UserSettings":
         """
         Get or create user settings for this user.
 
         Returns:
             UserSettings: The user's settings object
         """
-        if self.settings is None:
-            # Create new settings if none exist
-            self.settings = UserSettings()
-            async with async_session() as session:
-                async with session.begin():
-                    session.add(self.settings)
-                    await session.commit()
-                    await session.refresh(self.settings)
+        async with unit_of_work(uow) as work:
+            result = await work.session.execute(
+                select(UserSettings).where(UserSettings.user_id == self.id)
+            )
+            settings = result.scalar_one_or_none()
+            if settings is None:
+                # Create new settings if none exist
+                settings = UserSettings(user_id=self.id)
+                work.session.add(settings)
+                await work.session.flush()
 
-        return self.settings
+        return settings
 
-    async def update_settings(self, **kwargs: Any) -> "UserSettings":
+    async def update_settings(
+        self, uow: UnitOfWork | None = None, **kwargs: Any
+    ) -> "UserSettings":
         """
         Update user settings with provided values.
 
         Args:
+            uow (UnitOfWork | None): The unit of work of the request, if any
             **kwargs: Settings attributes to update
 
         Returns:
             UserSettings: The updated settings object
         """
-        settings = await self.get_settings()
+        async with unit_of_work(uow) as work:
+            settings = await self.get_settings(uow=work)
 
-        # Update settings attributes
-        for key, value in kwargs.items():
-            if hasattr(settings, key):
-                setattr(settings, key, value)
-
-        # Save changes to database
-        async with async_session() as session:
-            async with session.begin():
-                session.add(settings)
-                await session.commit()
-                await session.refresh(settings)
+            # Update settings attributes, saved with the unit of work
+            for key, value in kwargs.items():
+                if hasattr(settings, key):
+                    setattr(settings, key, value)
 
         return settings
 
-    async def update_password(self, new_password: str) -> bool:
+    async def update_password(
+        self, new_password: str, uow: UnitOfWork | None = None
+    ) -> bool:
         """
         Update the user's password.
 
         Args:
             new_password (str): The new password to hash and store
+            uow (UnitOfWork | None): The unit of work of the request, if any
 
         Returns:
             bool: True if password was successfully updated, False if user not found
         """
-        async with async_session() as session:
-            async with session.begin():
-                stmt = select(User).where(User.id == self.id)
-                result = await session.execute(stmt)
-                user = result.scalar_one_or_none()
-
-                if not user:
-                    return False  # User not found
-
-                user.hashed_password = hash_password(new_password)
-                session.add(user)
-                await session.commit()
-                return True
+        hashed_password = await password_hasher.hash(new_password)
+        stmt = (
+            update(User)
+            .where(User.id == self.id)
+            .values(hashed_password=hashed_password)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        async with unit_of_work(uow) as work:
+            if (await work.session.execute(stmt)).scalar_one_or_none() is None:
+                return False  # User not found
+
+            values = {"hashed_password": hashed_password}
+            User._sync_loaded(work, [self.id], values)
+            set_committed_value(self, "hashed_password", hashed_password)
+            work.after_commit(lambda: user_cache.invalidate(self.id))
+        return True
+
+    @classmethod
+    def public_columns(cls) -> tuple[Any, ...]:
+        """Columns needed by `public_row`, select them to skip loading ORM objects"""
+        return (cls.id, cls.email, cls.full_name, cls.is_admin, cls.created_at)
+
+    @staticmethod
+    def public_row(row: Row[Any]) -> UserPublicRow:
+        """Build the public version of a user from a row of `public_columns`"""
+        id, email, full_name, is_admin, created_at = row
+        return {
+            "user_id": str(id),
+            "email": email,
+            "full_name": full_name,
+            "is_admin": is_admin,
+            "created_at": int(created_at.timestamp()),
+        }
 
     def public_version(self) -> "UserPublic":
         return UserPublic(
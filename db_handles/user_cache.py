@@ -0,0 +1,140 @@
+import json
+from datetime import datetime
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.cache import TTLCache
+from app.env_reader import EnvReader
+from app.logs_config import get_logger
+from redis_handlers.broadcast import broadcaster
+
+logger = get_logger()
+
+UserSnapshot = dict[str, Any]
+
+
+class UserCache:
+    """
+    Two-tier cache of `users` row snapshots keyed by user id.
+
+    The first tier is an in-process TTL/LRU cache, the second an optional
+    Redis tier shared by all workers. Invalidations are broadcast so every
+    worker drops its local copy as soon as a user changes.
+    """
+
+    CHANNEL = "cache.users.invalidate"
+    KEY_PREFIX = "cache:user:"
+
+    def __init__(self, max_entries: int, ttl_seconds: int, use_redis: bool) -> None:
+        self.local: TTLCache[int, UserSnapshot] = TTLCache(max_entries, ttl_seconds)
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+        self.redis: Redis | None = None
+        # Bumped on every invalidation so a load that raced with a write
+        # does not put a stale snapshot back into the cache
+        self.generation = 0
+
+        # Metrics
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.invalidations = 0
+
+        broadcaster.subscribe(self.CHANNEL, self._on_invalidate)
+
+    def attach(self, redis: Redis) -> None:
+        if self.use_redis:
+            self.redis = redis
+
+    async def get(self, user_id: int) -> UserSnapshot | None:
+        snapshot = self.local.get(user_id)
+        if snapshot is not None or self.redis is None:
+            return snapshot
+
+        generation = self.generation
+        try:
+            raw = await self.redis.get(f"{self.KEY_PREFIX}{user_id}")
+        except RedisError as e:
+            logger.warning(f"User cache redis lookup failed: {e}")
+            return None
+
+        if raw is None:
+            self.redis_misses += 1
+            return None
+
+        self.redis_hits += 1
+        snapshot = self._loads(raw)
+        if generation == self.generation:
+            self.local.set(user_id, snapshot)
+        return snapshot
+
+    async def set(self, user_id: int, snapshot: UserSnapshot, generation: int) -> None:
+        """Cache a snapshot loaded while `self.generation` was `generation`"""
+        if generation != self.generation:
+            return  # The user changed while it was being loaded
+
+        self.local.set(user_id, snapshot)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(
+                f"{self.KEY_PREFIX}{user_id}",
+                self._dumps(snapshot),
+                ex=self.ttl_seconds,
+            )
+        except RedisError as e:
+            logger.warning(f"User cache redis write failed: {e}")
+
+    async def invalidate(self, *user_ids: int) -> None:
+        if not user_ids:
+            return
+
+        if self.redis is not None:
+            try:
+                await self.redis.delete(
+                    *(f"{self.KEY_PREFIX}{user_id}" for user_id in user_ids)
+                )
+            except RedisError as e:
+                logger.warning(f"User cache redis invalidation failed: {e}")
+
+        await broadcaster.publish(
+            self.CHANNEL, ",".join(str(user_id) for user_id in user_ids)
+        )
+
+    def _on_invalidate(self, message: str) -> None:
+        self.generation += 1
+        for user_id in message.split(","):
+            self.local.pop(int(user_id))
+            self.invalidations += 1
+
+    @staticmethod
+    def _dumps(snapshot: UserSnapshot) -> str:
+        return json.dumps(
+            {
+                k: v.isoformat() if isinstance(v, datetime) else v
+                for k, v in snapshot.items()
+            }
+        )
+
+    @staticmethod
+    def _loads(raw: bytes) -> UserSnapshot:
+        snapshot: UserSnapshot = json.loads(raw)
+        snapshot["created_at"] = datetime.fromisoformat(snapshot["created_at"])
+        return snapshot
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "local": self.local.stats(),
+            "redis_enabled": self.redis is not None,
+            "redis_hits": self.redis_hits,
+            "redis_misses": self.redis_misses,
+            "invalidations": self.invalidations,
+        }
+
+
+user_cache = UserCache(
+    max_entries=EnvReader.USER_CACHE_MAX_ENTRIES,
+    ttl_seconds=EnvReader.USER_CACHE_TTL_SECONDS,
+    use_redis=EnvReader.USER_CACHE_USE_REDIS,
+)
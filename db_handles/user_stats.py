@@ -0,0 +1,96 @@
+from typing import Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, WatchError
+
+from app.logs_config import get_logger
+
+logger = get_logger()
+
+UserCounts = dict[str, int]
+
+
+class UserCounters:
+    """
+    User counts kept in a Redis hash, so the admin dashboard reads them in O(1).
+
+    The hash is seeded from SQL aggregates at startup, and again whenever a
+    field is missing. The `User` mutation methods adjust it afterwards. Without
+    Redis every read falls back to the SQL aggregates. A complete hash is never
+    overwritten by a seed, only dropped by `reset` when an adjustment failed.
+
+    Fields: `total`, `admins`, `blocked` and `active` (users that are not blocked).
+    """
+
+    KEY = "stats:users"
+    FIELDS = ("total", "admins", "blocked", "active")
+
+    def __init__(self) -> None:
+        self.redis: Redis | None = None
+
+    def attach(self, redis: Redis) -> None:
+        self.redis = redis
+
+    async def seed(self, counts: UserCounts) -> None:
+        """
+        Store `counts` unless the hash is already complete: other workers keep
+        adjusting it, and `counts` is stale by then. A hash left partial by
+        adjustments made while it was missing is replaced. The seed is given
+        up if the hash changes meanwhile, the next read seeds it again.
+        """
+        if self.redis is None:
+            return
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(self.KEY)
+                if await pipe.hlen(self.KEY) >= len(self.FIELDS):
+                    return
+                pipe.multi()
+                pipe.delete(self.KEY)
+                pipe.hset(self.KEY, mapping=counts)  # type: ignore[arg-type]
+                await pipe.execute()
+        except WatchError:
+            logger.info("The user counters changed while being seeded, skipped")
+        except RedisError as e:
+            logger.warning(f"Could not seed the user counters: {e}")
+
+    async def adjust(self, **deltas: int) -> None:
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if self.redis is None or not deltas:
+            return
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for field, delta in deltas.items():
+                    pipe.hincrby(self.KEY, field, delta)
+                await pipe.execute()
+        except RedisError as e:
+            # Drop the hash so the next read reseeds it from the database
+            logger.warning(f"Could not adjust the user counters: {e}")
+            await self.reset()
+
+    async def reset(self) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.delete(self.KEY)
+        except RedisError as e:
+            logger.warning(f"Could not reset the user counters: {e}")
+
+    async def get(self, count: Callable[[], Awaitable[UserCounts]]) -> UserCounts:
+        """Return the counters, computing them with `count` if they are not stored"""
+        if self.redis is not None:
+            try:
+                values = await self.redis.hmget(self.KEY, list(self.FIELDS))
+                if all(value is not None for value in values):
+                    return {
+                        field: int(value) for field, value in zip(self.FIELDS, values)
+                    }
+            except RedisError as e:
+                logger.warning(f"Could not read the user counters: {e}")
+
+        counts = await count()
+        await self.seed(counts)
+        return counts
+
+
+user_counters = UserCounters()
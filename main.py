@@ -1,18 +1,38 @@
+import asyncio
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from redis.asyncio import Redis
 
+from app.blob_store import blob_store
 from app.env_reader import EnvReader
+from app.gvs import ensure_dirs
 from app.logs_config import get_logger
+from app.metrics import metrics_publisher
+from app.password_hasher import password_hasher
 from app.settings import API_DESCRIPTION, API_TITLE, API_VERSION, OPENAPI_VERSION
-from db_handles.session import init_db
+from app.startup import startup_profile
+from app.token_cache import token_cache
+from db_handles.admin_settings import settings_store
+from db_handles.migrations import check_schema
+from db_handles.session import close_db, prewarm_pool
+from db_handles.user import User
+from db_handles.user_cache import user_cache
+from db_handles.user_stats import user_counters
+from middlewares.maintenance import MaintenanceModeMiddleware
+from middlewares.metrics import MetricsMiddleware
+from middlewares.request_id import RequestIdMiddleware
 from middlewares.standard_response import (
+    StandardJSONResponse,
     StandardResponseMiddleware,
     register_httpexception_handler,
+    register_unhandled_exception_handler,
 )
-from redis_handlers.client import get_new_redis_client
+from middlewares.upload_limit import UploadSizeLimitMiddleware
+from redis_handlers.broadcast import broadcaster
+from redis_handlers.client import get_new_redis_client, redis_pool
 from redis_handlers.dispatcher import Dispatcher
 from routes.admin_routes import admin_router
 from routes.auth_routes import auth_router
@@ -24,13 +44,56 @@ from routes.user_routes import user_router
 logger = get_logger()
 
 
+async def warm_up_database() -> None:
+    # Migrations run out of band, see `python manage.py migrate`
+    await check_schema()
+    await prewarm_pool()
+
+
+async def seed_user_counters() -> None:
+    # Seed the maintained user counters, unless another worker already did
+    await user_counters.seed(await User.count_by_status())
+
+
+async def load_admin_settings(redis: Redis) -> None:
+    # Subscribe first, so that no change published during the load is missed
+    await broadcaster.start(redis)
+    await settings_store.load()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    await init_db()
-    app.state.dispatcher = Dispatcher(redis=await get_new_redis_client())
-    logger.info("Startup complete!")
+    startup_profile.start()
+    ensure_dirs()
+    blob_store.ensure_dirs()
+    redis = await get_new_redis_client()
+    # Independent of each other, so they wait on the network concurrently
+    await asyncio.gather(
+        startup_profile.timed("database", warm_up_database()),
+        startup_profile.timed("redis", redis_pool.warm_up()),
+        startup_profile.timed("password_hasher", password_hasher.warm_up()),
+    )
+    app.state.dispatcher = Dispatcher(redis=redis)
+    await startup_profile.timed("dispatcher", app.state.dispatcher.start())
+    user_cache.attach(redis)
+    token_cache.attach(redis)
+    user_counters.attach(redis)
+    settings_store.attach(redis)
+    metrics_publisher.attach(redis)
+    await metrics_publisher.start()
+    await asyncio.gather(
+        startup_profile.timed("user_counters", seed_user_counters()),
+        startup_profile.timed("admin_settings", load_admin_settings(redis)),
+    )
+    startup_profile.ready()
     yield  # App is running
     logger.info("Running teardown process  ...")
+    await app.state.dispatcher.stop()
+    await broadcaster.stop()
+    await metrics_publisher.stop()
+    await redis_pool.close()
+    await close_db()
+    password_hasher.shutdown()
 
 
 app = FastAPI(
@@ -39,9 +102,21 @@ app = FastAPI(
     description=API_DESCRIPTION,
     version=API_VERSION,  # this is your app version
     openapi_version=OPENAPI_VERSION,  # this is the OpenAPI schema version
+    # Wraps 2xx responses in the standard `{"data": ..., "error": ...}` envelope
+    default_response_class=StandardJSONResponse,
 )
 
 
+# Added before CORS so that their error responses still carry CORS headers
+app.add_middleware(MaintenanceModeMiddleware)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        "/files/upload": EnvReader.MAX_UPLOAD_BYTES,
+        "/user/avatar": EnvReader.MAX_AVATAR_BYTES,
+    },
+)
+
 # Enable CORS Middleware to Handle Preflight (OPTIONS) Requests
 app.add_middleware(
     CORSMiddleware,
@@ -49,9 +124,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all HTTP methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Request-ID"],
 )
 app.add_middleware(StandardResponseMiddleware)
+# Metrics time everything below them, and the request id is set outermost so
+# that every log of a request, the metrics' included, carries its id
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
 register_httpexception_handler(app)
+register_unhandled_exception_handler(app)
 
 
 # Register routes
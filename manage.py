@@ -0,0 +1,77 @@
+"""
+Management commands, run from the project root:
+
+    python manage.py migrate [--status]
+    python manage.py import-users users.csv [--batch-size 5000] [--workers 8]
+"""
+
+import argparse
+import asyncio
+import os
+from pathlib import Path
+
+from app.user_import import import_users as run_user_import
+from db_handles import migrations
+from db_handles.session import close_db
+from db_handles.user_stats import user_counters
+from redis_handlers.client import get_new_redis_client, redis_pool
+
+
+async def migrate(args: argparse.Namespace) -> None:
+    try:
+        if args.status:
+            for migration, applied in await migrations.status():
+                state = "applied" if applied else "pending"
+                print(f"{migration.version:>4} {migration.name:<30} {state}")
+            return
+
+        applied = await migrations.migrate()
+        print(f"Applied {len(applied)} migrations: {[m.name for m in applied]}")
+    finally:
+        await close_db()
+
+
+async def import_users(args: argparse.Namespace) -> None:
+    await migrations.check_schema()
+    # Keeps the maintained user counters of the running workers in step
+    user_counters.attach(await get_new_redis_client())
+    try:
+        report = await run_user_import(args.path, args.batch_size, args.workers)
+    finally:
+        await redis_pool.close()
+        await close_db()
+    print(f"Imported {args.path}: {report}")
+
+
+COMMANDS = {"migrate": migrate, "import-users": import_users}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser(
+        "migrate", help="Apply the pending schema migrations"
+    )
+    migrate_parser.add_argument(
+        "--status", action="store_true", help="List the migrations, apply none"
+    )
+
+    import_parser = commands.add_parser(
+        "import-users", help="Bulk import users from a CSV or NDJSON file"
+    )
+    import_parser.add_argument("path", type=Path)
+    import_parser.add_argument("--batch-size", type=int, default=5000)
+    import_parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Threads hashing passwords",
+    )
+
+    args = parser.parse_args()
+    asyncio.run(COMMANDS[args.command](args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.logs_config import get_logger
+from db_handles.admin_settings import AdminSettings
+
+from .standard_response import DOCS_PATHS, create_error_response
+
+logger = get_logger()
+
+# Still served in maintenance mode, so admins can log in and turn it off
+ALLOWED_PREFIXES = ("/admin",)
+
+
+class MaintenanceModeMiddleware:
+    """
+    Rejects non-admin requests with 503 while `maintenance_mode` is enabled.
+    Reads the in-memory settings snapshot, so it costs no database round trip.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path: str = scope.get("path", "")
+        if (
+            scope["type"] != "http"
+            or path in DOCS_PATHS
+            or path.startswith(ALLOWED_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            settings = await AdminSettings.get_snapshot()
+        except Exception:
+            logger.exception("Could not load the admin settings snapshot")
+            await self.app(scope, receive, send)
+            return
+
+        if settings.maintenance_mode:
+            response = create_error_response(
+                status_code=503,
+                message="The app is under maintenance. Please try again later!",
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
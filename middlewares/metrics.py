@@ -0,0 +1,54 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import registry
+
+REQUESTS = registry.counter(
+    "http_requests_total",
+    "HTTP requests served, by route and status",
+    ("method", "route", "status"),
+)
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "Time to serve an HTTP request, until the response is sent",
+    ("method", "route"),
+)
+IN_FLIGHT = registry.gauge("http_requests_in_flight", "HTTP requests being served")
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, status and count of every request, by route
+    template (`/admin/users/{user_id}`) so that ids do not make a series
+    each. Requests that match no route are counted as `unmatched`.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            IN_FLIGHT.dec()
+            # Set by the router on the scope once a route matched
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            REQUESTS.inc(method, route, str(status))
+            REQUEST_DURATION.observe(elapsed, method, route)
@@ -0,0 +1,48 @@
+import re
+import uuid
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.logs_config import request_id
+
+REQUEST_ID_HEADER = "x-request-id"
+# Ids from clients or proxies are kept only if they are this safe to log
+VALID_REQUEST_ID = re.compile(r"[\w.:-]{1,128}")
+
+
+class RequestIdMiddleware:
+    """
+    Gives each request an id, stamped on the logs of the request and sent
+    back as `X-Request-ID`. An `X-Request-ID` set upstream, e.g. by the load
+    balancer, is reused so that the logs of both can be joined.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        current = (
+            incoming
+            if incoming and VALID_REQUEST_ID.fullmatch(incoming)
+            else uuid.uuid4().hex
+        )
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (REQUEST_ID_HEADER.encode(), current.encode()),
+                ]
+            await send(message)
+
+        token = request_id.set(current)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id.reset(token)
@@ -1,73 +1,132 @@
 import json
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Mapping, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Paths served by FastAPI itself that are never wrapped
+DOCS_PATHS = ("/openapi.json", "/docs", "/redoc")
+
+# Set on the ASGI scope once a response has been wrapped while rendering
+ENVELOPED_SCOPE_KEY = "standard_response.enveloped"
+
+_ANY_ADAPTER: TypeAdapter[Any] = TypeAdapter(Any)
+
+
+def envelope(data: Any) -> bytes:
+    """Serialize `data` wrapped in the standard `{"data": ..., "error": null}` body"""
+    wrapped: Dict[str, Optional[Any]] = {
+        "data": data,
+        "error": None,
+    }
+    return json.dumps(wrapped, allow_nan=False).encode("utf-8")
+
+
+class StandardJSONResponse(JSONResponse):
+    """
+    Default response class of the app. 2xx payloads are wrapped in the standard
+    envelope while rendering, so every body is serialized exactly once.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if 200 <= self.status_code < 300:
+            return envelope(content)
+        return super().render(content)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        scope[ENVELOPED_SCOPE_KEY] = True
+        await super().__call__(scope, receive, send)
+
+
+class FastJSONResponse(StandardJSONResponse):
+    """
+    Opt-in response class for large payloads. The content is dumped straight
+    to JSON bytes by a precompiled pydantic `TypeAdapter`, with no validation
+    pass, and spliced into the envelope without being parsed again.
+
+    Return it from the route, e.g. `return FastJSONResponse(rows, adapter=...)`.
+    Unlike `StandardJSONResponse`, the body is compact JSON.
+    """
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+        background: BackgroundTask | None = None,
+        adapter: TypeAdapter[Any] = _ANY_ADAPTER,
+    ) -> None:
+        self.adapter = adapter
+        super().__init__(content, status_code, headers, None, background)
+
+    def render(self, content: Any) -> bytes:
+        payload = (
+            content if isinstance(content, bytes) else self.adapter.dump_json(content)
+        )
+        if 200 <= self.status_code < 300:
+            return b'{"data":' + payload + b',"error":null}'
+        return payload
 
-from fastapi import FastAPI, HTTPException, Request, Response
-from fastapi.responses import JSONResponse, StreamingResponse
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.types import ASGIApp
 
+class StandardResponseMiddleware:
+    """
+    Pure ASGI fallback for 2xx JSON responses that were not rendered by
+    `StandardJSONResponse`, e.g. a route returning a `JSONResponse` itself.
+    Only those are buffered and wrapped, everything else is passed through.
+    """
 
-class StandardResponseMiddleware(BaseHTTPMiddleware):
     def __init__(self, app: ASGIApp) -> None:
-        super().__init__(app)
-
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        try:
-            # ✅ Skip middleware for OpenAPI and docs
-            if request.url.path in ("/openapi.json", "/docs", "/redoc"):
-                return await call_next(request)
-
-            # Get the response
-            original_response: Response = await call_next(request)
-
-            # Only wrap JSON responses with 2xx status
-            content_type = original_response.headers.get("content-type", "")
-            if (
-                200 <= original_response.status_code < 300
-                and "application/json" in content_type
-            ):
-                # Manually read the body
-                body = b""
-                async for chunk in original_response.body_iterator:  # type: ignore
-                    body += chunk  # type: ignore
-
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # ✅ Skip middleware for OpenAPI and docs
+        if scope["type"] != "http" or scope["path"] in DOCS_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        chunks: list[bytes] = []
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message
+
+            if message["type"] == "http.response.start":
+                status_code: int = message["status"]
+                content_type = Headers(raw=message["headers"]).get("content-type", "")
+                if (
+                    not scope.get(ENVELOPED_SCOPE_KEY)
+                    and 200 <= status_code < 300
+                    and status_code != 204
+                    and "application/json" in content_type
+                ):
+                    start_message = message
+                    return
+
+            elif message["type"] == "http.response.body" and start_message:
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+
+                body = b"".join(chunks)
                 try:
-                    data: Any = json.loads(body)  # type: ignore
+                    data: Any = json.loads(body)
                 except json.JSONDecodeError:
-                    data = body.decode("utf-8")  # type: ignore
-
-                wrapped: Dict[str, Optional[Any]] = {
-                    "data": data,
-                    "error": None,
-                }
-
-                new_body = json.dumps(wrapped).encode("utf-8")
-
-                return StreamingResponse(
-                    content=iter([new_body]),
-                    status_code=original_response.status_code,
-                    headers={
-                        k: v
-                        for k, v in original_response.headers.items()
-                        if k.lower() != "content-length"
-                    },
-                    media_type="application/json",
-                )
-
-            return original_response
-
-        except Exception as e:
-            error_body: Dict[str, Optional[Any]] = {
-                "data": None,
-                "error": {
-                    "code": 500,
-                    "message": "Internal Server Error",
-                    "details": str(e),
-                },
-            }
-            return JSONResponse(status_code=500, content=error_body)
+                    data = body.decode("utf-8")
+                new_body = envelope(data)
+
+                headers = MutableHeaders(raw=list(start_message["headers"]))
+                headers["content-length"] = str(len(new_body))
+                await send({**start_message, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": new_body})
+                return
+
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
 
 
 def create_error_response(
@@ -94,3 +153,19 @@ def register_httpexception_handler(app: FastAPI) -> None:
             status_code=exc.status_code,
             message=exc.detail,
         )
+
+
+def register_unhandled_exception_handler(app: FastAPI) -> None:
+    @app.exception_handler(Exception)
+    async def unhandled_exception_handler(  # pyright: ignore [reportUnusedFunction]
+        request: Request, exc: Exception
+    ) -> JSONResponse:
+        error_body: Dict[str, Optional[Any]] = {
+            "data": None,
+            "error": {
+                "code": 500,
+                "message": "Internal Server Error",
+                "details": str(exc),
+            },
+        }
+        return JSONResponse(status_code=500, content=error_body)
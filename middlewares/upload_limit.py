@@ -0,0 +1,87 @@
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.uploads import upload_stats
+
+from .standard_response import create_error_response
+
+# Room for the multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class BodyTooLarge(Exception):
+    """Raised from `receive` once a body is over the limit, to stop its parsing"""
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects uploads over the route limit with 413 while they are received,
+    before Starlette spools the multipart body to disk:
+
+    - a declared Content-Length over the limit is rejected before the body
+      is read at all
+    - otherwise the body bytes are counted as they come in, and reading stops
+      as soon as they are over the limit, whatever the Content-Length said
+    """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, int]) -> None:
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.limits:
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self.limits[scope["path"]]
+        max_body_bytes = max_bytes + MULTIPART_OVERHEAD
+        content_length = Headers(scope=scope).get("content-length")
+        if (
+            content_length
+            and content_length.isdigit()
+            and int(content_length) > max_body_bytes
+        ):
+            await self._reject(scope, receive, send, max_bytes)
+            return
+
+        received = 0
+        too_large = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_bytes:
+                    too_large = True
+                    raise BodyTooLarge()
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            if too_large and not response_started:
+                # The app's answer to the cut body, replaced by the 413
+                return
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # FastAPI may also wrap `BodyTooLarge` in its own error
+            if not too_large or response_started:
+                raise
+        if too_large and not response_started:
+            await self._reject(scope, receive, send, max_bytes)
+
+    @staticmethod
+    async def _reject(
+        scope: Scope, receive: Receive, send: Send, max_bytes: int
+    ) -> None:
+        upload_stats.rejected += 1
+        response = create_error_response(
+            status_code=413,
+            message=f"File is too large. The limit is {max_bytes} bytes.",
+        )
+        await response(scope, receive, send)
@@ -1,5 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Literal
+
+# Sent as a single array parameter, so the limit is only there to bound the work
+MAX_BULK_USER_IDS = 10_000
 
 
 class Role(BaseModel):
@@ -16,3 +20,15 @@ class Log(BaseModel):
     timestamp: datetime
     action: str
     user_id: str
+
+
+class BulkUserAction(BaseModel):
+    action: Literal["block", "unblock", "promote", "demote", "delete"]
+    user_ids: list[int] = Field(min_length=1, max_length=MAX_BULK_USER_IDS)
+
+
+class BulkUserResult(BaseModel):
+    action: str
+    requested: int
+    affected: list[int]
+    not_found: list[int]
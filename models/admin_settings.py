@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class AdminSettingsOutput(BaseModel):
@@ -17,6 +17,14 @@ class AdminSettingsOutput(BaseModel):
     backup_frequency: str
 
 
+class AdminSettingsSnapshot(AdminSettingsOutput):
+    """Immutable, versioned copy of the admin settings kept in memory by each worker"""
+
+    model_config = ConfigDict(frozen=True)
+
+    version: int
+
+
 class AdminSettingsUpdate(BaseModel):
     app_name: str | None = None
     app_version: str | None = None
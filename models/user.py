@@ -1,5 +1,5 @@
-from pydantic import EmailStr, BaseModel
-from typing import Optional
+from pydantic import EmailStr, BaseModel, TypeAdapter
+from typing import Optional, TypedDict
 from datetime import datetime
 
 
@@ -17,6 +17,27 @@ class UserPublic(BaseModel):
     created_at: int
 
 
+class UserPublicRow(TypedDict):
+    """`UserPublic` as a plain dict, serialized without being validated again"""
+
+    user_id: str
+    email: str
+    full_name: Optional[str]
+    is_admin: bool
+    created_at: int
+
+
+class UsersPage(TypedDict):
+    users: list[UserPublicRow]
+    # Opaque, pass it back as `cursor` to get the next page
+    next_cursor: str | None
+    # Planner estimate of the users matching the filters, on the first page only
+    approximate_total: int | None
+
+
+users_page_adapter: TypeAdapter[UsersPage] = TypeAdapter(UsersPage)
+
+
 class Notification(BaseModel):
     id: int
     message: str
@@ -0,0 +1,112 @@
+import asyncio
+import inspect
+import uuid
+from typing import Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.logs_config import get_logger
+
+logger = get_logger()
+
+Handler = Callable[[str], Awaitable[None] | None]
+
+
+class Broadcaster:
+    """
+    Fans small messages (mostly cache invalidations) out to every worker over
+    Redis pub/sub.
+
+    Handlers run locally as soon as a message is published, so a worker without
+    Redis still sees its own messages. Messages published while a worker is
+    disconnected are lost, which is why every cache fed by this also has a TTL.
+    """
+
+    POLL_SECONDS = 1.0
+
+    def __init__(self) -> None:
+        self.redis: Redis | None = None
+        self.origin = uuid.uuid4().hex
+        self._handlers: dict[str, list[Handler]] = {}
+        self._task: asyncio.Task[None] | None = None
+
+        # Metrics
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def publish(self, channel: str, message: str) -> None:
+        self.published += 1
+        await self._dispatch(channel, message)
+
+        if self.redis is None:
+            return
+        try:
+            await self.redis.publish(channel, f"{self.origin}:{message}")
+        except RedisError as e:
+            logger.warning(f"Could not broadcast message on {channel}: {e}")
+
+    async def start(self, redis: Redis) -> None:
+        self.redis = redis
+        if self._handlers and self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.redis = None
+
+    async def _dispatch(self, channel: str, message: str) -> None:
+        for handler in self._handlers.get(channel, []):
+            try:
+                result = handler(message)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception(f"Broadcast handler for {channel} failed")
+
+    async def _listen(self) -> None:
+        assert self.redis is not None
+
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(*self._handlers)
+                logger.info("Listening for broadcasts on %s", list(self._handlers))
+                while True:
+                    # Polled, so that idle channels do not hit the socket timeout
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=self.POLL_SECONDS
+                    )
+                    if message is None:
+                        continue
+                    origin, _, data = message["data"].decode().partition(":")
+                    if origin == self.origin:
+                        continue  # Already handled locally on publish
+                    self.received += 1
+                    await self._dispatch(message["channel"].decode(), data)
+
+            except RedisError as e:
+                logger.warning(f"Broadcast listener lost its connection: {e}")
+                await asyncio.sleep(1)
+
+            finally:
+                await pubsub.aclose()
+
+    def stats(self) -> dict[str, int | bool]:
+        return {
+            "listening": self._task is not None and not self._task.done(),
+            "published": self.published,
+            "received": self.received,
+        }
+
+
+broadcaster = Broadcaster()
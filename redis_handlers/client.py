@@ -1,13 +1,165 @@
-from redis.asyncio import Redis
+import asyncio
+import time
+from typing import Any
+
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import RedisError
+from redis.utils import HIREDIS_AVAILABLE
 
 from app.env_reader import EnvReader
 from app.logs_config import get_logger
+from app.metrics import registry
 
 logger = get_logger()
 
+try:
+    # Private to redis-py, so they may move: without them redis-py picks the parser
+    from redis._parsers import _AsyncHiredisParser, _AsyncRESP2Parser
+except ImportError:
+    _AsyncHiredisParser = _AsyncRESP2Parser = None  # type: ignore[assignment,misc]
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """`BlockingConnectionPool` that records how long callers wait for a connection"""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.checkouts = 0
+        self.waits = 0
+        self.failed_checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.peak_in_use = 0
+
+    async def get_connection(self, *args: Any, **kwargs: Any) -> Any:
+        must_wait = not self.can_get_connection()
+        started_at = time.perf_counter()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except RedisConnectionError:
+            # Timed out waiting, or could not connect
+            self.failed_checkouts += 1
+            raise
+        finally:
+            if must_wait:
+                waited = time.perf_counter() - started_at
+                self.waits += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+        self.checkouts += 1
+        self.peak_in_use = max(self.peak_in_use, len(self._in_use_connections))
+        return connection
+
+    @property
+    def in_use(self) -> int:
+        return len(self._in_use_connections)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "in_use": self.in_use,
+            "idle": len(self._available_connections),
+            "peak_in_use": self.peak_in_use,
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "failed_checkouts": self.failed_checkouts,
+            "avg_wait_ms": self.total_wait / self.waits * 1000 if self.waits else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+class RedisPool:
+    """
+    The single Redis connection pool of the worker, opened on first use and
+    drained by the lifespan on shutdown. Every client shares it.
+    """
+
+    def __init__(self) -> None:
+        self.pool: InstrumentedConnectionPool | None = None
+
+    def _parser_class(self) -> type | None:
+        """The parser set by `REDIS_USE_HIREDIS`, None to keep the default one"""
+        if not EnvReader.REDIS_USE_HIREDIS:
+            return _AsyncRESP2Parser
+        if not HIREDIS_AVAILABLE:
+            logger.warning("REDIS_USE_HIREDIS is set but hiredis is not installed")
+            return _AsyncRESP2Parser
+        return _AsyncHiredisParser
+
+    def client(self) -> Redis:
+        if self.pool is None:
+            parser_class = self._parser_class()
+            self.pool = InstrumentedConnectionPool(
+                host=EnvReader.REDIS_HOST,
+                port=EnvReader.REDIS_PORT,
+                db=EnvReader.REDIS_DB,
+                max_connections=EnvReader.REDIS_MAX_CONNECTIONS,
+                timeout=EnvReader.REDIS_POOL_TIMEOUT_SECONDS,
+                socket_timeout=EnvReader.REDIS_SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=EnvReader.REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS,
+                health_check_interval=EnvReader.REDIS_HEALTH_CHECK_INTERVAL,
+                **({"parser_class": parser_class} if parser_class else {}),
+            )
+        return Redis(connection_pool=self.pool)
+
+    async def warm_up(self) -> None:
+        """Open a first connection, so that the first request does not wait for it"""
+        try:
+            await self.client().ping()
+        except RedisError as e:
+            logger.warning(f"Redis is not reachable at startup: {e}")
+
+    async def close(
+        self, timeout: float = EnvReader.REDIS_DRAIN_TIMEOUT_SECONDS
+    ) -> None:
+        """Wait up to `timeout` seconds for the connections in use, then close all"""
+        if self.pool is None:
+            return
+        pool, self.pool = self.pool, None
+
+        deadline = time.monotonic() + timeout
+        while pool.in_use and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if pool.in_use:
+            logger.warning(f"Closing {pool.in_use} Redis connections still in use")
+        await pool.disconnect(inuse_connections=True)
+        logger.info("Redis connection pool closed")
+
+    def stats(self) -> dict[str, Any]:
+        return self.pool.stats() if self.pool is not None else {"open": False}
+
+
+redis_pool = RedisPool()
+
+POOL_IN_USE = registry.gauge("redis_pool_in_use", "Redis connections in use")
+POOL_IDLE = registry.gauge("redis_pool_idle", "Idle Redis connections")
+POOL_MAX = registry.gauge("redis_pool_max_connections", "Redis connections allowed")
+POOL_CHECKOUTS = registry.counter(
+    "redis_pool_checkouts_total", "Redis connections taken from the pool"
+)
+POOL_WAITS = registry.counter(
+    "redis_pool_waits_total", "Checkouts that waited for a Redis connection"
+)
+POOL_FAILED_CHECKOUTS = registry.counter(
+    "redis_pool_failed_checkouts_total", "Checkouts that got no Redis connection"
+)
+
+
+@registry.collect_with
+def collect_pool_metrics() -> None:
+    if redis_pool.pool is None:
+        return
+    stats = redis_pool.pool.stats()
+    POOL_IN_USE.set(stats["in_use"])
+    POOL_IDLE.set(stats["idle"])
+    POOL_MAX.set(stats["max_connections"])
+    POOL_CHECKOUTS.set_total(stats["checkouts"])
+    POOL_WAITS.set_total(stats["waits"])
+    POOL_FAILED_CHECKOUTS.set_total(stats["failed_checkouts"])
+
 
 async def get_new_redis_client() -> Redis:
     logger.info("Getting a new redis client ...")
-    return Redis(
-        host=EnvReader.REDIS_HOST, port=EnvReader.REDIS_PORT, db=EnvReader.REDIS_DB
-    )
+    return redis_pool.client()
@@ -0,0 +1,362 @@
+"""
+Encodings of stream payloads into Redis fields.
+
+- `json`:   the legacy format, a JSON document under a single `payload` field
+- `fields`: one Redis field per payload key, plus a `_s` schema tag
+- `binary`: a single `_b` field, packed in the field order of the schema
+
+Every payload type is registered as a `PayloadSchema` with a stable id and a
+version. The `fields` and `binary` formats carry both, so a consumer decodes
+messages written with any registered version, whatever codec the dispatcher
+is configured with. Bump the version, and keep the old schema registered,
+whenever the keys or types of a payload change.
+"""
+
+import datetime
+import enum
+import json
+import struct
+import types
+from typing import (
+    Any,
+    Literal,
+    Mapping,
+    NamedTuple,
+    Union,
+    get_args,
+    get_origin,
+    get_type_hints,
+)
+
+from redis.typing import EncodableT, FieldT
+
+from .payloads import EngagementJobCommand, UserValidationJobCommand
+
+Fields = dict[FieldT, EncodableT]
+
+LEGACY_FIELD = b"payload"
+BINARY_FIELD = b"_b"
+SCHEMA_FIELD = b"_s"
+BINARY_FORMAT_VERSION = 1
+# Ints are zigzag encoded as signed 64-bit values
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
+
+
+class CodecError(ValueError):
+    """A message that no registered codec or schema can decode"""
+
+
+class FieldPlan(NamedTuple):
+    """How one key of a payload is encoded, resolved once per schema"""
+
+    key: str
+    # "literal", "bool", "int", "float", "str", "bytes" or "json"
+    kind: str
+    optional: bool
+    # The values of a `Literal`, and their indexes
+    choices: tuple[Any, ...] = ()
+    indexes: Mapping[Any, int] = {}
+
+    @classmethod
+    def resolve(cls, key: str, tp: Any) -> "FieldPlan":
+        inner = _optional(tp)
+        optional = inner is not None
+        tp = inner if optional else tp
+        if get_origin(tp) is Literal:
+            choices = get_args(tp)
+            indexes = {value: index for index, value in enumerate(choices)}
+            return cls(key, "literal", optional, choices, indexes)
+        for kind in (bool, int, float, str, bytes):
+            if tp is kind:
+                return cls(key, kind.__name__, optional)
+        return cls(key, "json", optional)
+
+
+class PayloadSchema:
+    def __init__(
+        self,
+        schema_id: int,
+        version: int,
+        typed_dict: type,
+        types_by_key: Mapping[str, Any] | None = None,
+    ) -> None:
+        """`types_by_key` overrides the keys of `typed_dict`, for older versions"""
+        self.schema_id = schema_id
+        self.version = version
+        self.typed_dict = typed_dict
+        self.fields: tuple[tuple[str, Any], ...] = tuple(
+            (types_by_key or get_type_hints(typed_dict)).items()
+        )
+        self.plan = tuple(FieldPlan.resolve(key, tp) for key, tp in self.fields)
+        self.tag = f"{schema_id}.{version}"
+
+    def __repr__(self) -> str:
+        return f"PayloadSchema({self.typed_dict.__name__}, v{self.version})"
+
+
+_schemas: dict[tuple[int, int], PayloadSchema] = {}
+_current: dict[type, PayloadSchema] = {}
+
+
+def register(schema: PayloadSchema) -> PayloadSchema:
+    key = (schema.schema_id, schema.version)
+    if key in _schemas:
+        raise ValueError(f"Schema {schema.tag} is already registered")
+    _schemas[key] = schema
+    current = _current.get(schema.typed_dict)
+    if current is None or current.version < schema.version:
+        _current[schema.typed_dict] = schema
+    return schema
+
+
+def schema_for(typed_dict: type) -> PayloadSchema:
+    return _current[typed_dict]
+
+
+def _lookup(schema_id: int, version: int) -> PayloadSchema:
+    try:
+        return _schemas[(schema_id, version)]
+    except KeyError:
+        raise CodecError(f"Unknown payload schema {schema_id}.{version}") from None
+
+
+def to_redis_fields(payload: Mapping[str, Any]) -> Fields:
+    """
+    Convert a dict-like payload into Redis-safe fields for XADD/HSET/etc.
+    - bool → "1"/"0"
+    - str, int, float, bytes → kept as-is
+    - Enum → its value (if str/int) else its name
+    - datetime/date → ISO 8601 string
+    - dict/list/other → JSON string
+    """
+    out: Fields = {}
+
+    for k, v in payload.items():
+        if v is None:
+            continue  # skip None fields (or store as "")
+        elif isinstance(v, bool):
+            out[k] = "1" if v else "0"
+        elif isinstance(v, (str, int, float, bytes)):
+            out[k] = v
+        elif isinstance(v, enum.Enum):
+            out[k] = v.value if isinstance(v.value, (str, int, float)) else v.name
+        elif isinstance(v, (datetime.date, datetime.datetime)):
+            out[k] = v.isoformat()
+        else:
+            out[k] = json.dumps(v, separators=(",", ":"), ensure_ascii=True)
+
+    return out
+
+
+def _optional(tp: Any) -> Any | None:
+    """The inner type of `X | None`, None if `tp` is not optional"""
+    if get_origin(tp) in (Union, types.UnionType):
+        args = [arg for arg in get_args(tp) if arg is not type(None)]
+        if len(args) == 1 and len(get_args(tp)) == 2:
+            return args[0]
+    return None
+
+
+def _from_text(field: FieldPlan, raw: bytes) -> Any:
+    kind = field.kind
+    if kind == "literal":
+        text = raw.decode()
+        for value in field.choices:
+            if str(value) == text:
+                return value
+        raise CodecError(f"{text!r} is not one of {field.choices}")
+    if kind == "str":
+        return raw.decode()
+    if kind == "bool":
+        return raw == b"1"
+    if kind == "int":
+        return int(raw)
+    if kind == "float":
+        return float(raw)
+    if kind == "bytes":
+        return raw
+    return json.loads(raw)
+
+
+class JsonCodec:
+    name = "json"
+
+    def encode(
+        self, schema: PayloadSchema | None, payload: Mapping[str, Any]
+    ) -> Fields:
+        return {LEGACY_FIELD: json.dumps(payload, separators=(",", ":"))}
+
+    def decode(self, fields: Mapping[bytes, bytes]) -> dict[str, Any]:
+        return json.loads(fields[LEGACY_FIELD])
+
+
+class FieldCodec:
+    name = "fields"
+
+    def encode(
+        self, schema: PayloadSchema | None, payload: Mapping[str, Any]
+    ) -> Fields:
+        if schema is None:
+            raise CodecError("The fields codec needs a payload schema")
+        fields: Fields = {SCHEMA_FIELD: schema.tag}
+        fields.update(to_redis_fields(payload))
+        return fields
+
+    def decode(self, fields: Mapping[bytes, bytes]) -> dict[str, Any]:
+        schema_id, _, version = fields[SCHEMA_FIELD].partition(b".")
+        schema = _lookup(int(schema_id), int(version))
+        payload: dict[str, Any] = {}
+        for field in schema.plan:
+            raw = fields.get(field.key.encode())
+            # `to_redis_fields` skips None values
+            payload[field.key] = None if raw is None else _from_text(field, raw)
+        return payload
+
+
+class BinaryCodec:
+    """
+    Header: binary format version, schema id and schema version, one byte
+    each. Then the values, in the field order of the schema:
+
+    - `Literal`: one byte, the index of the value in the `Literal`
+    - `bool`: one byte
+    - `int`: zigzag varint
+    - `float`: 8 bytes, big endian
+    - `str` and `bytes`: varint length + bytes
+    - anything else: JSON, as a `str`
+    - `X | None`: a presence byte, then `X` when present
+    """
+
+    name = "binary"
+
+    def encode(
+        self, schema: PayloadSchema | None, payload: Mapping[str, Any]
+    ) -> Fields:
+        if schema is None:
+            raise CodecError("The binary codec needs a payload schema")
+        out = bytearray((BINARY_FORMAT_VERSION, schema.schema_id, schema.version))
+        for field in schema.plan:
+            self._pack(out, field, payload.get(field.key))
+        return {BINARY_FIELD: bytes(out)}
+
+    def decode(self, fields: Mapping[bytes, bytes]) -> dict[str, Any]:
+        data = memoryview(fields[BINARY_FIELD])
+        if len(data) < 3 or data[0] != BINARY_FORMAT_VERSION:
+            raise CodecError("Unknown binary payload format")
+        schema = _lookup(data[1], data[2])
+        payload: dict[str, Any] = {}
+        offset = 3
+        try:
+            for field in schema.plan:
+                payload[field.key], offset = self._unpack(data, offset, field)
+        except (IndexError, struct.error, UnicodeDecodeError) as e:
+            raise CodecError(f"Truncated binary payload: {e}") from e
+        return payload
+
+    @staticmethod
+    def _pack_varint(out: bytearray, value: int) -> None:
+        while value > 0x7F:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+    @staticmethod
+    def _unpack_varint(data: memoryview, offset: int) -> tuple[int, int]:
+        value = shift = 0
+        while True:
+            byte = data[offset]
+            offset += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value, offset
+            shift += 7
+
+    def _pack(self, out: bytearray, field: FieldPlan, value: Any) -> None:
+        if field.optional:
+            out.append(value is not None)
+            if value is None:
+                return
+
+        kind = field.kind
+        if kind == "literal":
+            if value not in field.indexes:
+                raise CodecError(f"{value!r} is not one of {field.choices}")
+            out.append(field.indexes[value])
+        elif kind == "bool":
+            out.append(bool(value))
+        elif kind == "int":
+            if not INT64_MIN <= value <= INT64_MAX:
+                raise CodecError(f"{field.key}={value} does not fit in 64 bits")
+            self._pack_varint(out, (value << 1) ^ (value >> 63))
+        elif kind == "float":
+            out += struct.pack(">d", value)
+        else:
+            if kind == "str":
+                raw = value.encode()
+            elif kind == "bytes":
+                raw = value
+            else:
+                raw = json.dumps(value, separators=(",", ":")).encode()
+            self._pack_varint(out, len(raw))
+            out += raw
+
+    def _unpack(
+        self, data: memoryview, offset: int, field: FieldPlan
+    ) -> tuple[Any, int]:
+        if field.optional:
+            offset += 1
+            if not data[offset - 1]:
+                return None, offset
+
+        kind = field.kind
+        if kind == "literal":
+            return field.choices[data[offset]], offset + 1
+        if kind == "bool":
+            return bool(data[offset]), offset + 1
+        if kind == "int":
+            value, offset = self._unpack_varint(data, offset)
+            return (value >> 1) ^ -(value & 1), offset
+        if kind == "float":
+            return struct.unpack_from(">d", data, offset)[0], offset + 8
+
+        length, offset = self._unpack_varint(data, offset)
+        raw = bytes(data[offset : offset + length])
+        if len(raw) != length:
+            raise IndexError("value runs past the end of the payload")
+        offset += length
+        if kind == "bytes":
+            return raw, offset
+        if kind == "str":
+            return raw.decode(), offset
+        return json.loads(raw), offset
+
+
+Codec = JsonCodec | FieldCodec | BinaryCodec
+
+CODECS: dict[str, Codec] = {
+    codec.name: codec for codec in (JsonCodec(), FieldCodec(), BinaryCodec())
+}
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown stream codec {name!r}, expected one of {list(CODECS)}"
+        ) from None
+
+
+def decode_fields(fields: Mapping[bytes, bytes]) -> dict[str, Any]:
+    """Decode a stream message written with any of the codecs"""
+    if BINARY_FIELD in fields:
+        return CODECS["binary"].decode(fields)
+    if SCHEMA_FIELD in fields:
+        return CODECS["fields"].decode(fields)
+    if LEGACY_FIELD in fields:
+        return CODECS["json"].decode(fields)
+    raise CodecError("The message has no known payload fields")
+
+
+USER_VALIDATION_JOB_COMMAND = register(PayloadSchema(1, 1, UserValidationJobCommand))
+ENGAGEMENT_JOB_COMMAND = register(PayloadSchema(2, 1, EngagementJobCommand))
@@ -1,10 +1,16 @@
 import asyncio
-import json
-from typing import TypeVar
+import time
+import weakref
+from typing import Any, TypeVar
 
 from redis.asyncio import Redis
+from redis.exceptions import ResponseError
 
+from app.env_reader import EnvReader
 from app.logs_config import get_logger
+from app.metrics import registry
+
+from .codecs import decode_fields
 
 logger = get_logger()
 
@@ -12,6 +18,25 @@ T = TypeVar("T")
 
 
 class Consumer:
+    """
+    Reads a stream as a member of a consumer group and hands the payloads to
+    `output_queue`.
+
+    - Messages are read `count` at a time, blocking up to `block_ms` while the
+      stream is idle.
+    - A batch is acknowledged with a single XACK once all of its payloads are
+      in the queue. Messages read but not acknowledged before a crash stay
+      pending, and are read again first on the next start.
+    - No more is read than what fits under `max_queue_depth`, so a slow
+      queue reader throttles the consumer instead of growing the queue.
+    - Payloads are decoded with whichever codec wrote them, see `codecs`.
+      Those that cannot be decoded are logged and acknowledged, so they are
+      not redelivered forever.
+    """
+
+    # How long to wait for the queue to drain when it is full
+    BACKPRESSURE_INTERVAL = 0.05
+
     def __init__(
         self,
         redis: Redis,
@@ -19,14 +44,36 @@ class Consumer:
         group_name: str,
         output_queue: asyncio.Queue[T],
         worker_number: int = 1,
+        count: int = EnvReader.CONSUMER_BATCH_SIZE,
+        block_ms: int = EnvReader.CONSUMER_BLOCK_MS,
+        max_queue_depth: int = 0,
+        consumer_name: str | None = None,
     ) -> None:
         self.redis = redis
         self.stream_name = stream_name
         self.group_name = group_name
-        self.worker_name = f"worker-{worker_number}"
+        self.worker_name = consumer_name or f"worker-{worker_number}"
         self.output_queue = output_queue
+        self.count = count
+        self.block_ms = block_ms
+        self.max_queue_depth = (
+            max_queue_depth
+            or output_queue.maxsize
+            or EnvReader.CONSUMER_MAX_QUEUE_DEPTH
+        )
 
-    async def consume(self) -> None:
+        # Metrics
+        self.started_at = time.monotonic()
+        self.batches = 0
+        self.received = 0
+        self.acked = 0
+        self.reclaimed = 0
+        self.malformed = 0
+        self.backpressure_waits = 0
+        self.last_lag_ms = 0
+        consumers.add(self)
+
+    async def ensure_group(self) -> None:
         # Create consumer group (ignore error if it already exists)
         try:
             logger.info(
@@ -35,24 +82,190 @@ class Consumer:
             await self.redis.xgroup_create(
                 self.stream_name, self.group_name, id="$", mkstream=True
             )
-        except Exception:
-            # Group might already exist, that's fine
-            pass
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def consume(self) -> None:
+        await self.ensure_group()
 
+        # Start with our own pending messages, left over from a previous run
+        pending_id: str | None = "0"
         while True:
+            free = await self._wait_for_room()
             messages = await self.redis.xreadgroup(
                 self.group_name,
                 self.worker_name,
-                {self.stream_name: ">"},
-                count=1,
+                {self.stream_name: pending_id or ">"},
+                count=min(self.count, free),
+                block=None if pending_id else self.block_ms,
+            )
+            batch: list[tuple[bytes, dict[bytes, bytes]]] = [
+                message
+                for _, stream_messages in messages or []
+                for message in stream_messages
+            ]
+            if pending_id is not None:
+                # Read new messages once there is nothing pending anymore
+                pending_id = batch[-1][0].decode() if batch else None
+            if batch:
+                await self._handle_batch(batch)
+
+    async def reclaim(self, min_idle_ms: int) -> int:
+        """
+        Claim the messages of the group that are pending for at least
+        `min_idle_ms`, whichever consumer read them, and handle them.
+        These were read by a consumer that crashed or was stopped mid-batch.
+        """
+        claimed = 0
+        start_id: str | bytes = "0-0"
+        while True:
+            free = await self._wait_for_room()
+            next_id, messages, *_ = await self.redis.xautoclaim(
+                self.stream_name,
+                self.group_name,
+                self.worker_name,
+                min_idle_ms,
+                start_id,
+                count=min(self.count, free),
             )
-            for stream_name, stream_messages in messages:
-                for message_id, fields in stream_messages:
-                    logger.info(
-                        f"Received message {message_id}: {fields} in {stream_name}"
-                    )
-                    # Acknowledge the message
-                    await self.redis.xack(self.stream_name, self.group_name, message_id)
-
-                    payload = json.loads(fields[b"payload"])
-                    await self.output_queue.put(payload)
+            if messages:
+                claimed += len(messages)
+                await self._handle_batch(messages)
+            if next_id in (b"0-0", "0-0"):
+                break
+            start_id = next_id
+
+        self.reclaimed += claimed
+        if claimed:
+            logger.info(
+                f"{self.worker_name} reclaimed {claimed} idle messages "
+                f"from {self.stream_name}"
+            )
+        return claimed
+
+    async def take_over(self, consumer_name: str) -> int:
+        """Claim and handle the pending messages of a retired consumer, then drop it"""
+        claimed = 0
+        while True:
+            free = await self._wait_for_room()
+            pending = await self.redis.xpending_range(
+                self.stream_name,
+                self.group_name,
+                min="-",
+                max="+",
+                count=min(self.count, free),
+                consumername=consumer_name,
+            )
+            if not pending:
+                break
+            messages = await self.redis.xclaim(
+                self.stream_name,
+                self.group_name,
+                self.worker_name,
+                0,
+                [entry["message_id"] for entry in pending],
+            )
+            claimed += len(messages)
+            if messages:
+                await self._handle_batch(messages)
+
+        await self.redis.xgroup_delconsumer(
+            self.stream_name, self.group_name, consumer_name
+        )
+        self.reclaimed += claimed
+        return claimed
+
+    async def _wait_for_room(self) -> int:
+        """Wait until the queue is under `max_queue_depth`, return the free room"""
+        while (free := self.max_queue_depth - self.output_queue.qsize()) <= 0:
+            self.backpressure_waits += 1
+            await asyncio.sleep(self.BACKPRESSURE_INTERVAL)
+        return free
+
+    async def _handle_batch(
+        self, batch: list[tuple[bytes, dict[bytes, bytes]]]
+    ) -> None:
+        self.batches += 1
+        self.received += len(batch)
+        handled: list[bytes] = []
+        for message_id, fields in batch:
+            try:
+                payload = decode_fields(fields)
+            except (KeyError, TypeError, ValueError):
+                self.malformed += 1
+                logger.error(
+                    f"Dropping malformed message {message_id!r} in {self.stream_name}"
+                )
+            else:
+                await self.output_queue.put(payload)
+            handled.append(message_id)
+
+        # One round trip for the whole batch, after the hand-off
+        self.acked += await self.redis.xack(self.stream_name, self.group_name, *handled)
+
+        # Stream IDs start with their creation time in milliseconds
+        oldest = int(handled[0].split(b"-")[0])
+        self.last_lag_ms = max(0, int(time.time() * 1000) - oldest)
+        logger.debug(
+            f"Handed off {len(batch)} messages from {self.stream_name}, "
+            f"lag {self.last_lag_ms}ms"
+        )
+
+    def stats(self) -> dict[str, Any]:
+        uptime = time.monotonic() - self.started_at
+        return {
+            "stream": self.stream_name,
+            "group": self.group_name,
+            "worker": self.worker_name,
+            "batches": self.batches,
+            "received": self.received,
+            "acked": self.acked,
+            "reclaimed": self.reclaimed,
+            "malformed": self.malformed,
+            "avg_batch_size": self.received / self.batches if self.batches else 0.0,
+            "messages_per_second": self.received / uptime if uptime else 0.0,
+            "last_lag_ms": self.last_lag_ms,
+            "queue_depth": self.output_queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "backpressure_waits": self.backpressure_waits,
+        }
+
+
+# Every consumer of the process, for the metrics
+consumers: "weakref.WeakSet[Consumer]" = weakref.WeakSet()
+
+CONSUMER_LABELS = ("stream", "group", "consumer")
+CONSUMER_LAG = registry.gauge(
+    "stream_consumer_lag_ms",
+    "Age of the oldest message of the last batch handed off",
+    CONSUMER_LABELS,
+)
+CONSUMER_QUEUE_DEPTH = registry.gauge(
+    "stream_consumer_queue_depth",
+    "Payloads waiting in the output queue",
+    CONSUMER_LABELS,
+)
+CONSUMER_RECEIVED = registry.counter(
+    "stream_consumer_received_total", "Messages read from the stream", CONSUMER_LABELS
+)
+CONSUMER_ACKED = registry.counter(
+    "stream_consumer_acked_total", "Messages acknowledged", CONSUMER_LABELS
+)
+
+
+@registry.collect_with
+def collect_consumer_metrics() -> None:
+    for metric in (
+        CONSUMER_LAG,
+        CONSUMER_QUEUE_DEPTH,
+        CONSUMER_RECEIVED,
+        CONSUMER_ACKED,
+    ):
+        metric.clear()
+    for consumer in list(consumers):
+        labels = (consumer.stream_name, consumer.group_name, consumer.worker_name)
+        CONSUMER_LAG.set(consumer.last_lag_ms, *labels)
+        CONSUMER_QUEUE_DEPTH.set(consumer.output_queue.qsize(), *labels)
+        CONSUMER_RECEIVED.set_total(consumer.received, *labels)
+        CONSUMER_ACKED.set_total(consumer.acked, *labels)
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import socket
+from typing import Any, TypeVar
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.env_reader import EnvReader
+from app.logs_config import get_logger
+
+from .consumer import Consumer
+
+logger = get_logger()
+
+T = TypeVar("T")
+
+
+class ConsumerPool:
+    """
+    Runs `size` consumers of one consumer group in this process.
+
+    Consumers are named `<host>-<pid>-<n>`, so pools in other processes and
+    on other nodes join the same group without clashing, and Redis spreads
+    new messages over all of them.
+
+    - Every `claim_interval` seconds one consumer reclaims the messages
+      pending for more than `claim_idle_ms`, i.e. read by a consumer that
+      died before acknowledging them.
+    - `scale` adds or retires consumers. The pending messages of a retired
+      consumer are taken over by a remaining one straight away.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        stream_name: str,
+        group_name: str,
+        output_queue: asyncio.Queue[T],
+        size: int = EnvReader.CONSUMER_POOL_SIZE,
+        claim_idle_ms: int = EnvReader.CONSUMER_CLAIM_IDLE_MS,
+        claim_interval: float = EnvReader.CONSUMER_CLAIM_INTERVAL_SECONDS,
+        **consumer_options: Any,
+    ) -> None:
+        self.redis = redis
+        self.stream_name = stream_name
+        self.group_name = group_name
+        self.output_queue = output_queue
+        self.size = max(1, size)
+        self.claim_idle_ms = claim_idle_ms
+        self.claim_interval = claim_interval
+        self.consumer_options = consumer_options
+        self.name_prefix = f"{socket.gethostname()}-{os.getpid()}"
+
+        self._consumers: list[Consumer] = []
+        self._tasks: list[asyncio.Task[None]] = []
+        self._reclaim_task: asyncio.Task[None] | None = None
+        self._next_number = 1
+
+    async def start(self) -> None:
+        await self.scale(self.size)
+        self._reclaim_task = asyncio.create_task(self._reclaim_loop())
+        logger.info(
+            f"Started {self.size} consumers of {self.group_name} on {self.stream_name}"
+        )
+
+    async def stop(self) -> None:
+        """
+        Cancel every consumer. Messages they read but did not acknowledge are
+        reclaimed by the other pools of the group once they are idle.
+        """
+        tasks = [*self._tasks, *([self._reclaim_task] if self._reclaim_task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._consumers.clear()
+        self._tasks.clear()
+        self._reclaim_task = None
+
+    async def scale(self, size: int) -> None:
+        size = max(1, size)
+        while len(self._consumers) < size:
+            consumer = Consumer(
+                self.redis,
+                self.stream_name,
+                self.group_name,
+                self.output_queue,
+                consumer_name=f"{self.name_prefix}-{self._next_number}",
+                **self.consumer_options,
+            )
+            self._next_number += 1
+            self._consumers.append(consumer)
+            self._tasks.append(asyncio.create_task(self._run(consumer)))
+
+        while len(self._consumers) > size:
+            retired = self._consumers.pop()
+            task = self._tasks.pop()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            try:
+                await self._consumers[0].take_over(retired.worker_name)
+            except RedisError as e:
+                # Left to the periodic reclaim
+                logger.warning(f"Could not take over {retired.worker_name}: {e}")
+
+        self.size = size
+
+    async def _run(self, consumer: Consumer) -> None:
+        while True:
+            try:
+                await consumer.consume()
+            except RedisError as e:
+                logger.warning(f"Consumer {consumer.worker_name} lost Redis: {e}")
+                await asyncio.sleep(1)
+
+    async def _reclaim_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.claim_interval)
+            if not self._consumers:
+                continue
+            try:
+                await self._consumers[0].reclaim(self.claim_idle_ms)
+            except RedisError as e:
+                logger.warning(f"Could not reclaim idle messages: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        consumers = [consumer.stats() for consumer in self._consumers]
+        return {
+            "stream": self.stream_name,
+            "group": self.group_name,
+            "size": len(consumers),
+            "received": sum(c["received"] for c in consumers),
+            "acked": sum(c["acked"] for c in consumers),
+            "reclaimed": sum(c["reclaimed"] for c in consumers),
+            "queue_depth": self.output_queue.qsize(),
+            "consumers": consumers,
+        }
@@ -1,11 +1,15 @@
-import datetime
-import enum
-import json
-from typing import Any, Mapping
+import asyncio
+from typing import Any, Iterable, Mapping
 
 from redis.asyncio import Redis
+from redis.exceptions import RedisError
 from redis.typing import EncodableT, FieldT
 
+from app.env_reader import EnvReader
+
+from .codecs import Fields, get_codec, schema_for, to_redis_fields
+from .streams import Streams
+
 
 class Dispatcher:
     @staticmethod
@@ -13,33 +17,155 @@ class Dispatcher:
         payload: Mapping[str, Any],
     ) -> dict[FieldT, EncodableT]:
         """
-        Convert a dict-like payload into Redis-safe fields for XADD/HSET/etc.
-        - str, int, float, bytes → kept as-is
-        - bool → "1"/"0"
-        - Enum → its value (if str/int) else its name
-        - datetime/date → ISO 8601 string
-        - dict/list/other → JSON string
+        Convert a dict-like payload into Redis-safe fields, see
+        `codecs.to_redis_fields`
+        """
+        return to_redis_fields(payload)
+
+    def __init__(
+        self,
+        redis: Redis,
+        coalesce_ms: int = EnvReader.DISPATCH_COALESCE_MS,
+        max_batch: int = EnvReader.DISPATCH_COALESCE_MAX_BATCH,
+        codec: str = EnvReader.STREAM_CODEC,
+    ) -> None:
+        """
+        With a `coalesce_ms` window, `start` runs a background coalescer:
+        `dispatch` calls made within the window, or until `max_batch` of them
+        are waiting, are sent together as one pipeline. `dispatch` still only
+        returns once its message is in the stream.
+
+        Payloads of the streams listed in `Streams.PAYLOADS` are encoded with
+        `codec`, other mappings as JSON. Strings are sent as they are.
         """
-        out: dict[FieldT, EncodableT] = {}
-
-        for k, v in payload.items():
-            if v is None:
-                continue  # skip None fields (or store as "")
-            elif isinstance(v, (str, int, float, bytes)):
-                out[k] = v
-            elif isinstance(v, bool):
-                out[k] = "1" if v else "0"
-            elif isinstance(v, enum.Enum):
-                out[k] = v.value if isinstance(v.value, (str, int, float)) else v.name
-            elif isinstance(v, (datetime.date, datetime.datetime)):
-                out[k] = v.isoformat()
-            else:
-                out[k] = json.dumps(v, separators=(",", ":"), ensure_ascii=True)
-
-        return out
-
-    def __init__(self, redis: Redis) -> None:
         self.redis = redis
+        self.codec = get_codec(codec)
+        self.coalesce_ms = coalesce_ms
+        self.max_batch = max_batch
+        self._pending: list[tuple[str, Fields, asyncio.Future[bytes]]] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+        # Metrics
+        self.dispatched = 0
+        self.pipelines = 0
+
+    async def start(self) -> None:
+        if self.coalesce_ms > 0 and self._task is None:
+            self._task = asyncio.create_task(self._coalesce())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._pending:
+            await self._flush()
+
+    def encode(self, stream_name: str, payload: str | Mapping[str, Any]) -> Fields:
+        if isinstance(payload, str):
+            return {"payload": payload}  # Already serialized as JSON
+
+        typed_dict = Streams.PAYLOADS.get(stream_name)
+        if typed_dict is None:
+            return get_codec("json").encode(None, payload)
+        return self.codec.encode(schema_for(typed_dict), payload)
+
+    async def dispatch(
+        self, stream_name: str, payload: str | Mapping[str, Any]
+    ) -> None:
+        fields = self.encode(stream_name, payload)
+        if self._task is None:
+            await self._send([(stream_name, fields)])
+            return
+
+        future: asyncio.Future[bytes] = asyncio.get_running_loop().create_future()
+        self._pending.append((stream_name, fields, future))
+        if len(self._pending) in (1, self.max_batch):
+            self._wakeup.set()
+        await future
+
+    async def dispatch_many(
+        self, messages: Iterable[tuple[str, str | Mapping[str, Any]]]
+    ) -> list[bytes]:
+        """
+        Add `(stream_name, payload)` messages in a single pipeline, trimming the
+        streams as configured in `Streams.TRIMMING`. Returns the message IDs.
+        """
+        return await self._send(
+            [
+                (stream_name, self.encode(stream_name, payload))
+                for stream_name, payload in messages
+            ]
+        )
+
+    async def _send(self, messages: list[tuple[str, Fields]]) -> list[bytes]:
+        if not messages:
+            return []
+
+        trim_options: dict[str, dict[str, Any]] = {}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for stream_name, fields in messages:
+                if stream_name not in trim_options:
+                    trim_options[stream_name] = Streams.trim_for(
+                        stream_name
+                    ).xadd_options()
+                pipe.xadd(stream_name, fields, **trim_options[stream_name])
+            message_ids: list[bytes] = await pipe.execute()
+
+        self.dispatched += len(messages)
+        self.pipelines += 1
+        return message_ids
+
+    async def _coalesce(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if len(self._pending) < self.max_batch:
+                # Give other dispatches the window to join the pipeline
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=self.coalesce_ms / 1000
+                    )
+                except TimeoutError:
+                    pass
+                self._wakeup.clear()
+            await self._flush()
+            if self._pending:
+                self._wakeup.set()
+
+    async def _flush(self) -> None:
+        batch = self._pending[: self.max_batch]
+        del self._pending[: self.max_batch]
+        try:
+            message_ids = await self._send(
+                [(stream_name, fields) for stream_name, fields, _ in batch]
+            )
+        except asyncio.CancelledError:
+            for _, _, future in batch:
+                future.cancel()
+            raise
+        except RedisError as e:
+            # Each caller gets the error of the pipeline its message was in
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), message_id in zip(batch, message_ids):
+            if not future.done():
+                future.set_result(message_id)
 
-    async def dispatch(self, stream_name: str, payload: str) -> None:
-        await self.redis.xadd(stream_name, {"payload": payload})
+    def stats(self) -> dict[str, int | float | bool]:
+        return {
+            "coalescing": self._task is not None and not self._task.done(),
+            "dispatched": self.dispatched,
+            "pipelines": self.pipelines,
+            "avg_pipeline_size": self.dispatched / self.pipelines
+            if self.pipelines
+            else 0.0,
+            "pending": len(self._pending),
+        }
@@ -1,5 +1,48 @@
+import time
+from typing import Any, ClassVar, NamedTuple
+
+from app.env_reader import EnvReader
+
+from .payloads import EngagementJobCommand, UserValidationJobCommand
+
+
+class StreamTrim(NamedTuple):
+    """
+    Approximate trimming applied on every XADD to a stream, either by length
+    (`MAXLEN ~`) or by age (`MINID ~`, computed from `max_age_seconds`).
+    """
+
+    maxlen: int | None = None
+    max_age_seconds: int | None = None
+
+    def xadd_options(self) -> dict[str, Any]:
+        if self.max_age_seconds is not None:
+            min_ms = int(time.time() * 1000) - self.max_age_seconds * 1000
+            return {"minid": f"{min_ms}-0", "approximate": True}
+        if self.maxlen is not None:
+            return {"maxlen": self.maxlen, "approximate": True}
+        return {}
+
+
 class Streams:
     VALIDATION_JOB_COMMANDS = "commands.jobs.user_validation"
     ENGAGEMENT_JOB_COMMANDS = "commands.jobs.engagement"
     FOLLOW_JOBS_COMMANDS = "commands.jobs.followers_scraping"
     CONS_WORKERS_COMMANDS = "commands.workers.conversation"
+
+    # Payload type of each stream, encoded with the codec of the dispatcher
+    PAYLOADS: ClassVar[dict[str, type]] = {
+        VALIDATION_JOB_COMMANDS: UserValidationJobCommand,
+        ENGAGEMENT_JOB_COMMANDS: EngagementJobCommand,
+    }
+
+    # Trimming is opt-in: it drops entries whether or not they were delivered
+    # and acked, so streams not listed here are kept whole unless
+    # STREAM_DEFAULT_MAXLEN is set
+    TRIMMING: ClassVar[dict[str, StreamTrim]] = {}
+
+    @classmethod
+    def trim_for(cls, stream_name: str) -> StreamTrim:
+        return cls.TRIMMING.get(stream_name) or StreamTrim(
+            maxlen=EnvReader.STREAM_DEFAULT_MAXLEN or None
+        )
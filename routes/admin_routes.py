@@ -1,31 +1,55 @@
-from typing import Any
+from typing import Any, Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 from app.auth_service import create_access_token, get_admin_user, verify_password
-from app.logs_config import get_logger
-from db_handles.admin_settings import AdminSettings
-from db_handles.session import async_session
+from app.blob_store import blob_store
+from app.deps import UnitOfWorkRoute, get_dispatcher, get_unit_of_work
+from app.logs_config import get_logger, logging_stats
+from app.metrics import PROMETHEUS_CONTENT_TYPE, metrics_publisher, render
+from app.pagination import decode_cursor, encode_cursor
+from app.password_hasher import password_hasher
+from app.startup import startup_profile
+from app.token_cache import token_cache
+from app.uploads import upload_stats
+from app.user_export import EXPORT_FORMATS, export_users
+from db_handles.admin_settings import AdminSettings, settings_store
+from db_handles.session import UnitOfWork, get_pool_stats
 from db_handles.user import User
-from models.admin import Log, Role
+from db_handles.user_cache import user_cache
+from middlewares.standard_response import FastJSONResponse
+from models.admin import BulkUserAction, BulkUserResult, Log, Role
 from models.admin_settings import AdminSettingsOutput, AdminSettingsUpdate
 from models.auth import UserLogin
-from models.user import UserPublic
+from models.user import UserPublic, users_page_adapter
+from redis_handlers.broadcast import broadcaster
+from redis_handlers.client import redis_pool
+from redis_handlers.dispatcher import Dispatcher
 
-logger = get_logger()
+logger = get_logger("admin")
 
 
-admin_router = APIRouter(prefix="/admin", tags=["Admin"])
+admin_router = APIRouter(prefix="/admin", tags=["Admin"], route_class=UnitOfWorkRoute)
+
+# Flags set by each bulk action, "delete" deletes the users instead
+BULK_USER_FLAGS: dict[str, dict[str, bool]] = {
+    "block": {"is_blocked": True},
+    "unblock": {"is_blocked": False},
+    "promote": {"is_admin": True},
+    "demote": {"is_admin": False},
+}
 
 
 @admin_router.post("/login")
-async def admin_login(user_data: UserLogin) -> dict[str, str]:
+async def admin_login(
+    user_data: UserLogin, uow: UnitOfWork = Depends(get_unit_of_work)
+) -> dict[str, str]:
     """Authenticate admin and return JWT token"""
-    user = await User.get_by_email(user_data.email)
+    user = await User.get_by_email(user_data.email, uow=uow)
     if (
         not user
-        or not verify_password(user_data.password, user.hashed_password)
+        or not await verify_password(user_data.password, user.hashed_password)
         or not user.is_admin
     ):
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -40,67 +64,111 @@ async def get_admin_settings(
 ) -> AdminSettingsOutput:
     """Retrieve global admin settings"""
     logger.debug("/settings was called to get the admin settings ...")
-    settings = await AdminSettings.get_settings()
-
-    assert isinstance(settings, AdminSettings), (
-        "Admin settings not found even though it should be"
-    )
-
-    return settings.output_version()
+    return await AdminSettings.get_snapshot()
 
 
 @admin_router.put("/settings/")
 async def update_admin_settings(
-    new_settings: AdminSettingsUpdate, admin: User = Depends(get_admin_user)
+    new_settings: AdminSettingsUpdate,
+    admin: User = Depends(get_admin_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ) -> dict[str, str]:
     """Update global admin settings"""
 
-    settings = await AdminSettings.get_settings()
-
-    assert isinstance(settings, AdminSettings), (
-        "Admin settings not found even though it should be"
+    # Only the fields sent by the admin, the others keep their current value
+    settings = await AdminSettings.update_settings(
+        uow=uow, **new_settings.model_dump(exclude_unset=True)
     )
 
-    await settings.update_settings(**new_settings.model_dump())
+    logger.debug("Updating admin settings to new settings: %s", new_settings)
 
-    logger.debug(f"Updating admin settings to new settings: {new_settings}")
-
-    logger.debug(f"Admin settings updated: {settings}")
+    logger.debug("Admin settings updated: %s", settings)
 
     return {"message": "Admin settings updated successfully"}
 
 
-@admin_router.get("/users/")
+@admin_router.get("/users/", response_class=FastJSONResponse)
 async def get_all_users(
     count: int = Query(10, gt=0, le=100),  # Limit: max 100 users per request
-    cursor: int | None = None,  # Use created_at as cursor (timestamp int)
+    cursor: str | None = None,  # The `next_cursor` of the previous page
+    is_admin: bool | None = None,
+    is_blocked: bool | None = None,
+    email_prefix: str | None = Query(None, min_length=1, max_length=255),
     admin: User = Depends(get_admin_user),
-) -> dict[str, Any]:
+    uow: UnitOfWork = Depends(get_unit_of_work),
+) -> FastJSONResponse:
     """Retrieve paginated list of all registered users (Admin-only)"""
+    filters = User.public_filters(is_admin, is_blocked, email_prefix)
+    after = decode_cursor(cursor) if cursor else None
 
-    # Build base query: order by created_at descending (newest first)
-    stmt = select(User).order_by(User.created_at.desc()).limit(count)
+    # One extra row tells whether there is a next page
+    rows = await User.public_page(count + 1, after, filters, uow=uow)
+    page, more = rows[:count], len(rows) > count
 
-    # If cursor is provided, fetch users with created_at < cursor
-    if cursor:
-        stmt = stmt.where(User.created_at < cursor)
+    # Rows go straight to JSON bytes, without building `UserPublic` models
+    users = [User.public_row(row) for row in page]
+    next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if more else None
 
-    async with async_session() as session:
-        result = await session.execute(stmt)
-        users_db = result.scalars().all()
+    # Only estimated for the first page, the total hardly moves while paging
+    total = None if after else await User.estimate_count(filters, uow=uow)
+
+    return FastJSONResponse(
+        {"users": users, "next_cursor": next_cursor, "approximate_total": total},
+        adapter=users_page_adapter,
+    )
 
-    # Convert to public version
-    users = [user.public_version() for user in users_db]
 
-    # Get next cursor (last user's created_at)
-    next_cursor = users_db[-1].created_at if users_db else None
+@admin_router.post("/users/bulk", response_model=BulkUserResult)
+async def bulk_user_action(
+    request: BulkUserAction,
+    admin: User = Depends(get_admin_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+) -> BulkUserResult:
+    """Block, unblock, promote, demote or delete many users in one statement"""
+    user_ids = list(dict.fromkeys(request.user_ids))
+    if request.action in ("block", "demote", "delete") and admin.id in user_ids:
+        raise HTTPException(
+            status_code=400, detail=f"Admins cannot {request.action} themselves"
+        )
+
+    if request.action == "delete":
+        affected = await User.delete_many(user_ids, uow=uow)
+    else:
+        affected = await User.set_flags(
+            user_ids, uow=uow, **BULK_USER_FLAGS[request.action]
+        )
+
+    found = set(affected)
+    logger.info("Bulk %s of %s users by admin %s", request.action, len(found), admin.id)
+    return BulkUserResult(
+        action=request.action,
+        requested=len(user_ids),
+        affected=affected,
+        not_found=[user_id for user_id in user_ids if user_id not in found],
+    )
+
 
-    return {"users": users, "next_cursor": next_cursor}
+@admin_router.get("/users/export")
+async def export_all_users(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    admin: User = Depends(get_admin_user),
+) -> StreamingResponse:
+    """Stream every user as NDJSON or CSV, with bounded memory (Admin-only)"""
+    logger.info("User export as %s by admin %s", format, admin.id)
+    return StreamingResponse(
+        export_users(format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
 
 
 @admin_router.get("/users/{user_id}", response_model=UserPublic)
-async def get_user(user_id: str, admin: User = Depends(get_admin_user)) -> UserPublic:
-    user = await User.get_by_id(int(user_id))
+async def get_user(
+    user_id: str,
+    admin: User = Depends(get_admin_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+) -> UserPublic:
+    user = await User.get_by_id(int(user_id), uow=uow)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user.public_version()
@@ -108,9 +176,11 @@ async def get_user(user_id: str, admin: User = Depends(get_admin_user)) -> UserP
 
 @admin_router.put("/users/{user_id}", response_model=UserPublic)
 async def update_user(
-    user_id: str, admin: User = Depends(get_admin_user)
+    user_id: str,
+    admin: User = Depends(get_admin_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ) -> UserPublic:
-    user = await User.get_by_id(int(user_id))
+    user = await User.get_by_id(int(user_id), uow=uow)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     # await user.update_settings(**new_settings.model_dump())
@@ -118,24 +188,60 @@ async def update_user(
 
 
 @admin_router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(user_id: str, admin: User = Depends(get_admin_user)) -> None:
-    user = await User.get_by_id(int(user_id))
+async def delete_user(
+    user_id: str,
+    admin: User = Depends(get_admin_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+) -> None:
+    user = await User.get_by_id(int(user_id), uow=uow)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    await user.delete()
+    await user.delete(uow=uow)
     return
 
 
 # 2. Platform Stats (/admin/stats)
 @admin_router.get("/stats", response_model=dict)
 async def get_platform_stats(admin: User = Depends(get_admin_user)) -> dict[str, int]:
-    user_count = await User.get_count()
+    counts = await User.get_stats()
+    return {
+        "user_count": counts["total"],
+        "active_users": counts["active"],  # Users that are not blocked
+        "admin_users": counts["admins"],
+        "blocked_users": counts["blocked"],
+    }
+
+
+@admin_router.get("/runtime")
+async def get_runtime_stats(
+    admin: User = Depends(get_admin_user),
+    dispatcher: Dispatcher = Depends(get_dispatcher),
+) -> dict[str, Any]:
+    """Runtime statistics of the worker that served the request"""
     return {
-        "user_count": user_count,
-        "active_users": await User.get_count(),
+        "password_hasher": password_hasher.stats(),
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "admin_settings": settings_store.stats(),
+        "uploads": upload_stats.stats(),
+        "blobs": blob_store.stats(),
+        "broadcaster": broadcaster.stats(),
+        "dispatcher": dispatcher.stats(),
+        "redis_pool": redis_pool.stats(),
+        "db_pool": get_pool_stats(),
+        "startup": startup_profile.stats(),
+        "logging": logging_stats(),
+        "metrics": metrics_publisher.stats(),
     }
 
 
+@admin_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(admin: User = Depends(get_admin_user)) -> PlainTextResponse:
+    """Metrics of every worker, in the Prometheus text format"""
+    snapshots = await metrics_publisher.collect()
+    return PlainTextResponse(render(snapshots), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 # 3. System-wide Logs (/admin/logs)
 @admin_router.get("/logs", response_model=list[Log])
 async def get_logs(admin: User = Depends(get_admin_user)) -> list[Log]:
@@ -1,12 +1,21 @@
 from typing import Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Security
+from sqlalchemy.exc import IntegrityError
 
 from app.auth_service import (
     create_access_token,
     get_current_user,
+    oauth2_scheme,
+    revoke_token,
     verify_password,
 )
+from app.deps import (
+    UnitOfWorkRoute,
+    get_unit_of_work,
+    require_registration_enabled,
+)
+from db_handles.session import UnitOfWork
 from db_handles.user import User
 from models.auth import (
     EmailRequest,
@@ -17,32 +26,47 @@ from models.auth import (
     VerifyEmailRequest,
 )
 
-auth_router: APIRouter = APIRouter(prefix="/auth", tags=["Authentication"])
+auth_router: APIRouter = APIRouter(
+    prefix="/auth", tags=["Authentication"], route_class=UnitOfWorkRoute
+)
 
 
-@auth_router.post("/signup/")
-async def signup(user_data: UserSignup) -> Dict[str, str]:
+@auth_router.post("/signup/", dependencies=[Depends(require_registration_enabled)])
+async def signup(
+    user_data: UserSignup, uow: UnitOfWork = Depends(get_unit_of_work)
+) -> Dict[str, str]:
     """Register a new user"""
-    existing_user: Optional[User] = await User.get_by_email(user_data.email)
+    existing_user: Optional[User] = await User.get_by_email(user_data.email, uow=uow)
     if existing_user:
         raise HTTPException(
             status_code=400, detail="User already exists with this email"
         )
 
-    await User.create(
-        email=user_data.email,
-        password=user_data.password,
-        full_name=user_data.full_name or "",
-        is_admin=False,
+    try:
+        await User.create(
+            email=user_data.email,
+            password=user_data.password,
+            full_name=user_data.full_name or "",
+            is_admin=False,
+            uow=uow,
+        )
+    except IntegrityError:
+        # Lost the race to a concurrent signup with the same email
+        raise HTTPException(
+            status_code=400, detail="User already exists with this email"
+        )
+    return await login(
+        UserLogin(email=user_data.email, password=user_data.password), uow=uow
     )
-    return await login(UserLogin(email=user_data.email, password=user_data.password))
 
 
 @auth_router.post("/login/")
-async def login(user_data: UserLogin) -> Dict[str, str]:
+async def login(
+    user_data: UserLogin, uow: UnitOfWork = Depends(get_unit_of_work)
+) -> Dict[str, str]:
     """Authenticate user and return JWT"""
-    user: Optional[User] = await User.get_by_email(user_data.email)
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    user: Optional[User] = await User.get_by_email(user_data.email, uow=uow)
+    if not user or not await verify_password(user_data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token: str = create_access_token(data={"user_id": user.id})
@@ -50,8 +74,11 @@ async def login(user_data: UserLogin) -> Dict[str, str]:
 
 
 @auth_router.post("/logout")
-def logout(current_user: User = Depends(get_current_user)) -> dict[str, str]:
-    # Normally you'd blacklist the token here
+async def logout(
+    token: str = Security(oauth2_scheme),
+    current_user: User = Depends(get_current_user),
+) -> dict[str, str]:
+    await revoke_token(token)
     return {"message": "Logged out successfully"}
 
 
@@ -1,16 +1,27 @@
 import os
 from pathlib import Path
-from uuid import uuid4
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 
+from app.blob_store import blob_store
+from app.deps import (
+    UnitOfWorkRoute,
+    get_unit_of_work,
+    require_file_upload_enabled,
+)
+from app.downloads import DownloadResponse, stat_file, strong_etag
+from app.env_reader import EnvReader
 from app.gvs import UPLOADS_DIR
 from app.types import GeneralDict
+from app.uploads import receive_upload
+from db_handles.session import UnitOfWork
+from db_handles.stored_file import StoredFile
 
-file_router = APIRouter(prefix="/files", tags=["File Management"])
+file_router = APIRouter(
+    prefix="/files", tags=["File Management"], route_class=UnitOfWorkRoute
+)
 
-# Define the directory where files will be stored
+# Files uploaded before the blob store, stored flat under their ID
 UPLOAD_DIR = Path(UPLOADS_DIR)
 
 
@@ -20,39 +31,56 @@ def get_file_path(file_id: str) -> Path:
 
 
 # File Upload Route
-@file_router.post("/upload")
-async def upload_file(file: UploadFile = File(...)) -> GeneralDict:
-    # Generate a unique file ID (UUID) for the uploaded file
-    file_id = str(uuid4())
+@file_router.post("/upload", dependencies=[Depends(require_file_upload_enabled)])
+async def upload_file(
+    file: UploadFile = File(...), uow: UnitOfWork = Depends(get_unit_of_work)
+) -> GeneralDict:
+    # Stream the upload to disk in chunks, off the event loop
+    upload = await receive_upload(file, blob_store.temp_dir, EnvReader.MAX_UPLOAD_BYTES)
 
-    # Define the path to save the file
-    file_path = UPLOAD_DIR / file_id
-
-    # Save the uploaded file
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    # Give it a new file ID, identical contents share the same blob
+    stored_file = await StoredFile.create(upload, uow=uow)
 
     # Return the file ID for later reference
-    return {"file_id": file_id}
+    return {
+        "file_id": stored_file.id,
+        "size": stored_file.blob.size,
+        "sha256": stored_file.sha256,
+        "content_type": stored_file.blob.content_type,
+    }
 
 
 # File Download Route
 @file_router.get("/download/{file_id}")
-async def download_file(file_id: str) -> FileResponse:
-    file_path = get_file_path(file_id)
+async def download_file(
+    file_id: str, uow: UnitOfWork = Depends(get_unit_of_work)
+) -> DownloadResponse:
+    stored_file = await StoredFile.get(file_id, uow=uow)
+    if stored_file is not None:
+        file_path = stored_file.path
+        media_type: str | None = stored_file.blob.content_type
+        etag: str | None = strong_etag(stored_file.sha256)
+    else:
+        file_path, media_type, etag = get_file_path(file_id), None, None
 
     # Check if the file exists
-    if not file_path.exists():
+    stat_result = await stat_file(file_path)
+    if stat_result is None:
         raise HTTPException(status_code=404, detail="File not found")
 
-    # Return the file as a download response
-    return FileResponse(file_path)
+    # Return the file, honoring conditional and range requests
+    return DownloadResponse(file_path, stat_result, media_type=media_type, etag=etag)
 
 
 # File Deletion Route
 @file_router.delete("/delete/{file_id}")
-async def delete_file(file_id: str) -> GeneralDict:
+async def delete_file(
+    file_id: str, uow: UnitOfWork = Depends(get_unit_of_work)
+) -> GeneralDict:
+    # The blob itself is only removed with its last reference
+    if await StoredFile.delete(file_id, uow=uow):
+        return {"message": "File deleted successfully"}
+
     file_path = get_file_path(file_id)
 
     # Check if the file exists
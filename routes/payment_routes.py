@@ -1,11 +1,10 @@
 import json
 from typing import Any
 
-import httpx
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse
 
 from app.auth_service import get_current_user
+from app.deps import UnitOfWorkRoute
 from app.env_reader import EnvReader
 from app.logs_config import get_logger
 from app.settings import (
@@ -18,10 +17,12 @@ from db_handles.admin_settings import AdminSettings
 from db_handles.user import User
 from models.payment import PaymentStatusUpdate
 
-logger = get_logger()
+logger = get_logger("payments")
 
 
-payments_router = APIRouter(prefix="/payments", tags=["Payments"])
+payments_router = APIRouter(
+    prefix="/payments", tags=["Payments"], route_class=UnitOfWorkRoute
+)
 
 
 CREATE_INCOIVE = "/create-invoice"
@@ -35,7 +36,7 @@ async def create_payment(user: User = Depends(get_current_user)) -> dict[str, An
         logger.debug("NOWPayments API key not set")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-    admin_settings = await AdminSettings.get_settings()
+    admin_settings = await AdminSettings.get_snapshot()
     if not admin_settings:
         raise HTTPException(
             403, "Payments are not enabled by admin yet! Please try again later!"
@@ -51,19 +52,25 @@ async def create_payment(user: User = Depends(get_current_user)) -> dict[str, An
         "cancel_url": f"https://{EnvReader.FRONTEND_HOST}/dashboard",
         "is_fee_paid_by_user": NOWPAYMENTS_FEE_PAID_BY_USER,
     }
-    logger.debug(f"Invoice creation payload for NowPayments: {payload}")
+    logger.debug("Invoice creation payload for NowPayments: %s", payload)
     headers: dict[str, Any] = {
         "x-api-key": EnvReader.NOWPAYMENTS_API_KEY,
         "Content-Type": "application/json",
     }
-    logger.debug(f"Headers for NowPayments API: {headers}")
+    logger.debug("Headers for NowPayments API: %s", headers)
+
+    # httpx is slow to import and only needed here
+    import httpx
 
     async with httpx.AsyncClient() as client:
         response = await client.post(
             f"{NOWPAYMENTS_API_BASE}/invoice", json=payload, headers=headers
         )
         logger.debug(
-            f"Invoice creation response from NowPayments: {response.text}, status code: {response.status_code}, reason: {response.reason_phrase}"
+            "Invoice creation response from NowPayments: %s, status code: %s, reason: %s",
+            response.text,
+            response.status_code,
+            response.reason_phrase,
         )
 
     if response.status_code != 200:
@@ -84,7 +91,7 @@ async def create_payment(user: User = Depends(get_current_user)) -> dict[str, An
     invoice_details.pop("collect_user_data", "")
     invoice_details.pop("source", "")
 
-    logger.debug(f"Final invoice to send out to user: {invoice_details}")
+    logger.debug("Final invoice to send out to user: %s", invoice_details)
 
     return invoice_details
 
@@ -92,12 +99,12 @@ async def create_payment(user: User = Depends(get_current_user)) -> dict[str, An
 @payments_router.post(PAYMENT_CONFIRMATION)
 async def handle_payment_webhook(
     request: Request, payload: PaymentStatusUpdate
-) -> JSONResponse:
+) -> dict[str, str]:
     """Receive payment status from NOWPayments and activate subscription"""
-    logger.debug(f"Payment update received: {payload}")
+    logger.debug("Payment update received: %s", payload)
 
     x_now_payments_sig = request.headers.get("x-nowpayments-sig", None)
-    logger.debug(f"x-nowpayments-sig header: {x_now_payments_sig}")
+    logger.debug("x-nowpayments-sig: %s", x_now_payments_sig)
 
     if not x_now_payments_sig:
         raise HTTPException(status_code=403, detail="Missing x-nowpayments-sig header")
@@ -112,7 +119,7 @@ async def handle_payment_webhook(
 
     if payload.payment_status.lower() == "finished":
         if not payload.order_id:
-            logger.debug(f"Order ID was not found in the payload: {payload}")
+            logger.debug("Order ID was not found in the payload: %s", payload)
             raise HTTPException(
                 status_code=400, detail="Order ID not found in the payload"
             )
@@ -121,11 +128,11 @@ async def handle_payment_webhook(
 
         if user:
             # Activate subscription
-            logger.debug(f"Paying user found: {user}")
-            logger.debug(f"Activating the subscription for user: {user.id}")
-            logger.debug(f"User subscription updated: {user}")
+            logger.debug("Paying user found: %s", user)
+            logger.debug("Activating the subscription for user: %s", user.id)
+            logger.debug("User subscription updated: %s", user)
 
         else:
-            logger.error(f"Paying user was not found {payload.order_id}")
+            logger.error("Paying user was not found %s", payload.order_id)
 
-    return JSONResponse(status_code=200, content={"message": "Webhook received"})
+    return {"message": "Webhook received"}
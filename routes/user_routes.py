@@ -1,11 +1,19 @@
-import os
 from typing import Dict
-from uuid import uuid4
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 
-from app.auth_service import get_current_user, hash_password, verify_password
+from app.auth_service import get_current_user, verify_password
+from app.blob_store import blob_store
+from app.deps import (
+    UnitOfWorkRoute,
+    get_unit_of_work,
+    require_file_upload_enabled,
+)
+from app.env_reader import EnvReader
 from app.types import GeneralDict
+from app.uploads import receive_upload
+from db_handles.session import UnitOfWork
+from db_handles.stored_file import StoredFile
 from db_handles.user import User
 from models.user import (
     ActivityLog,
@@ -15,22 +23,29 @@ from models.user import (
     UserSettings,
 )
 
-user_router: APIRouter = APIRouter(prefix="/user", tags=["User"])
+user_router: APIRouter = APIRouter(
+    prefix="/user", tags=["User"], route_class=UnitOfWorkRoute
+)
 
 
 @user_router.get("/settings", response_model=UserSettings)
-async def get_settings(user: User = Depends(get_current_user)) -> UserSettings:
+async def get_settings(
+    user: User = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+) -> UserSettings:
     """Retrieve user settings"""
-    await user.get_settings()
+    await user.get_settings(uow=uow)
     return UserSettings()
 
 
 @user_router.put("/settings", status_code=status.HTTP_200_OK)
 async def update_settings(
-    new_settings: UserSettings, user: User = Depends(get_current_user)
+    new_settings: UserSettings,
+    user: User = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ) -> Dict[str, str]:
     """Update user settings"""
-    await user.update_settings(**new_settings.model_dump())
+    await user.update_settings(uow=uow, **new_settings.model_dump())
     return {"message": "Settings updated successfully"}
 
 
@@ -42,25 +57,25 @@ async def get_profile(user: User = Depends(get_current_user)) -> UserPublic:
 
 @user_router.put("/change-password/", status_code=status.HTTP_200_OK)
 async def change_password(
-    old_password: str, new_password: str, user: User = Depends(get_current_user)
+    old_password: str,
+    new_password: str,
+    user: User = Depends(get_current_user),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ) -> Dict[str, str]:
     """Change user password"""
-    if not verify_password(old_password, user.hashed_password):
+    hashed_password = await user.password_hash(uow=uow)
+    if not hashed_password or not await verify_password(old_password, hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect old password")
 
-    user.hashed_password = hash_password(new_password)
-    await user.update_settings(hashed_password=user.hashed_password)
+    await user.update_password(new_password, uow=uow)
     return {"message": "Password updated successfully"}
 
 
-# Define the directory where profile pictures will be stored
-AVATAR_DIR = "avatars"
-os.makedirs(AVATAR_DIR, exist_ok=True)
-
-
 # 1. Avatar Upload/Change
-@user_router.post("/avatar")
-async def upload_avatar(file: UploadFile = File(...)) -> GeneralDict:
+@user_router.post("/avatar", dependencies=[Depends(require_file_upload_enabled)])
+async def upload_avatar(
+    file: UploadFile = File(...), uow: UnitOfWork = Depends(get_unit_of_work)
+) -> GeneralDict:
     if not file.filename:
         raise HTTPException(400, "Missing the filename of on avatar!")
     file_extension = file.filename.split(".")[-1]
@@ -70,14 +85,17 @@ async def upload_avatar(file: UploadFile = File(...)) -> GeneralDict:
             detail="Invalid file type. Only jpg, jpeg, and png are allowed.",
         )
 
-    avatar_id = str(uuid4())
-    avatar_path = os.path.join(AVATAR_DIR, f"{avatar_id}.{file_extension}")
+    upload = await receive_upload(file, blob_store.temp_dir, EnvReader.MAX_AVATAR_BYTES)
+    if upload.detected_type not in ("image/jpeg", "image/png"):
+        await upload.discard()
+        raise HTTPException(
+            status_code=400, detail="The file content is not a jpg or png image."
+        )
 
-    with open(avatar_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    # Avatars go to the same content-addressed store as the other files
+    avatar = await StoredFile.create(upload, kind="avatar", uow=uow)
 
-    return {"message": "Profile picture uploaded successfully", "avatar_id": avatar_id}
+    return {"message": "Profile picture uploaded successfully", "avatar_id": avatar.id}
 
 
 # 2. User Notifications
@@ -0,0 +1,32 @@
+from typing import TypedDict
+
+import pytest
+
+from redis_handlers.codecs import (
+    INT64_MAX,
+    INT64_MIN,
+    BinaryCodec,
+    CodecError,
+    PayloadSchema,
+    register,
+)
+
+
+class IntPayload(TypedDict):
+    value: int
+
+
+SCHEMA = register(PayloadSchema(250, 1, IntPayload))
+codec = BinaryCodec()
+
+
+@pytest.mark.parametrize("value", [0, 1, -1, 2**31, -(2**31) - 1, INT64_MAX, INT64_MIN])
+def test_int_round_trip(value: int) -> None:
+    fields = codec.encode(SCHEMA, {"value": value})
+    assert codec.decode(fields) == {"value": value}  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize("value", [INT64_MAX + 1, INT64_MIN - 1, 2**100])
+def test_int_out_of_range(value: int) -> None:
+    with pytest.raises(CodecError):
+        codec.encode(SCHEMA, {"value": value})
@@ -0,0 +1,58 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+from starlette.types import Message
+
+from app.downloads import DownloadResponse
+
+
+def serve(response: DownloadResponse, range_header: str) -> list[Message]:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [(b"range", range_header.encode())],
+        "extensions": {},
+    }
+    messages: list[Message] = []
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    async def call() -> None:
+        # A response that loops on an empty read never finishes
+        await asyncio.wait_for(response(scope, receive, send), timeout=5)
+
+    asyncio.run(call())
+    return messages
+
+
+@pytest.fixture
+def shortened_file(tmp_path: Path) -> DownloadResponse:
+    path = tmp_path / "blob.bin"
+    path.write_bytes(bytes(range(100)))
+    response = DownloadResponse(path, os.stat(path), "application/octet-stream")
+    # Replaced by a shorter file once the response is built
+    path.write_bytes(bytes(range(10)))
+    return response
+
+
+@pytest.mark.parametrize("range_header", ["bytes=0-9,50-99", "bytes=20-99"])
+def test_truncated_file_is_not_sent(
+    shortened_file: DownloadResponse, range_header: str
+) -> None:
+    with pytest.raises(EOFError):
+        serve(shortened_file, range_header)
+
+
+def test_multiple_ranges(tmp_path: Path) -> None:
+    path = tmp_path / "blob.bin"
+    path.write_bytes(bytes(range(100)))
+    response = DownloadResponse(path, os.stat(path), "application/octet-stream")
+    body = b"".join(m.get("body", b"") for m in serve(response, "bytes=0-9,50-59"))
+    assert bytes(range(10)) in body
+    assert bytes(range(50, 60)) in body
@@ -0,0 +1,37 @@
+import fcntl
+import logging
+import os
+from pathlib import Path
+
+from app.logs_config import LockingRotatingFileHandler
+
+
+def _child_can_lock(handler: LockingRotatingFileHandler, after_fork: bool) -> bool:
+    """Whether a forked child gets the lock while this process holds it"""
+    lock_fd = handler._open_lock()
+    fcntl.flock(lock_fd, fcntl.LOCK_EX)
+    try:
+        pid = os.fork()
+        if pid == 0:
+            if after_fork:
+                handler.after_fork()
+            try:
+                fcntl.flock(handler._open_lock(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os._exit(1)
+            os._exit(0)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        fcntl.flock(lock_fd, fcntl.LOCK_UN)
+    return os.waitstatus_to_exitcode(status) == 0
+
+
+def test_forked_child_locks_on_its_own(tmp_path: Path) -> None:
+    handler = LockingRotatingFileHandler(str(tmp_path / "logs.log"))
+    handler.emit(logging.makeLogRecord({"msg": "from the parent"}))
+    try:
+        # The inherited descriptor shares the lock of the parent
+        assert _child_can_lock(handler, after_fork=False)
+        assert not _child_can_lock(handler, after_fork=True)
+    finally:
+        handler.close()
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from redis.exceptions import RedisError
+
+from redis_handlers.dispatcher import Dispatcher
+from redis_handlers.streams import Streams, StreamTrim
+
+UNLISTED = "commands.tests.unlisted"
+
+
+def test_unlisted_stream_is_not_trimmed() -> None:
+    assert UNLISTED not in Streams.TRIMMING
+    assert Streams.trim_for(UNLISTED).xadd_options() == {}
+
+    async def dispatch() -> int:
+        redis = FakeAsyncRedis()
+        await Dispatcher(redis).dispatch_many([(UNLISTED, "{}")] * 50)
+        return await redis.xlen(UNLISTED)
+
+    assert asyncio.run(dispatch()) == 50
+
+
+def test_listed_stream_is_trimmed(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(Streams.TRIMMING, UNLISTED, StreamTrim(maxlen=10))
+    assert Streams.trim_for(UNLISTED).xadd_options() == {
+        "maxlen": 10,
+        "approximate": True,
+    }
+
+
+def test_coalesced_dispatch_gets_the_pipeline_error() -> None:
+    async def dispatch() -> None:
+        dispatcher = Dispatcher(FakeAsyncRedis(connected=False), coalesce_ms=5)
+        await dispatcher.start()
+        try:
+            await dispatcher.dispatch(UNLISTED, "{}")
+        finally:
+            await dispatcher.stop()
+
+    with pytest.raises(RedisError):
+        asyncio.run(dispatch())
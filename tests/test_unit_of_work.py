@@ -0,0 +1,93 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import app.deps
+from app.deps import UnitOfWorkRoute, get_unit_of_work
+
+
+class FakeUnitOfWork:
+    def __init__(self, events: list[str]) -> None:
+        self.events = events
+
+    async def commit(self) -> None:
+        self.events.append("commit")
+
+    async def rollback(self) -> None:
+        self.events.append("rollback")
+
+
+def build_app(events: list[str], dependency: Any) -> FastAPI:
+    router = APIRouter(route_class=UnitOfWorkRoute)
+
+    @router.post("/write")
+    async def write(uow: Any = Depends(dependency)) -> dict[str, str]:
+        events.append("route")
+        return {"status": "ok"}
+
+    @router.post("/fail")
+    async def fail(uow: Any = Depends(dependency)) -> None:
+        raise HTTPException(status_code=400, detail="Nope")
+
+    def record_response(inner: ASGIApp) -> ASGIApp:
+        async def app(scope: Scope, receive: Receive, send: Send) -> None:
+            async def recording_send(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    events.append("response")
+                await send(message)
+
+            await inner(scope, receive, recording_send)
+
+        return app
+
+    api = FastAPI()
+    api.include_router(router)
+    api.add_middleware(record_response)  # type: ignore[arg-type]
+    return api
+
+
+@pytest.fixture
+def events(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    events: list[str] = []
+
+    # Commits when the dependency exits, like `db_handles.session.unit_of_work`
+    @asynccontextmanager
+    async def unit_of_work() -> AsyncIterator[FakeUnitOfWork]:
+        work = FakeUnitOfWork(events)
+        try:
+            yield work
+        except BaseException:
+            await work.rollback()
+            raise
+        await work.commit()
+
+    monkeypatch.setattr(app.deps, "unit_of_work", unit_of_work)
+    return events
+
+
+def test_commits_before_the_response_is_sent(events: list[str]) -> None:
+    client = TestClient(build_app(events, get_unit_of_work))
+    assert client.post("/write").status_code == 200
+    assert events.index("commit") < events.index("response")
+
+
+def test_route_commits_without_the_dependency_exit(events: list[str]) -> None:
+    # As if the exit code of the dependency only ran after the response
+    def deferred_unit_of_work(request: Request) -> FakeUnitOfWork:
+        request.state.unit_of_work = FakeUnitOfWork(events)
+        return request.state.unit_of_work
+
+    client = TestClient(build_app(events, deferred_unit_of_work))
+    assert client.post("/write").status_code == 200
+    assert events == ["route", "commit", "response"]
+
+
+def test_rolls_back_when_the_route_raises(events: list[str]) -> None:
+    client = TestClient(build_app(events, get_unit_of_work))
+    assert client.post("/fail").status_code == 400
+    assert "commit" not in events
+    assert "rollback" in events
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from typing import Iterator
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from starlette.types import Message
+
+from middlewares.upload_limit import MULTIPART_OVERHEAD, UploadSizeLimitMiddleware
+
+LIMIT = 1024
+CHUNK = 16 * 1024
+CHUNKS = 64
+
+
+def build_client(calls: list[str]) -> TestClient:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)) -> dict[str, int]:
+        calls.append("upload")
+        return {"size": len(await file.read())}
+
+    app.add_middleware(UploadSizeLimitMiddleware, limits={"/upload": LIMIT})
+    return TestClient(app)
+
+
+def multipart_body(size: int, pulled: list[int]) -> Iterator[bytes]:
+    yield (
+        b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.bin"'
+        b"\r\nContent-Type: application/octet-stream\r\n\r\n"
+    )
+    for _ in range(size // CHUNK):
+        pulled.append(CHUNK)
+        yield b"x" * CHUNK
+    yield b"\r\n--b--\r\n"
+
+
+def test_declared_length_over_the_limit_is_rejected_unread() -> None:
+    calls: list[str] = []
+    pulled: list[int] = []
+    response = build_client(calls).post(
+        "/upload",
+        content=b"".join(multipart_body(CHUNK * CHUNKS, pulled)),
+        headers={"content-type": "multipart/form-data; boundary=b"},
+    )
+    assert response.status_code == 413
+    assert calls == []
+
+
+def test_streamed_body_over_the_limit_is_cut_short() -> None:
+    calls: list[str] = []
+    pulled: list[int] = []
+    chunks = multipart_body(CHUNK * CHUNKS, pulled)
+    sent: list[Message] = []
+
+    # Without a Content-Length, e.g. chunked, fed to the app chunk by chunk
+    async def receive() -> Message:
+        chunk = next(chunks, None)
+        return {
+            "type": "http.request",
+            "body": chunk or b"",
+            "more_body": chunk is not None,
+        }
+
+    async def send(message: Message) -> None:
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/upload",
+        "raw_path": b"/upload",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"multipart/form-data; boundary=b")],
+    }
+    asyncio.run(build_client(calls).app(scope, receive, send))
+
+    assert sent[0]["status"] == 413
+    assert json.loads(sent[1]["body"])["error"]["code"] == 413
+    assert calls == []
+    # Reading stopped right after the limit, not at the end of the body
+    assert sum(pulled) <= LIMIT + MULTIPART_OVERHEAD + CHUNK
+    assert sum(pulled) < CHUNK * CHUNKS
+
+
+def test_body_under_the_limit_goes_through() -> None:
+    calls: list[str] = []
+    response = build_client(calls).post(
+        "/upload", files={"file": ("a.bin", b"x" * LIMIT)}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"size": LIMIT}